@@ -0,0 +1,480 @@
+"""
+Crawl4AI 离线性能基准测试
+在本机启动一个生成合成页面的 HTTP 服务（页面大小、脚本大小和执行时间、链接数、
+服务端延迟均可配置），分别用图形界面的爬取引擎（crawl_url_list）和 CrawlUtility
+的批量爬取在不同并发数下爬取，统计每秒页面数、单页耗时分位数、峰值内存和浏览器
+CPU 时间，结果写成 JSON，可以用 --compare 与之前的结果对比。
+
+每组测试在新的进程中运行，峰值内存和 CPU 时间互不影响。安装了 psutil 时按进程树
+采样（包括浏览器进程）；否则使用 resource 模块的统计，浏览器 CPU 时间在浏览器
+关闭后才计入，峰值内存为本进程与最大的单个子进程之和（Windows 上没有这些数据）。
+"""
+
+import argparse
+import asyncio
+import contextlib
+import json
+import multiprocessing
+import os
+import platform
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+from crawl_events import URL_FINISHED, URL_STARTED, EventBus
+from crawl_metrics import CrawlMetrics, StageHistogram
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+# 支持的爬取引擎
+ENGINES = ("gui", "cli")
+
+# 结果文件格式版本，字段变化时递增
+RESULT_VERSION = 1
+
+# 进程树内存和 CPU 的采样间隔（秒）
+SAMPLE_INTERVAL = 0.2
+
+# 合成页面正文使用的词
+WORDS = ("crawl", "async", "browser", "markdown", "render", "page", "content", "filter",
+         "network", "latency", "cache", "export", "screenshot", "report", "queue", "worker")
+
+
+def build_page(index, options):
+    """生成第 index 个合成页面的 HTML（同样的参数总是生成同样的页面）"""
+    rng = random.Random(index)
+    pages = options["pages"]
+
+    # 正文：若干段落，总大小约 page_kb
+    paragraphs = []
+    size = 0
+    while size < options["page_kb"] * 1024:
+        text = " ".join(rng.choice(WORDS) for _ in range(60))
+        paragraphs.append(f"<p>{text}</p>")
+        size += len(text) + 7
+
+    # 链接：指向站内其他页面
+    links = [f'<li><a href="/page/{(index + k * 7 + 1) % pages}">第 {k} 个链接</a></li>'
+             for k in range(options["links"])]
+
+    # 脚本：js_kb 大小的数据和执行约 js_ms 毫秒的计算
+    script = ""
+    if options["js_kb"] or options["js_ms"]:
+        data = "x" * (options["js_kb"] * 1024)
+        script = (f'<script>var payload = "{data}";'
+                  f'var end = Date.now() + {options["js_ms"]}, n = 0;'
+                  f'while (Date.now() < end) {{ n += Math.sqrt(n + payload.length); }}'
+                  f'document.body.setAttribute("data-n", n);</script>')
+
+    return (f"<!DOCTYPE html><html><head><meta charset=\"utf-8\"><title>基准页面 {index}</title></head>"
+            f"<body><h1>基准页面 {index}</h1>{''.join(paragraphs)}<ul>{''.join(links)}</ul>{script}"
+            f"</body></html>").encode('utf-8')
+
+
+class SyntheticSite:
+    """在后台线程中提供 http://host:port/page/<序号> 的合成页面，每个请求先等待 latency_ms 毫秒"""
+
+    def __init__(self, options, port=0, host="127.0.0.1"):
+        """生成全部页面并启动服务，port 为 0 时自动选择端口（见 self.port）"""
+        pages = [build_page(i, options) for i in range(options["pages"])]
+        latency = options["latency_ms"] / 1000
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                parts = self.path.split("?")[0].strip("/").split("/")
+                if len(parts) != 2 or parts[0] != "page" or not parts[1].isdigit() or int(parts[1]) >= len(pages):
+                    self.send_error(404)
+                    return
+                if latency:
+                    time.sleep(latency)
+                body = pages[int(parts[1])]
+                self.send_response(200)
+                self.send_header("Content-Type", "text/html; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.send_header("Cache-Control", "no-store")
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.server.daemon_threads = True
+        self.host = host
+        self.port = self.server.server_address[1]
+        self.page_count = len(pages)
+        self.thread = threading.Thread(target=self.server.serve_forever, name="benchmark-site", daemon=True)
+        self.thread.start()
+
+    def urls(self):
+        """所有页面的网址"""
+        return [f"http://{self.host}:{self.port}/page/{i}" for i in range(self.page_count)]
+
+    def close(self):
+        """停止服务"""
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class ResourceMonitor:
+    """记录本进程及其子进程（浏览器）的峰值内存和 CPU 时间"""
+
+    def __init__(self):
+        self.peak_rss = 0
+        self.child_cpu = {}  # 子进程号 -> 最近一次采样的 CPU 时间
+        self.stopped = threading.Event()
+        self.thread = None
+        self.self_cpu = self.children_cpu = 0.0
+
+    def start(self):
+        self.self_cpu, self.children_cpu = self.rusage_cpu()
+        if psutil is not None:
+            self.process = psutil.Process()
+            self.thread = threading.Thread(target=self.run, name="benchmark-monitor", daemon=True)
+            self.thread.start()
+
+    def run(self):
+        while not self.stopped.wait(SAMPLE_INTERVAL):
+            self.sample()
+
+    def sample(self):
+        """采样一次进程树的内存和各子进程的 CPU 时间"""
+        try:
+            total = self.process.memory_info().rss
+            children = self.process.children(recursive=True)
+        except psutil.Error:
+            return
+        for child in children:
+            try:
+                total += child.memory_info().rss
+                times = child.cpu_times()
+                self.child_cpu[child.pid] = times.user + times.system
+            except psutil.Error:
+                continue
+        self.peak_rss = max(self.peak_rss, total)
+
+    @staticmethod
+    def rusage_cpu():
+        """resource 模块统计的 (本进程, 已结束的子进程) CPU 时间"""
+        if resource is None:
+            return 0.0, 0.0
+        own = resource.getrusage(resource.RUSAGE_SELF)
+        children = resource.getrusage(resource.RUSAGE_CHILDREN)
+        return own.ru_utime + own.ru_stime, children.ru_utime + children.ru_stime
+
+    def stop(self):
+        """停止采样，返回 {peak_rss_mb, engine_cpu_seconds, browser_cpu_seconds, resource_source}"""
+        self_cpu, children_cpu = self.rusage_cpu()
+        result = {"engine_cpu_seconds": round(self_cpu - self.self_cpu, 3) if resource else None}
+
+        if self.thread is not None:
+            self.stopped.set()
+            self.thread.join()
+            self.sample()
+            result["peak_rss_mb"] = round(self.peak_rss / 1024 / 1024, 1)
+            result["browser_cpu_seconds"] = round(sum(self.child_cpu.values()), 3)
+            result["resource_source"] = "psutil"
+        elif resource is not None:
+            # ru_maxrss 在 macOS 上以字节为单位，其他系统以 KB 为单位
+            unit = 1 if sys.platform == "darwin" else 1024
+            peak = (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss +
+                    resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss) * unit
+            result["peak_rss_mb"] = round(peak / 1024 / 1024, 1)
+            result["browser_cpu_seconds"] = round(children_cpu - self.children_cpu, 3)
+            result["resource_source"] = "rusage"
+        else:
+            result["peak_rss_mb"] = result["browser_cpu_seconds"] = result["resource_source"] = None
+        return result
+
+
+class LatencyRecorder:
+    """订阅进度事件，记录每个网址的耗时和第一个网址开始、最后一个网址完成的时间"""
+
+    def __init__(self):
+        self.latency = StageHistogram()
+        self.statuses = {}
+        self.first_started = None
+        self.last_finished = None
+
+    def __call__(self, event):
+        if event.kind == URL_STARTED and self.first_started is None:
+            self.first_started = event.time
+        elif event.kind == URL_FINISHED and not event.get("resumed"):
+            status = event.get("status")
+            self.statuses[status] = self.statuses.get(status, 0) + 1
+            if event.get("elapsed") is not None:
+                self.latency.observe(event.get("elapsed"))
+            self.last_finished = event.time
+
+
+async def run_gui_engine(urls, concurrency, output_dir, options, recorder, metrics):
+    """用图形界面的爬取引擎爬取"""
+    from crawl4ai_ui import crawl_url_list, prepare_output_dirs
+
+    settings = {
+        "output_dir": str(output_dir),
+        "browser_type": options["browser"],
+        "headless": True,
+        "viewport_width": 1280,
+        "viewport_height": 720,
+        "concurrency": concurrency,
+        "per_host": concurrency,
+        "workers": 1,
+        "filter_type": "none",
+        "keywords": "",
+        "export_markdown": True,
+        "export_pdf": options["pdf"],
+        "export_screenshot": options["screenshot"],
+        "export_info": True,
+        "cache_mode": "bypass",
+        "incremental": False,
+        "retries": 0,
+        "url_timeout": options["timeout"],
+    }
+    prepare_output_dirs(settings)
+    events = EventBus()
+    events.subscribe(recorder)
+    await crawl_url_list(enumerate(urls, 1), settings, len(urls), events, lambda: False, metrics)
+
+
+async def run_cli_engine(urls, concurrency, output_dir, options, recorder, metrics):
+    """用 CrawlUtility 的批量爬取"""
+    from crawl_utility import CrawlUtility, print_batch_event
+
+    async with CrawlUtility(output_dir, cache_mode="bypass", url_timeout=options["timeout"]) as utility:
+        utility.events.unsubscribe(print_batch_event)
+        utility.events.subscribe(recorder)
+        await utility.batch_crawl(urls, output_dir=Path(output_dir) / "batch", concurrency=concurrency,
+                                  report="jsonl", retries=0)
+        metrics.merge(utility.metrics)
+
+
+def run_case(engine, concurrency, urls, options, output_dir):
+    """测试进程入口：用指定引擎和并发数爬取全部网址，返回这一组的结果"""
+    recorder = LatencyRecorder()
+    metrics = CrawlMetrics()
+    monitor = ResourceMonitor()
+    runner = run_gui_engine if engine == "gui" else run_cli_engine
+
+    # 爬虫和引擎的输出写入日志文件，终端只显示汇总
+    Path(output_dir).mkdir(parents=True, exist_ok=True)
+    monitor.start()
+    started = time.perf_counter()
+    with open(Path(output_dir) / "benchmark.log", 'w', encoding='utf-8') as log, \
+            contextlib.redirect_stdout(log):
+        asyncio.run(runner(urls, concurrency, output_dir, options, recorder, metrics))
+    wall_seconds = time.perf_counter() - started
+    resources = monitor.stop()
+
+    latency = recorder.latency
+    pages = latency.count
+    crawl_seconds = None
+    if recorder.first_started is not None and recorder.last_finished is not None:
+        crawl_seconds = max(recorder.last_finished - recorder.first_started, 1e-6)
+    return {
+        "engine": engine,
+        "concurrency": concurrency,
+        "pages": pages,
+        "statuses": recorder.statuses,
+        "wall_seconds": round(wall_seconds, 3),
+        "crawl_seconds": round(crawl_seconds, 3) if crawl_seconds else None,
+        "pages_per_second": round(pages / crawl_seconds, 3) if crawl_seconds else 0.0,
+        "latency": {
+            "mean": round(latency.sum / pages, 3) if pages else None,
+            **{name: round(latency.quantile(q), 3) if pages else None
+               for name, q in (("p50", 0.5), ("p95", 0.95), ("p99", 0.99), ("max", 1.0))}
+        },
+        **resources,
+        "stages": metrics.summary()["stages"],
+    }
+
+
+def environment_info():
+    """记录运行环境，对比结果时用于判断两次测试是否可比"""
+    try:
+        from importlib.metadata import version
+        crawl4ai_version = version("crawl4ai")
+    except Exception:
+        crawl4ai_version = None
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "crawl4ai": crawl4ai_version,
+        "psutil": psutil is not None,
+    }
+
+
+def group_runs(runs):
+    """按 (引擎, 并发数) 合并重复测试，各项取平均值"""
+    groups = {}
+    for run in runs:
+        groups.setdefault((run["engine"], run["concurrency"]), []).append(run)
+
+    def mean(values):
+        values = [v for v in values if v is not None]
+        return sum(values) / len(values) if values else None
+
+    return {key: {
+        "pages_per_second": mean(run["pages_per_second"] for run in items),
+        "p50": mean(run["latency"]["p50"] for run in items),
+        "p95": mean(run["latency"]["p95"] for run in items),
+        "peak_rss_mb": mean(run["peak_rss_mb"] for run in items),
+        "browser_cpu_seconds": mean(run["browser_cpu_seconds"] for run in items),
+    } for key, items in groups.items()}
+
+
+def compare_results(current, baseline):
+    """逐组对比本次和之前的结果，返回显示用的文字行"""
+    lines = []
+    if current["site"] != baseline["site"] or current["crawl"] != baseline["crawl"]:
+        lines.append("⚠️ 两次测试的站点或爬取参数不同，结果不能直接比较")
+    if current["environment"] != baseline["environment"]:
+        lines.append("⚠️ 两次测试的运行环境不同")
+
+    old = group_runs(baseline["runs"])
+    for key, new in sorted(group_runs(current["runs"]).items()):
+        if key not in old:
+            continue
+        parts = []
+        for name, label, unit in (("pages_per_second", "页/秒", ""), ("p95", "p95", "s"),
+                                  ("peak_rss_mb", "峰值内存", " MB"), ("browser_cpu_seconds", "浏览器CPU", "s")):
+            before, after = old[key][name], new[name]
+            if before is None or after is None:
+                continue
+            change = f"{(after - before) / before * 100:+.1f}%" if before else "—"
+            parts.append(f"{label} {before:.2f}{unit} → {after:.2f}{unit}（{change}）")
+        lines.append(f"   {key[0]} 并发 {key[1]}: " + "，".join(parts))
+    return lines
+
+
+def format_run(run):
+    """一组结果的汇总文字"""
+    latency = run["latency"]
+    text = f"✅ {run['engine']} 并发 {run['concurrency']}: {run['pages']} 页，{run['pages_per_second']:.2f} 页/秒"
+    if latency["p50"] is not None:
+        text += f"，p50 {latency['p50']:.2f}s，p95 {latency['p95']:.2f}s，p99 {latency['p99']:.2f}s"
+    if run["peak_rss_mb"] is not None:
+        text += f"，峰值内存 {run['peak_rss_mb']:.0f} MB，浏览器CPU {run['browser_cpu_seconds']:.1f}s"
+    failed = sum(count for status, count in run["statuses"].items() if status not in ("success", "cached", "unchanged"))
+    if failed:
+        text += f"，失败 {failed} 个"
+    return text
+
+
+def parse_list(text, convert=str):
+    return [convert(item.strip()) for item in text.split(",") if item.strip()]
+
+
+def main():
+    """命令行入口"""
+    parser = argparse.ArgumentParser(description="Crawl4AI 离线性能基准测试")
+    parser.add_argument("--pages", type=int, default=100, help="合成页面数量")
+    parser.add_argument("--page-kb", type=int, default=50, help="每个页面正文的大小（KB）")
+    parser.add_argument("--js-kb", type=int, default=20, help="每个页面内联脚本的大小（KB）")
+    parser.add_argument("--js-ms", type=int, default=0, help="每个页面脚本在浏览器中执行的时间（毫秒）")
+    parser.add_argument("--links", type=int, default=20, help="每个页面的站内链接数")
+    parser.add_argument("--latency-ms", type=int, default=50, help="服务端每个请求的延迟（毫秒）")
+    parser.add_argument("--concurrency", default="1,2,4,8", help="依次测试的并发数，逗号分隔")
+    parser.add_argument("--engines", default="gui,cli", help="测试的爬取引擎，逗号分隔（gui、cli）")
+    parser.add_argument("--repeat", type=int, default=1, help="每组测试重复的次数")
+    parser.add_argument("--browser", choices=["chromium", "firefox", "webkit"], default="chromium", help="浏览器类型")
+    parser.add_argument("--pdf", action="store_true", help="同时导出PDF")
+    parser.add_argument("--screenshot", action="store_true", help="同时截图")
+    parser.add_argument("--timeout", type=float, default=60, help="单个页面的爬取时限（秒）")
+    parser.add_argument("--work-dir", help="爬取输出目录（默认使用临时目录，结束后删除）")
+    parser.add_argument("-o", "--output", help="结果文件（默认 outputs/benchmarks/benchmark_时间.json）")
+    parser.add_argument("--compare", help="与之前的结果文件对比")
+
+    args = parser.parse_args()
+    engines = parse_list(args.engines)
+    levels = parse_list(args.concurrency, int)
+    if not engines or any(engine not in ENGINES for engine in engines):
+        parser.error(f"--engines 只能是 {', '.join(ENGINES)}")
+    if not levels or min(levels) < 1:
+        parser.error("--concurrency 必须是正整数")
+
+    site_options = {
+        "pages": args.pages,
+        "page_kb": args.page_kb,
+        "js_kb": args.js_kb,
+        "js_ms": args.js_ms,
+        "links": args.links,
+        "latency_ms": args.latency_ms,
+    }
+    crawl_options = {
+        "browser": args.browser,
+        "pdf": args.pdf,
+        "screenshot": args.screenshot,
+        "timeout": args.timeout,
+    }
+    output_file = Path(args.output) if args.output else \
+        Path("outputs") / "benchmarks" / f"benchmark_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+
+    work_dir = Path(args.work_dir) if args.work_dir else Path(tempfile.mkdtemp(prefix="crawl_benchmark_"))
+    site = SyntheticSite(site_options)
+    print(f"🌐 合成站点: http://{site.host}:{site.port}/page/0 ～ {args.pages - 1}"
+          f"（正文 {args.page_kb} KB，脚本 {args.js_kb} KB / {args.js_ms} ms，"
+          f"{args.links} 个链接，延迟 {args.latency_ms} ms）")
+
+    runs = []
+    # 每组测试使用新启动的进程，峰值内存和子进程 CPU 时间只包含这一组
+    context = multiprocessing.get_context("spawn")
+    try:
+        for engine in engines:
+            for concurrency in levels:
+                for attempt in range(args.repeat):
+                    case_dir = work_dir / f"{engine}_c{concurrency}_{attempt + 1}"
+                    with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+                        run = executor.submit(run_case, engine, concurrency, site.urls(),
+                                              crawl_options, str(case_dir)).result()
+                    run["repeat"] = attempt + 1
+                    runs.append(run)
+                    print(format_run(run))
+    except KeyboardInterrupt:
+        print("⏹️ 测试已中断，保存已完成的结果")
+    finally:
+        site.close()
+        if not args.work_dir:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    result = {
+        "version": RESULT_VERSION,
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "environment": environment_info(),
+        "site": site_options,
+        "crawl": crawl_options,
+        "runs": runs,
+    }
+    output_file.parent.mkdir(parents=True, exist_ok=True)
+    with open(output_file, 'w', encoding='utf-8') as f:
+        json.dump(result, f, ensure_ascii=False, indent=2)
+    print(f"📊 结果已保存: {output_file}")
+
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        print(f"📈 与 {args.compare} 对比:")
+        for line in compare_results(result, baseline):
+            print(line)
+
+
+if __name__ == "__main__":
+    main()
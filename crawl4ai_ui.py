@@ -21,13 +21,39 @@ from tkinter import ttk, filedialog, messagebox, scrolledtext
 import asyncio
 import threading
 import queue
+import multiprocessing
 import json
 import os
+import time
+from collections import Counter
 from pathlib import Path
 from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
 import webbrowser
 import nest_asyncio
 
+from crawl_archive import ARCHIVE_DIR, CrawlArchive
+from crawl_cache import CACHE_MODES, ResultCache
+from crawl_events import (
+    ERROR, FILE_WRITTEN, LOG, TASK_FINISHED, TASK_STARTED, URL_FILE_SCANNED, URL_FINISHED, URL_RETRY,
+    URL_STARTED, CrawlEvent, EventBatcher, EventBus, ThroughputStats
+)
+from crawl_images import (
+    DEFAULT_SCREENSHOT_OPTIONS, SCREENSHOT_FORMATS, missing_pillow, needs_processing, screenshot_options
+)
+from crawl_incremental import ValidatorStore
+from crawl_journal import BatchJournal, JsonlReport
+from crawl_manifest import LAYOUTS, MANIFEST_NAME, OutputManifest, flat_name, hashed_path
+from crawl_metrics import CrawlMetrics
+from crawl_profile import CrawlProfiler
+from crawl_results_view import ResultsTable
+from crawl_retry import CircuitBreaker, RetryPolicy, error_type, is_transient, retry_after_of
+from crawl_scheduler import DEFAULT_URL_TIMEOUT, HostScheduler
+from crawl_sink import SINK_NAME, SINKS, ResultSink
+from crawl_store import ContentStore
+from crawl_urls import SingleFlight, UrlSource, iter_pending, shard_hosts, url_host
+from crawl_writer import AsyncFileWriter
+
 # 应用nest_asyncio支持
 nest_asyncio.apply()
 
@@ -36,12 +62,22 @@ try:
     from crawl4ai import AsyncWebCrawler, BrowserConfig, CrawlerRunConfig, CacheMode
     from crawl4ai.content_filter_strategy import PruningContentFilter, BM25ContentFilter
     from crawl4ai.markdown_generation_strategy import DefaultMarkdownGenerator
-    import base64
     CRAWL4AI_AVAILABLE = True
 except ImportError as e:
     CRAWL4AI_AVAILABLE = False
     IMPORT_ERROR = str(e)
 
+# 从文件加载网址时界面中预览的行数
+URL_PREVIEW_LINES = 20
+
+# 日志区默认保留的行数，超出后删除最早的行（完整日志写入 logs 目录下的文件）
+LOG_MAX_LINES = 5000
+
+# 日志区每次刷新最多显示的消息数，以及轮询输出队列的最短和最长间隔（毫秒）
+LOG_BATCH_LIMIT = 2000
+LOG_POLL_MIN_MS = 30
+LOG_POLL_MAX_MS = 500
+
 class Crawl4AI_GUI:
     """Crawl4AI 图形用户界面类"""
     
@@ -79,6 +115,15 @@ class Crawl4AI_GUI:
         self.headless_var = tk.BooleanVar(value=True)
         self.viewport_width_var = tk.IntVar(value=1280)
         self.viewport_height_var = tk.IntVar(value=720)
+        self.concurrency_var = tk.IntVar(value=3)
+        self.workers_var = tk.IntVar(value=1)
+        self.per_host_var = tk.IntVar(value=2)
+        self.host_rate_var = tk.DoubleVar(value=0.0)
+        self.crawl_delay_var = tk.DoubleVar(value=0.0)
+        self.retries_var = tk.IntVar(value=2)
+        self.url_timeout_var = tk.IntVar(value=DEFAULT_URL_TIMEOUT)
+        self.deadline_var = tk.IntVar(value=0)
+        self.cache_mode_var = tk.StringVar(value="enabled")
         
         # 过滤设置
         self.filter_type_var = tk.StringVar(value="none")
@@ -90,6 +135,35 @@ class Crawl4AI_GUI:
         self.export_screenshot_var = tk.BooleanVar(value=False)
         self.export_info_var = tk.BooleanVar(value=False)
         
+        # 截图设置（格式转换和缩放需要 Pillow）
+        self.screenshot_format_var = tk.StringVar(value=DEFAULT_SCREENSHOT_OPTIONS["format"])
+        self.screenshot_quality_var = tk.IntVar(value=DEFAULT_SCREENSHOT_OPTIONS["quality"])
+        self.screenshot_max_width_var = tk.IntVar(value=DEFAULT_SCREENSHOT_OPTIONS["max_width"])
+        self.screenshot_max_height_var = tk.IntVar(value=DEFAULT_SCREENSHOT_OPTIONS["max_height"])
+        self.screenshot_thumbnail_var = tk.IntVar(value=DEFAULT_SCREENSHOT_OPTIONS["thumbnail"])
+        self.screenshot_viewport_only_var = tk.BooleanVar(value=DEFAULT_SCREENSHOT_OPTIONS["viewport_only"])
+        
+        # 相同内容的输出文件只保存一份
+        self.dedup_var = tk.BooleanVar(value=False)
+        
+        # 输出文件布局：flat 为“序号_网址”命名，hashed 为按网址哈希分层存放
+        self.layout_var = tk.StringVar(value="flat")
+        
+        # Markdown 和信息的保存方式：files 为单独的文件，sqlite 为写入一个结果库
+        self.sink_var = tk.StringVar(value="files")
+        
+        # 批量设置
+        self.incremental_var = tk.BooleanVar(value=False)
+        self.batch_info_var = tk.StringVar()
+        self.url_file = None  # 从文件加载的网址来源，只在界面中显示预览
+        self.url_file_loading = None  # 正在后台扫描的网址文件路径
+        
+        # 日志设置
+        self.log_max_lines_var = tk.IntVar(value=LOG_MAX_LINES)
+        
+        # 性能分析
+        self.profile_var = tk.BooleanVar(value=False)
+        
         # 状态变量
         self.is_running = False
         
@@ -203,6 +277,57 @@ class Crawl4AI_GUI:
                                 textvariable=self.viewport_height_var, width=10)
         height_spin.grid(row=3, column=1, sticky=tk.W, pady=(0, 5))
         
+        # 并发数（同时处理的页面数）
+        ttk.Label(browser_frame, text="并发页面数:").grid(row=4, column=0, sticky=tk.W, pady=(0, 5))
+        concurrency_spin = ttk.Spinbox(browser_frame, from_=1, to=20, 
+                                     textvariable=self.concurrency_var, width=10)
+        concurrency_spin.grid(row=4, column=1, sticky=tk.W, pady=(0, 5))
+        
+        # 工作进程数（每个进程一个浏览器）
+        ttk.Label(browser_frame, text="工作进程数:").grid(row=5, column=0, sticky=tk.W, pady=(0, 5))
+        workers_spin = ttk.Spinbox(browser_frame, from_=1, to=max(1, os.cpu_count() or 1), 
+                                 textvariable=self.workers_var, width=10)
+        workers_spin.grid(row=5, column=1, sticky=tk.W, pady=(0, 5))
+        
+        # 本地结果缓存
+        ttk.Label(browser_frame, text="缓存模式:").grid(row=6, column=0, sticky=tk.W, pady=(0, 5))
+        cache_combo = ttk.Combobox(browser_frame, textvariable=self.cache_mode_var,
+                                  values=CACHE_MODES, state="readonly", width=10)
+        cache_combo.grid(row=6, column=1, sticky=tk.W, pady=(0, 5))
+        
+        # 单站点限制（礼貌爬取）
+        ttk.Label(browser_frame, text="单站点并发数:").grid(row=7, column=0, sticky=tk.W, pady=(0, 5))
+        per_host_spin = ttk.Spinbox(browser_frame, from_=1, to=20, 
+                                  textvariable=self.per_host_var, width=10)
+        per_host_spin.grid(row=7, column=1, sticky=tk.W, pady=(0, 5))
+        
+        ttk.Label(browser_frame, text="站点每秒请求数(0不限):").grid(row=8, column=0, sticky=tk.W, pady=(0, 5))
+        rate_spin = ttk.Spinbox(browser_frame, from_=0, to=100, increment=0.5, 
+                              textvariable=self.host_rate_var, width=10)
+        rate_spin.grid(row=8, column=1, sticky=tk.W, pady=(0, 5))
+        
+        ttk.Label(browser_frame, text="站点请求间隔(秒):").grid(row=9, column=0, sticky=tk.W, pady=(0, 5))
+        delay_spin = ttk.Spinbox(browser_frame, from_=0, to=60, increment=0.5, 
+                               textvariable=self.crawl_delay_var, width=10)
+        delay_spin.grid(row=9, column=1, sticky=tk.W, pady=(0, 5))
+        
+        # 暂时性失败（超时、429、5xx）的重试次数
+        ttk.Label(browser_frame, text="失败重试次数:").grid(row=10, column=0, sticky=tk.W, pady=(0, 5))
+        retries_spin = ttk.Spinbox(browser_frame, from_=0, to=10, 
+                                 textvariable=self.retries_var, width=10)
+        retries_spin.grid(row=10, column=1, sticky=tk.W, pady=(0, 5))
+        
+        # 时限：单个页面超时后取消并重试，整个任务到期后停止
+        ttk.Label(browser_frame, text="单页超时(秒):").grid(row=11, column=0, sticky=tk.W, pady=(0, 5))
+        timeout_spin = ttk.Spinbox(browser_frame, from_=5, to=600, increment=5, 
+                                 textvariable=self.url_timeout_var, width=10)
+        timeout_spin.grid(row=11, column=1, sticky=tk.W, pady=(0, 5))
+        
+        ttk.Label(browser_frame, text="总时限(分钟,0不限):").grid(row=12, column=0, sticky=tk.W, pady=(0, 5))
+        deadline_spin = ttk.Spinbox(browser_frame, from_=0, to=1440, 
+                                  textvariable=self.deadline_var, width=10)
+        deadline_spin.grid(row=12, column=1, sticky=tk.W, pady=(0, 5))
+        
         browser_frame.columnconfigure(1, weight=1)
     
     def create_filter_section(self, parent):
@@ -262,6 +387,50 @@ class Crawl4AI_GUI:
                                   font=("Microsoft YaHei", 8))
             desc_label.grid(row=1, column=0, sticky=tk.W)
         
+        # 截图选项
+        shot_frame = ttk.Frame(export_frame)
+        shot_frame.grid(row=2, column=0, columnspan=2, sticky=(tk.W, tk.E), pady=(5, 0))
+        
+        ttk.Label(shot_frame, text="截图格式:").grid(row=0, column=0, sticky=tk.W, padx=(0, 5))
+        ttk.Combobox(shot_frame, textvariable=self.screenshot_format_var, values=list(SCREENSHOT_FORMATS),
+                    state="readonly", width=6).grid(row=0, column=1, padx=(0, 10))
+        ttk.Label(shot_frame, text="质量:").grid(row=0, column=2, sticky=tk.W, padx=(0, 5))
+        ttk.Spinbox(shot_frame, from_=10, to=100, increment=5, width=5,
+                   textvariable=self.screenshot_quality_var).grid(row=0, column=3, padx=(0, 10))
+        ttk.Checkbutton(shot_frame, text="仅首屏",
+                       variable=self.screenshot_viewport_only_var).grid(row=0, column=4, sticky=tk.W)
+        
+        ttk.Label(shot_frame, text="最大宽×高:").grid(row=1, column=0, sticky=tk.W, padx=(0, 5), pady=(5, 0))
+        ttk.Spinbox(shot_frame, from_=0, to=10000, increment=100, width=6,
+                   textvariable=self.screenshot_max_width_var).grid(row=1, column=1, padx=(0, 10), pady=(5, 0))
+        ttk.Spinbox(shot_frame, from_=0, to=100000, increment=500, width=5,
+                   textvariable=self.screenshot_max_height_var).grid(row=1, column=3, padx=(0, 10), pady=(5, 0))
+        ttk.Label(shot_frame, text="缩略图边长:").grid(row=1, column=4, sticky=tk.W, pady=(5, 0))
+        ttk.Spinbox(shot_frame, from_=0, to=1000, increment=40, width=5,
+                   textvariable=self.screenshot_thumbnail_var).grid(row=1, column=5, padx=(5, 0), pady=(5, 0))
+        
+        shot_info = ttk.Label(shot_frame, text="0 表示不限制或不生成；WebP/JPEG、缩放和缩略图需要安装 Pillow",
+                             foreground="gray", font=("Microsoft YaHei", 8))
+        shot_info.grid(row=2, column=0, columnspan=6, sticky=tk.W)
+        
+        # 内容去重存储
+        ttk.Checkbutton(export_frame, text="🧬 相同内容只保存一份（输出文件为硬链接，内容保存在 .store 中）",
+                       variable=self.dedup_var).grid(row=3, column=0, columnspan=2, sticky=tk.W, pady=(5, 0))
+        
+        # 文件布局
+        layout_frame = ttk.Frame(export_frame)
+        layout_frame.grid(row=4, column=0, columnspan=2, sticky=(tk.W, tk.E), pady=(5, 0))
+        ttk.Label(layout_frame, text="文件布局:").grid(row=0, column=0, sticky=tk.W, padx=(0, 5))
+        ttk.Combobox(layout_frame, textvariable=self.layout_var, values=LAYOUTS,
+                    state="readonly", width=8).grid(row=0, column=1, padx=(0, 10))
+        ttk.Label(layout_frame, text="hashed 按网址哈希分层存放（ab/cd/哈希.md），网址与文件的对应见 manifest.db",
+                 foreground="gray", font=("Microsoft YaHei", 8)).grid(row=0, column=2, sticky=tk.W)
+        ttk.Label(layout_frame, text="保存方式:").grid(row=1, column=0, sticky=tk.W, padx=(0, 5), pady=(5, 0))
+        ttk.Combobox(layout_frame, textvariable=self.sink_var, values=SINKS,
+                    state="readonly", width=8).grid(row=1, column=1, padx=(0, 10), pady=(5, 0))
+        ttk.Label(layout_frame, text="sqlite 把 Markdown 和信息写入 results.db；archive 连同原始 HTML 压缩写入 archive/ 下的 WARC 归档",
+                 foreground="gray", font=("Microsoft YaHei", 8)).grid(row=1, column=2, sticky=tk.W, pady=(5, 0))
+        
         export_frame.columnconfigure(0, weight=1)
         export_frame.columnconfigure(1, weight=1)
     
@@ -272,6 +441,8 @@ class Crawl4AI_GUI:
         
         # 批量URL输入
         ttk.Label(batch_frame, text="批量URL（每行一个）:").grid(row=0, column=0, sticky=tk.W, pady=(0, 5))
+        ttk.Label(batch_frame, textvariable=self.batch_info_var, 
+                 foreground="gray").grid(row=0, column=1, sticky=tk.W, pady=(0, 5))
         
         self.batch_text = scrolledtext.ScrolledText(batch_frame, height=4, width=50)
         self.batch_text.grid(row=1, column=0, columnspan=2, sticky=(tk.W, tk.E), pady=(0, 5))
@@ -285,7 +456,9 @@ class Crawl4AI_GUI:
         ttk.Button(batch_btn_frame, text="💾 保存到文件", 
                   command=self.save_urls_to_file).grid(row=0, column=1, padx=(0, 10))
         ttk.Button(batch_btn_frame, text="🗑️ 清空", 
-                  command=self.clear_batch_urls).grid(row=0, column=2)
+                  command=self.clear_batch_urls).grid(row=0, column=2, padx=(0, 10))
+        ttk.Checkbutton(batch_btn_frame, text="⏸️ 增量爬取（跳过未变化的页面）", 
+                       variable=self.incremental_var).grid(row=0, column=3)
         
         batch_frame.columnconfigure(1, weight=1)
     
@@ -303,26 +476,39 @@ class Crawl4AI_GUI:
                                   command=self.stop_crawling, state="disabled")
         self.stop_btn.grid(row=0, column=1, padx=(0, 10))
         
+        self.resume_btn = ttk.Button(control_frame, text="⏩ 继续上次任务", 
+                                    command=self.resume_crawling)
+        self.resume_btn.grid(row=0, column=2, padx=(0, 10))
+        
         # 其他功能按钮
         ttk.Button(control_frame, text="🗂️ 打开输出目录", 
-                  command=self.open_output_dir).grid(row=0, column=2, padx=(0, 10))
+                  command=self.open_output_dir).grid(row=0, column=3, padx=(0, 10))
         ttk.Button(control_frame, text="🧹 清理输出", 
-                  command=self.clean_output).grid(row=0, column=3, padx=(0, 10))
+                  command=self.clean_output).grid(row=0, column=4, padx=(0, 10))
         ttk.Button(control_frame, text="⚙️ 重置配置", 
-                  command=self.reset_config).grid(row=0, column=4)
+                  command=self.reset_config).grid(row=0, column=5, padx=(0, 10))
+        ttk.Checkbutton(control_frame, text="🔬 性能分析", 
+                       variable=self.profile_var).grid(row=0, column=6)
     
     def create_output_section(self, parent):
         """创建输出日志区域"""
         output_frame = ttk.LabelFrame(parent, text="📋 运行日志", padding="10")
         output_frame.grid(row=6, column=0, columnspan=2, sticky=(tk.W, tk.E, tk.N, tk.S), pady=(0, 10))
         
+        # 日志和结果列表分两页显示
+        notebook = ttk.Notebook(output_frame)
+        notebook.grid(row=0, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
+        
+        log_frame = ttk.Frame(notebook, padding="5")
+        notebook.add(log_frame, text="日志")
+        
         # 日志显示区域
-        self.output_text = scrolledtext.ScrolledText(output_frame, height=15, 
+        self.output_text = scrolledtext.ScrolledText(log_frame, height=15, 
                                                     font=("Consolas", 9))
         self.output_text.grid(row=0, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
         
         # 日志控制按钮
-        log_btn_frame = ttk.Frame(output_frame)
+        log_btn_frame = ttk.Frame(log_frame)
         log_btn_frame.grid(row=1, column=0, sticky=(tk.W, tk.E), pady=(10, 0))
         
         ttk.Button(log_btn_frame, text="🗑️ 清空日志", 
@@ -330,6 +516,17 @@ class Crawl4AI_GUI:
         ttk.Button(log_btn_frame, text="💾 保存日志", 
                   command=self.save_log).grid(row=0, column=1)
         
+        ttk.Label(log_btn_frame, text="保留行数:").grid(row=0, column=2, padx=(20, 5))
+        ttk.Spinbox(log_btn_frame, from_=100, to=100000, increment=1000, width=8,
+                   textvariable=self.log_max_lines_var).grid(row=0, column=3)
+        
+        log_frame.columnconfigure(0, weight=1)
+        log_frame.rowconfigure(0, weight=1)
+        
+        # 结果列表：每个网址一行，可排序和筛选
+        self.results_table = ResultsTable(notebook, height=14)
+        notebook.add(self.results_table, text="结果列表")
+        
         output_frame.columnconfigure(0, weight=1)
         output_frame.rowconfigure(0, weight=1)
     
@@ -350,29 +547,104 @@ class Crawl4AI_GUI:
         status_frame.columnconfigure(1, weight=2)
     
     def setup_output_queue(self):
-        """设置输出队列"""
+        """设置进度事件、输出队列和完整日志文件
+        
+        爬取线程把事件发到 events，攒成批后放入 output_queue，
+        界面线程在 check_queue 中统一处理，其他线程不直接操作界面。
+        """
         self.output_queue = queue.Queue()
+        self.events = EventBus()
+        self.batcher = self.events.subscribe(EventBatcher(self.output_queue.put))
+        self.stats = ThroughputStats()
+        self.poll_interval = LOG_POLL_MIN_MS
+        
+        # 日志区只保留最近的部分，完整日志写入文件
+        self.log_path = Path("logs") / f"crawl4ai_ui_{datetime.now().strftime('%Y%m%d_%H%M%S')}.log"
+        try:
+            self.log_path.parent.mkdir(parents=True, exist_ok=True)
+            self.log_file = open(self.log_path, 'a', encoding='utf-8')
+        except OSError:
+            self.log_file = None
+        
         self.check_queue()
     
     def check_queue(self):
-        """检查输出队列"""
+        """检查输出队列，把积累的事件合并后一次性显示出来
+        
+        日志文字一次插入，同一网址的多次状态变化只保留最后一次，状态栏每次只更新一次。
+        有事件时以最短间隔轮询，队列空闲时逐步放慢到最长间隔；
+        一次取不完（事件过多）时立即安排下一次刷新。
+        """
+        events = []
         try:
-            while True:
-                message = self.output_queue.get_nowait()
-                self.log_message(message)
+            while len(events) < LOG_BATCH_LIMIT:
+                events.extend(self.output_queue.get_nowait())
         except queue.Empty:
             pass
-        finally:
-            self.root.after(100, self.check_queue)
+        
+        messages = []
+        rows = {}
+        last_url = None
+        finished = False
+        for event in events:
+            if event.kind == URL_FILE_SCANNED:
+                self.url_file_scanned(event)
+                continue
+            self.stats(event)
+            message = format_event(event)
+            if message is not None:
+                messages.append(message)
+            row = result_row(event)
+            if row is not None:
+                rows.setdefault(row["index"], {}).update(row)
+            if event.kind == URL_FINISHED:
+                last_url = event.url
+            elif event.kind == TASK_FINISHED:
+                finished = True
+        
+        if messages:
+            self.append_log(messages)
+        self.results_table.update_rows(list(rows.values()))
+        if last_url is not None:
+            self.update_status(f"{self.stats.summary()}: {last_url[:50]}")
+        if finished:
+            self.crawling_finished()
+        
+        if len(events) >= LOG_BATCH_LIMIT:
+            self.poll_interval = 0
+        elif events:
+            self.poll_interval = LOG_POLL_MIN_MS
+        else:
+            self.poll_interval = min(LOG_POLL_MAX_MS, max(LOG_POLL_MIN_MS, self.poll_interval * 2))
+        self.root.after(self.poll_interval, self.check_queue)
     
     def log_message(self, message):
-        """记录日志消息"""
+        """记录日志消息（只在界面线程中调用，其他线程通过 events 发送 LOG 事件）"""
+        self.append_log([message])
+    
+    def append_log(self, messages):
+        """把一批消息写入日志文件，并在日志区中一次插入，超出保留行数时删除最早的行"""
         timestamp = datetime.now().strftime("%H:%M:%S")
-        formatted_message = f"[{timestamp}] {message}\n"
+        text = "".join(f"[{timestamp}] {message}\n" for message in messages)
         
-        self.output_text.insert(tk.END, formatted_message)
-        self.output_text.see(tk.END)
-        self.root.update_idletasks()
+        if self.log_file is not None:
+            self.log_file.write(text)
+            self.log_file.flush()
+        
+        # 用户向上翻看日志时不自动滚动到底部
+        follow = self.output_text.yview()[1] >= 1.0
+        self.output_text.insert(tk.END, text)
+        
+        try:
+            max_lines = max(100, self.log_max_lines_var.get())
+        except tk.TclError:
+            max_lines = LOG_MAX_LINES
+        lines = int(self.output_text.index('end-1c').split('.')[0])
+        if lines > max_lines:
+            self.output_text.delete('1.0', f"{lines - max_lines + 1}.0")
+        
+        if follow:
+            self.output_text.see(tk.END)
     
     def update_status(self, status):
         """更新状态"""
@@ -408,14 +680,45 @@ class Crawl4AI_GUI:
         )
         
         if file_path:
-            try:
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    urls = f.read()
-                self.batch_text.delete('1.0', tk.END)
-                self.batch_text.insert('1.0', urls)
-                self.log_message(f"已从文件加载URL: {file_path}")
-            except Exception as e:
-                messagebox.showerror("错误", f"加载文件失败: {str(e)}")
+            # 在后台线程中扫描文件建立偏移索引，完成后回到界面线程显示预览，大文件不会卡住界面
+            self.url_file = None
+            self.url_file_loading = file_path
+            self.batch_info_var.set(f"⏳ 正在读取 {Path(file_path).name}...")
+            threading.Thread(target=self.scan_url_file, args=(file_path,), daemon=True).start()
+    
+    def scan_url_file(self, file_path):
+        """扫描网址文件（在后台线程中运行），结果作为事件放入输出队列，由界面线程的 check_queue 处理"""
+        try:
+            source = UrlSource(file_path)
+            event = CrawlEvent(URL_FILE_SCANNED, path=file_path, source=source,
+                               preview=source.preview(URL_PREVIEW_LINES))
+        except Exception as e:
+            event = CrawlEvent(URL_FILE_SCANNED, path=file_path, error=str(e))
+        self.output_queue.put([event])
+    
+    def url_file_scanned(self, event):
+        """显示扫描完成的网址文件预览；期间又加载了其他文件或清空了列表时丢弃结果"""
+        file_path = event.get("path")
+        if self.url_file_loading != file_path:
+            return
+        self.url_file_loading = None
+        if event.get("error") is not None:
+            self.batch_info_var.set("")
+            messagebox.showerror("错误", f"加载文件失败: {event.get('error')}")
+            return
+        
+        source, preview = event.get("source"), event.get("preview")
+        self.url_file = source
+        
+        self.batch_text.config(state='normal')
+        self.batch_text.delete('1.0', tk.END)
+        self.batch_text.insert('1.0', "\n".join(preview))
+        if len(source) > len(preview):
+            self.batch_text.insert(tk.END, f"\n... 其余 {len(source) - len(preview)} 个网址未显示")
+        self.batch_text.config(state='disabled')
+        
+        self.batch_info_var.set(f"📂 {Path(file_path).name}：共 {len(source)} 个网址")
+        self.log_message(f"已从文件加载URL: {file_path}（共 {len(source)} 个）")
     
     def save_urls_to_file(self):
         """保存URL到文件"""
@@ -427,15 +730,25 @@ class Crawl4AI_GUI:
         
         if file_path:
             try:
-                urls = self.batch_text.get('1.0', tk.END).strip()
-                with open(file_path, 'w', encoding='utf-8') as f:
-                    f.write(urls)
+                if self.url_file is not None:
+                    # 已加载文件时界面中只有预览，逐行写出完整列表
+                    with open(file_path, 'w', encoding='utf-8') as f:
+                        for _, url in self.url_file:
+                            f.write(url + "\n")
+                else:
+                    urls = self.batch_text.get('1.0', tk.END).strip()
+                    with open(file_path, 'w', encoding='utf-8') as f:
+                        f.write(urls)
                 self.log_message(f"已保存URL到文件: {file_path}")
             except Exception as e:
                 messagebox.showerror("错误", f"保存文件失败: {str(e)}")
     
     def clear_batch_urls(self):
         """清空批量URL"""
+        self.url_file = None
+        self.url_file_loading = None
+        self.batch_info_var.set("")
+        self.batch_text.config(state='normal')
         self.batch_text.delete('1.0', tk.END)
     
     def open_output_dir(self):
@@ -475,7 +788,7 @@ class Crawl4AI_GUI:
         self.output_text.delete('1.0', tk.END)
     
     def save_log(self):
-        """保存日志"""
+        """保存完整日志（包括日志区中已删除的早期内容）"""
         file_path = filedialog.asksaveasfilename(
             title="保存日志文件",
             defaultextension=".txt",
@@ -484,7 +797,11 @@ class Crawl4AI_GUI:
         
         if file_path:
             try:
-                log_content = self.output_text.get('1.0', tk.END)
+                if self.log_file is not None:
+                    self.log_file.flush()
+                    log_content = self.log_path.read_text(encoding='utf-8')
+                else:
+                    log_content = self.output_text.get('1.0', tk.END)
                 with open(file_path, 'w', encoding='utf-8') as f:
                     f.write(log_content)
                 self.log_message(f"日志已保存到: {file_path}")
@@ -508,6 +825,12 @@ Crawl4AI 网页爬取工具使用说明
 - Firefox: 适合某些特殊网站
 - Webkit: 轻量级选择
 - 无头模式: 后台运行，不显示浏览器窗口
+- 并发页面数: 同一浏览器中同时打开的页面数，网络较慢时调大可明显提速
+- 工作进程数: 大批量时使用多个进程（各自一个浏览器），同一网站的网址分给同一进程
+- 单站点并发数 / 站点每秒请求数 / 站点请求间隔: 同一网站同时打开的页面数、每秒最多发出的请求数（0为不限）和两次请求的最小间隔，网址在不同网站之间轮流处理，避免集中访问一个网站被限流
+- 失败重试次数: 超时、429、5xx 等暂时性失败自动重试（间隔逐次加长，遵守服务器的 Retry-After）；同一网站连续失败时暂停访问，多次仍失败则跳过该网站剩余的网址
+- 单页超时 / 总时限: 单个网址超时后取消并重试；到达总时限或点击“停止”时立即取消正在爬取的页面，可之后继续
+- 缓存模式: enabled 复用24小时内爬过的相同页面；write_only 强制刷新；bypass 不使用缓存
 
 🔍 内容过滤：
 - 无过滤: 保留网页原始内容
@@ -523,7 +846,20 @@ Crawl4AI 网页爬取工具使用说明
 📋 批量处理：
 - 每行输入一个网址
 - 支持从文件加载和保存URL列表
-- 会按顺序依次处理所有网址
+- 从文件加载时界面只显示网址数量和前20个网址，爬取时逐行读取，百万行的列表也不会卡顿
+- 重复的网址（http/https、末尾斜杠、#片段、utm_等跟踪参数不同）只爬取一次，合并列表保存在 collapsed_urls.json
+- 勾选“增量爬取”后，自上次爬取以来未变化的页面会被跳过
+- 任务中断（关闭程序、断电）后，点击“继续上次任务”可跳过已完成的网址
+- 按“并发页面数”同时处理多个网址（设为1即逐个处理）
+- “结果列表”页每个网址一行，显示状态、耗时、大小、重试次数和输出文件；点击列标题排序，可按状态和网址筛选
+- 日志区只保留最近的行数（可调整），完整日志保存在 logs 目录
+- 每次爬取结束时日志中显示各阶段耗时（p50/p95/p99），输出目录中的 metrics.prom 为 Prometheus 格式的完整指标，events.jsonl 为逐条进度事件
+- 截图可保存为 WebP/JPEG（可调质量）、限制最大宽高、只保留首屏，并可另存缩略图（需要安装 Pillow），转换在后台线程中进行
+- 勾选“相同内容只保存一份”后，内容相同的 Markdown、PDF 和截图在磁盘上只占一份空间（硬链接），再次爬取时未变化的文件不会重写
+- 勾选“性能分析”后记录 Python 代码的耗时，结束时日志中列出最耗时的函数，完整数据保存为输出目录中的 profile.pstats 和 profile.collapsed（火焰图）；会拖慢爬取，只在排查问题时开启
+- 输出目录中的 manifest.db（SQLite）记录每个网址的状态和输出文件（路径、大小、SHA-256），可用 python crawl_utility.py manifest 查询；文件布局选 hashed 时按网址哈希分层存放（markdown/ab/cd/哈希.md），不会重名，单个目录的文件也不会过多
+- 保存方式选 sqlite 时 Markdown 和信息写入输出目录中的 results.db（每个网址一行），百万级任务不再产生大量小文件，下游按顺序读取一张表即可；PDF 和截图仍为单独的文件
+- 保存方式选 archive 时原始 HTML、Markdown 和信息压缩写入输出目录 archive 下滚动的 WARC 归档（安装 zstandard 时用 zstd，否则用 gzip），体积通常只有原来的几分之一到十分之一；按网址读取时只解压该网址的记录：python crawl_utility.py archive 输出目录 --lookup 网址
 
 ⚠️ 注意事项：
 - 首次运行可能需要下载浏览器组件
@@ -578,12 +914,19 @@ Crawl4AI 网页爬取工具使用说明
             messagebox.showwarning("警告", "爬取任务正在运行中...")
             return
         
+        if self.url_file_loading is not None:
+            messagebox.showwarning("警告", "网址文件正在读取中，请稍候...")
+            return
+        
         # 验证输入
         url = self.url_var.get().strip()
-        batch_urls = self.batch_text.get('1.0', tk.END).strip().split('\n')
-        batch_urls = [u.strip() for u in batch_urls if u.strip()]
+        if self.url_file is not None:
+            batch_urls = []
+        else:
+            batch_urls = self.batch_text.get('1.0', tk.END).strip().split('\n')
+            batch_urls = [u.strip() for u in batch_urls if u.strip()]
         
-        if not url and not batch_urls:
+        if not url and not batch_urls and not (self.url_file is not None and len(self.url_file)):
             messagebox.showerror("错误", "请输入至少一个有效的网址")
             return
         
@@ -598,184 +941,740 @@ Crawl4AI 网页爬取工具使用说明
             messagebox.showerror("错误", "使用关键词过滤时必须输入关键词")
             return
         
-        # 准备URL列表
-        urls_to_process = []
-        if url:
-            urls_to_process.append(url)
-        urls_to_process.extend(batch_urls)
+        # 准备网址来源：单个网址和输入框中的网址在前，已加载的网址文件在后
+        head_urls = ([url] if url else []) + batch_urls
+        if self.url_file is not None:
+            source = self.url_file.with_head(head_urls)
+        else:
+            source = UrlSource(urls=head_urls)
         
-        # 启动爬取任务
+        self.launch_crawling(source, self.collect_settings())
+    
+    def resume_crawling(self):
+        """继续上次中断的批量任务"""
+        if not CRAWL4AI_AVAILABLE:
+            self.show_dependency_error()
+            return
+        
+        if self.is_running:
+            messagebox.showwarning("警告", "爬取任务正在运行中...")
+            return
+        
+        # 读取上次任务保存的配置；网址列表较大，在爬取线程中扫描
+        journal_dir = Path(self.output_dir_var.get()) / ".journal"
+        source = journal_dir / "urls.txt"
+        try:
+            if not source.exists():
+                raise FileNotFoundError(source)
+            with open(journal_dir / "settings.json", 'r', encoding='utf-8') as f:
+                settings = json.load(f)
+        except FileNotFoundError:
+            messagebox.showinfo("提示", "输出目录中没有可以继续的批量任务")
+            return
+        
+        self.launch_crawling(source, settings, resume=True)
+    
+    def launch_crawling(self, urls, settings, resume=False):
+        """启动爬取任务，urls 为 UrlSource 或网址文件路径（在爬取线程中扫描）"""
         self.is_running = True
         self.start_btn.config(state="disabled")
+        self.resume_btn.config(state="disabled")
         self.stop_btn.config(state="normal")
         self.progress_bar.start()
+        self.results_table.clear()
         
         # 在新线程中运行异步任务
         threading.Thread(target=self.run_crawling_task, 
-                        args=(urls_to_process,), daemon=True).start()
+                        args=(urls, settings, resume), daemon=True).start()
     
-    def run_crawling_task(self, urls):
+    def collect_settings(self):
+        """收集当前界面配置，返回可在进程间传递的普通字典"""
+        return {
+            "output_dir": self.output_dir_var.get(),
+            "browser_type": self.browser_type_var.get(),
+            "headless": self.headless_var.get(),
+            "viewport_width": self.viewport_width_var.get(),
+            "viewport_height": self.viewport_height_var.get(),
+            "concurrency": max(1, self.concurrency_var.get()),
+            "workers": max(1, self.workers_var.get()),
+            "per_host": max(1, self.per_host_var.get()),
+            "host_rate": max(0.0, self.host_rate_var.get()),
+            "crawl_delay": max(0.0, self.crawl_delay_var.get()),
+            "retries": max(0, self.retries_var.get()),
+            "url_timeout": max(1, self.url_timeout_var.get()),
+            "deadline": max(0, self.deadline_var.get()),
+            "cache_mode": self.cache_mode_var.get(),
+            "filter_type": self.filter_type_var.get(),
+            "keywords": self.keywords_var.get().strip(),
+            "export_markdown": self.export_markdown_var.get(),
+            "export_pdf": self.export_pdf_var.get(),
+            "export_screenshot": self.export_screenshot_var.get(),
+            "export_info": self.export_info_var.get(),
+            "screenshot_format": self.screenshot_format_var.get(),
+            "screenshot_quality": min(100, max(1, self.screenshot_quality_var.get())),
+            "screenshot_max_width": max(0, self.screenshot_max_width_var.get()),
+            "screenshot_max_height": max(0, self.screenshot_max_height_var.get()),
+            "screenshot_thumbnail": max(0, self.screenshot_thumbnail_var.get()),
+            "screenshot_viewport_only": self.screenshot_viewport_only_var.get(),
+            "dedup": self.dedup_var.get(),
+            "layout": self.layout_var.get(),
+            "sink": self.sink_var.get(),
+            "incremental": self.incremental_var.get(),
+            "profile": self.profile_var.get()
+        }
+    
+    def run_crawling_task(self, urls, settings, resume=False):
         """运行爬取任务"""
         try:
+            if not isinstance(urls, UrlSource):
+                urls = UrlSource(urls)
+            
             # 创建新的事件循环
             loop = asyncio.new_event_loop()
             asyncio.set_event_loop(loop)
             
             # 运行异步爬取
-            loop.run_until_complete(self.async_crawl_urls(urls))
+            loop.run_until_complete(self.async_crawl_urls(urls, settings, resume))
             
         except Exception as e:
-            self.output_queue.put(f"❌ 爬取任务异常: {str(e)}")
+            self.events.emit(ERROR, message=f"爬取任务异常: {str(e)}")
         finally:
-            # 恢复UI状态
-            self.root.after(0, self.crawling_finished)
+            # 界面线程收到任务结束事件后恢复UI状态
+            self.events.emit(TASK_FINISHED)
+            self.batcher.flush()
     
-    async def async_crawl_urls(self, urls):
-        """异步爬取URL列表"""
-        self.output_queue.put(f"🚀 开始爬取 {len(urls)} 个网址...")
+    async def async_crawl_urls(self, source, settings, resume=False):
+        """异步爬取网址来源（UrlSource），resume 为 True 时跳过任务日志中已完成的网址
         
-        # 创建输出目录
-        output_dir = Path(self.output_dir_var.get())
-        output_dir.mkdir(exist_ok=True)
-        
-        # 创建子目录
-        if self.export_markdown_var.get():
-            (output_dir / "markdown").mkdir(exist_ok=True)
-        if self.export_pdf_var.get():
-            (output_dir / "pdf").mkdir(exist_ok=True)
-        if self.export_screenshot_var.get():
-            (output_dir / "screenshots").mkdir(exist_ok=True)
-        if self.export_info_var.get():
-            (output_dir / "info").mkdir(exist_ok=True)
-        
-        # 配置浏览器
-        browser_config = BrowserConfig(
-            browser_type=self.browser_type_var.get(),
-            headless=self.headless_var.get(),
-            viewport_width=self.viewport_width_var.get(),
-            viewport_height=self.viewport_height_var.get()
-        )
+        进度事件同时写入输出目录中的 events.jsonl（每行一个事件）。
+        """
+        self.events.emit(LOG, message=f"🚀 开始爬取 {len(source)} 个网址...")
         
-        # 配置内容过滤
-        content_filter = None
-        if self.filter_type_var.get() == "pruning":
-            content_filter = PruningContentFilter()
-        elif self.filter_type_var.get() == "bm25":
-            keywords = self.keywords_var.get().strip()
-            content_filter = BM25ContentFilter(user_query=keywords)
-        
-        # 配置爬虫运行参数
-        run_config = CrawlerRunConfig(
-            cache_mode=CacheMode.BYPASS,
-            content_filter=content_filter,
-            pdf=self.export_pdf_var.get(),
-            screenshot=self.export_screenshot_var.get(),
-            markdown_generator=DefaultMarkdownGenerator(
-                options={"ignore_links": True, "ignore_images": True}
-            ) if content_filter else None
-        )
+        # 创建输出目录
+        output_dir = prepare_output_dirs(settings)
+        if not resume:
+            (output_dir / "events.jsonl").unlink(missing_ok=True)
+        event_log = JsonlReport(output_dir / "events.jsonl")
+        handler = self.events.subscribe(lambda event: event_log.write(event.to_dict()))
+        
+        # 输出清单：记录每个网址的状态和输出文件（工作进程的事件也会转发到这里）
+        manifest = OutputManifest(output_dir / MANIFEST_NAME)
+        self.events.subscribe(manifest.on_event)
+        
+        # 爬取期间定时把攒下的事件交给界面线程
+        flusher = asyncio.ensure_future(self.batcher.run())
+        try:
+            await self.crawl_pending(source, settings, resume, output_dir)
+        finally:
+            flusher.cancel()
+            self.batcher.flush()
+            self.events.unsubscribe(handler)
+            self.events.unsubscribe(manifest.on_event)
+            event_log.close()
+            manifest.close()
+    
+    async def crawl_pending(self, source, settings, resume, output_dir):
+        """读取或保存任务日志，爬取尚未完成的网址并输出统计"""
+        log = lambda message: self.events.emit(LOG, message=message)
+        
+        # 任务日志：保存网址列表和配置，每完成一个网址追加一条记录
+        journal_dir = output_dir / ".journal"
+        completed = {}
+        if resume:
+            completed = BatchJournal.load_completed(journal_dir, source, prefix="journal")
+            # 结果库和归档索引按批写入，中断前最后一批可能没有写入，这些网址重新爬取
+            if settings.get("sink") in ("sqlite", "archive"):
+                if settings["sink"] == "sqlite":
+                    sink = ResultSink(output_dir / SINK_NAME)
+                else:
+                    sink = CrawlArchive(output_dir / ARCHIVE_DIR)
+                dropped = sink.drop_unsaved(completed)
+                await sink.close()
+                if dropped:
+                    log(f"🗃️ 结果库中缺少 {dropped} 个网址的记录，重新爬取")
+            log(f"⏩ 继续上次任务，跳过已完成的 {len(completed)} 个网址")
+        else:
+            # 先保存列表：写出时才能找出直接输入的网址与网址文件之间的重复
+            saved = save_batch_state(journal_dir, source, settings)
+            report_collapsed_urls(output_dir, source, log)
+            source = saved
+        skip = set(completed)
+        # 总时限从本次启动开始计算，不写入保存的配置
+        deadline_at = time.time() + settings["deadline"] * 60 if settings.get("deadline") else None
+        settings = {**settings, "journal_dir": str(journal_dir), "deadline_at": deadline_at}
         
         # 统计信息
-        success_count = 0
-        total_count = len(urls)
+        total_count = len(source)
+        skipped_count = len(skip)
+        self.events.emit(TASK_STARTED, total=total_count, skipped=skipped_count)
+        
+        # 之前已完成的网址也显示在结果列表中（不计入本次的进度）
+        if completed:
+            for i, url in source:
+                result = completed.get(i)
+                if result is not None:
+                    self.events.emit(URL_FINISHED, i, url, status=result.get("status", "success"),
+                                     retries=result.get("retries", 0), files=result.get("files", []),
+                                     resumed=True)
+        
+        if settings["concurrency"] > 1:
+            log(f"⚡ 并发页面数: {settings['concurrency']}")
+        if settings["export_screenshot"] and missing_pillow(screenshot_options(settings)):
+            log("⚠️ 未安装 Pillow，截图按原始 PNG 保存（pip install pillow）")
+        
+        # 多进程时按主机分配网址，同一站点始终由同一个进程处理
+        metrics = CrawlMetrics()
+        shards = []
+        if settings["workers"] > 1:
+            host_counts = Counter(url_host(url) for _, url in iter_pending(source, skip))
+            shards = shard_hosts(host_counts, settings["workers"])
+        
+        # 性能分析：多进程时各工作进程分别记录，结束后合并
+        profiler = None
+        shard_profilers = []
+        if settings.get("profile"):
+            profiler = CrawlProfiler()
+            profiler.start()
+            log("🔬 已开启性能分析")
         
-        async with AsyncWebCrawler(config=browser_config) as crawler:
-            for i, url in enumerate(urls, 1):
-                if not self.is_running:  # 检查是否被停止
-                    self.output_queue.put("⏹️ 爬取已停止")
-                    break
+        try:
+            if len(shards) > 1:
+                log(f"🧩 使用 {len(shards)} 个工作进程")
+                success_count, done_count = await self.crawl_with_workers(source, skip, shards, settings, metrics,
+                                                                          shard_profilers)
+            else:
+                success_count, done_count = await crawl_url_list(
+                    iter_pending(source, skip), settings, total_count,
+                    self.events, lambda: not self.is_running, metrics
+                )
+        finally:
+            if profiler is not None:
+                profiler.stop()
+        
+        if not self.is_running:
+            log("⏹️ 爬取已停止")
+        
+        # 完成总结
+        log(f"\n🎉 爬取完成！")
+        log(f"   总计: {total_count} 个网址")
+        if skipped_count:
+            log(f"   之前已完成: {skipped_count} 个")
+        log(f"   成功: {success_count} 个")
+        log(f"   失败: {done_count - success_count} 个")
+        if skipped_count + done_count < total_count:
+            log(f"   未处理: {total_count - skipped_count - done_count} 个")
+        log(f"   输出目录: {output_dir}")
+        
+        # 性能指标：各阶段耗时写入日志，完整指标保存为 Prometheus 文本文件
+        metrics.write_prometheus(output_dir / "metrics.prom")
+        log("⏱️ 各阶段耗时:")
+        for line in metrics.summary_lines():
+            log(line)
+        
+        # 性能分析：最耗时的函数写入日志，完整数据保存在输出目录中
+        if profiler is not None:
+            for shard_profiler in shard_profilers:
+                profiler.merge(shard_profiler)
+            profiler.save(output_dir)
+            log("🔬 自身耗时最多的函数:")
+            for line in profiler.summary_lines():
+                log(line)
+            log(f"   完整数据: {output_dir / 'profile.pstats'}，火焰图数据: {output_dir / 'profile.collapsed'}")
+    
+    async def crawl_with_workers(self, source, skip, shards, settings, metrics, profilers):
+        """在多个工作进程中爬取，shards 为各进程负责的主机集合，各进程的性能指标合并到 metrics，
+        开启性能分析时各进程的分析数据追加到 profilers 列表，返回 (成功数, 完成数)"""
+        loop = asyncio.get_running_loop()
+        
+        with multiprocessing.Manager() as manager:
+            message_queue = manager.Queue()
+            stop_event = manager.Event()
+            
+            with ProcessPoolExecutor(max_workers=len(shards)) as executor:
+                gathered = asyncio.gather(*(
+                    loop.run_in_executor(executor, run_crawl_shard, source, skip, hosts, settings,
+                                         message_queue, stop_event)
+                    for hosts in shards
+                ))
                 
-                self.output_queue.put(f"\n📄 [{i}/{total_count}] 处理: {url}")
-                self.root.after(0, lambda: self.update_status(f"处理 {i}/{total_count}: {url[:50]}..."))
+                # 转发工作进程的进度事件，并把停止请求传给工作进程
+                while True:
+                    if not self.is_running:
+                        stop_event.set()
+                    try:
+                        while True:
+                            for event in message_queue.get_nowait():
+                                self.events.publish(event)
+                    except queue.Empty:
+                        pass
+                    if gathered.done():
+                        break
+                    await asyncio.sleep(0.1)
                 
-                try:
-                    result = await crawler.arun(url=url, config=run_config)
-                    
-                    if result.success:
-                        success_count += 1
-                        self.output_queue.put(f"✅ 爬取成功")
-                        
-                        # 生成文件名前缀
-                        safe_url = url.replace("https://", "").replace("http://", "").replace("/", "_")
-                        if len(safe_url) > 50:
-                            safe_url = safe_url[:50]
-                        filename_prefix = f"{i:03d}_{safe_url}"
-                        
-                        # 保存Markdown
-                        if self.export_markdown_var.get():
-                            md_file = output_dir / "markdown" / f"{filename_prefix}.md"
-                            with open(md_file, 'w', encoding='utf-8') as f:
-                                f.write(result.markdown)
-                            self.output_queue.put(f"   📄 Markdown已保存: {md_file.name}")
-                        
-                        # 保存PDF
-                        if self.export_pdf_var.get() and result.pdf:
-                            pdf_file = output_dir / "pdf" / f"{filename_prefix}.pdf"
-                            with open(pdf_file, 'wb') as f:
-                                f.write(result.pdf)
-                            self.output_queue.put(f"   📑 PDF已保存: {pdf_file.name} ({len(result.pdf)/1024:.1f}KB)")
-                        
-                        # 保存截图
-                        if self.export_screenshot_var.get() and result.screenshot:
-                            try:
-                                screenshot_data = base64.b64decode(result.screenshot)
-                                screenshot_file = output_dir / "screenshots" / f"{filename_prefix}.png"
-                                with open(screenshot_file, 'wb') as f:
-                                    f.write(screenshot_data)
-                                self.output_queue.put(f"   📸 截图已保存: {screenshot_file.name} ({len(screenshot_data)/1024/1024:.1f}MB)")
-                            except Exception as e:
-                                self.output_queue.put(f"   ❌ 截图保存失败: {str(e)}")
-                        
-                        # 保存信息
-                        if self.export_info_var.get():
-                            info = {
-                                "url": result.url,
-                                "title": getattr(result, 'title', 'N/A'),
-                                "content_length": len(result.markdown),
-                                "word_count": len(result.markdown.split()),
-                                "links": {
-                                    "internal": len(result.links.get('internal', [])),
-                                    "external": len(result.links.get('external', []))
-                                } if result.links else {"internal": 0, "external": 0},
-                                "images": len(result.media.get('images', [])) if result.media else 0,
-                                "extract_time": datetime.now().isoformat()
-                            }
-                            
-                            info_file = output_dir / "info" / f"{filename_prefix}_info.json"
-                            with open(info_file, 'w', encoding='utf-8') as f:
-                                json.dump(info, f, ensure_ascii=False, indent=2)
-                            self.output_queue.put(f"   ℹ️ 信息已保存: {info_file.name}")
-                        
-                        # 显示内容统计
-                        self.output_queue.put(f"   📊 内容长度: {len(result.markdown)} 字符")
-                        
-                    else:
-                        self.output_queue.put(f"❌ 爬取失败: {result.error_message}")
-                        
-                except Exception as e:
-                    self.output_queue.put(f"❌ 处理异常: {str(e)}")
+                counts = gathered.result()
         
-        # 完成总结
-        self.output_queue.put(f"\n🎉 爬取完成！")
-        self.output_queue.put(f"   总计: {total_count} 个网址")
-        self.output_queue.put(f"   成功: {success_count} 个")
-        self.output_queue.put(f"   失败: {total_count - success_count} 个")
-        self.output_queue.put(f"   输出目录: {output_dir}")
+        for _, _, shard_metrics, shard_profiler in counts:
+            metrics.merge(shard_metrics)
+            if shard_profiler is not None:
+                profilers.append(shard_profiler)
+        return sum(c[0] for c in counts), sum(c[1] for c in counts)
     
     def stop_crawling(self):
         """停止爬取"""
         if messagebox.askyesno("确认", "确定要停止当前的爬取任务吗？"):
             self.is_running = False
-            self.output_queue.put("⏹️ 正在停止爬取任务...")
+            self.log_message("⏹️ 正在停止爬取任务，取消正在爬取的页面...")
     
     def crawling_finished(self):
         """爬取完成后的UI更新"""
         self.is_running = False
         self.start_btn.config(state="normal")
+        self.resume_btn.config(state="normal")
         self.stop_btn.config(state="disabled")
         self.progress_bar.stop()
         self.update_status("就绪")
 
+# 输出文件在日志中的显示格式
+OUTPUT_MESSAGES = {
+    "markdown": "   📄 Markdown已保存: {name}",
+    "pdf": "   📑 PDF已保存: {name} ({size:.1f}KB)",
+    "screenshot": "   📸 截图已保存: {name} ({mb:.1f}MB)",
+    "thumbnail": "   🖼️ 缩略图已保存: {name} ({size:.1f}KB)",
+    "info": "   ℹ️ 信息已保存: {name}",
+    "archive": "   🗜️ 已归档: {name} ({size:.1f}KB)",
+}
+
+def format_event(event):
+    """把进度事件转换为日志区中显示的文字，不需要显示的事件返回 None
+    
+    同一网址的输出文件和错误在完成时整块显示，不单独显示文件和带序号的错误事件。
+    """
+    if event.kind == LOG:
+        return event.get("message")
+    if event.kind == ERROR:
+        return f"❌ {event.get('message')}" if event.index is None else None
+    
+    position = f"[{event.index}/{event.get('total')}]"
+    if event.kind == URL_STARTED:
+        return f"\n📄 {position} 处理: {event.url}"
+    if event.kind == URL_RETRY:
+        return f"🔁 {position} 稍后第 {event.get('attempt')} 次重试 {event.url}: {event.get('reason')}"
+    if event.kind != URL_FINISHED or event.get("resumed"):
+        return None
+    
+    lines = [f"\n📌 {position} 完成: {event.url}"]
+    status = event.get("status")
+    if status == "unchanged":
+        lines.append(f"⏸️ 页面未变化，沿用上次的 {len(event.get('files', []))} 个文件")
+    elif status == "cached":
+        lines.append("♻️ 使用缓存结果")
+    elif status == "success":
+        lines.append("✅ 爬取成功")
+    for output in event.get("outputs", []):
+        size = output["bytes"] or 0
+        lines.append(OUTPUT_MESSAGES.get(output["kind"], "   💾 已保存: {name}").format(
+            name=Path(output["path"]).name, size=size / 1024, mb=size / 1024 / 1024))
+    lines.extend(f"❌ {message}" for message in event.get("errors", []))
+    if event.get("retries"):
+        lines.append(f"   🔁 共重试 {event.get('retries')} 次")
+    if event.get("content_length") is not None:
+        lines.append(f"   📊 内容长度: {event.get('content_length')} 字符")
+    return "\n".join(lines)
+
+def result_row(event):
+    """把进度事件转换为结果列表中一行的更新，与网址无关的事件返回 None"""
+    if event.kind == URL_STARTED:
+        return {"index": event.index, "url": event.url, "status": "running", "retries": event.get("attempt")}
+    if event.kind == URL_RETRY:
+        return {"index": event.index, "url": event.url, "status": "retrying",
+                "elapsed": event.get("elapsed"), "retries": event.get("attempt")}
+    if event.kind == URL_FINISHED:
+        return {"index": event.index, "url": event.url, "status": event.get("status"),
+                "elapsed": event.get("elapsed"), "bytes": event.get("bytes"),
+                "retries": event.get("retries"), "files": event.get("files", [])}
+    return None
+
+def prepare_output_dirs(settings):
+    """按导出选项创建输出目录，返回输出根目录"""
+    output_dir = Path(settings["output_dir"])
+    output_dir.mkdir(exist_ok=True)
+    
+    # 创建子目录（Markdown 和信息写入结果库时不需要单独的目录）
+    files = settings.get("sink", "files") == "files"
+    if settings["export_markdown"] and files:
+        (output_dir / "markdown").mkdir(exist_ok=True)
+    if settings["export_pdf"]:
+        (output_dir / "pdf").mkdir(exist_ok=True)
+    if settings["export_screenshot"]:
+        (output_dir / "screenshots").mkdir(exist_ok=True)
+    if settings["export_info"] and files:
+        (output_dir / "info").mkdir(exist_ok=True)
+    
+    return output_dir
+
+def report_collapsed_urls(output_dir, source, log):
+    """输出被合并的重复网址：日志中列出前几个，完整列表保存到 collapsed_urls.json"""
+    collapsed = source.collapsed()
+    if not collapsed:
+        return
+    
+    log(f"🔁 合并了 {len(collapsed)} 个重复网址，实际爬取 {source.unique_count} 个")
+    for entry in collapsed[:URL_PREVIEW_LINES]:
+        log(f"   {entry['url']} → {entry['kept']}")
+    
+    collapsed_file = Path(output_dir) / "collapsed_urls.json"
+    with open(collapsed_file, 'w', encoding='utf-8') as f:
+        json.dump(collapsed, f, ensure_ascii=False, indent=2)
+    if len(collapsed) > URL_PREVIEW_LINES:
+        log(f"   ... 完整列表见 {collapsed_file}")
+
+def save_batch_state(journal_dir, source, settings):
+    """保存批量任务的网址列表和配置并清空旧日志，供“继续上次任务”使用
+    
+    网址逐行写出，返回指向保存副本的 UrlSource，本次爬取和继续任务读取同一份列表。
+    写出时沿用已有的偏移索引和重复记录，不再重新扫描网址文件。
+    """
+    journal_dir = Path(journal_dir)
+    journal_dir.mkdir(parents=True, exist_ok=True)
+    BatchJournal.clear(journal_dir, prefix="journal")
+    
+    saved = source.save(journal_dir / "urls.txt")
+    with open(journal_dir / "settings.json", 'w', encoding='utf-8') as f:
+        json.dump(settings, f, ensure_ascii=False, indent=2)
+    
+    return saved
+
+def build_crawl_configs(settings):
+    """根据界面配置创建浏览器配置和爬虫运行参数"""
+    # 配置浏览器
+    browser_config = BrowserConfig(
+        browser_type=settings["browser_type"],
+        headless=settings["headless"],
+        viewport_width=settings["viewport_width"],
+        viewport_height=settings["viewport_height"]
+    )
+    
+    # 配置内容过滤
+    content_filter = None
+    if settings["filter_type"] == "pruning":
+        content_filter = PruningContentFilter()
+    elif settings["filter_type"] == "bm25":
+        content_filter = BM25ContentFilter(user_query=settings["keywords"])
+    
+    # 配置爬虫运行参数
+    run_config = CrawlerRunConfig(
+        cache_mode=CacheMode.BYPASS,
+        content_filter=content_filter,
+        pdf=settings["export_pdf"],
+        screenshot=settings["export_screenshot"],
+        page_timeout=int(settings.get("url_timeout", DEFAULT_URL_TIMEOUT) * 1000),
+        markdown_generator=DefaultMarkdownGenerator(
+            options={"ignore_links": True, "ignore_images": True}
+        ) if content_filter else None
+    )
+    
+    return browser_config, run_config
+
+async def crawl_url_list(indexed_urls, settings, total_count, events, should_stop, metrics):
+    """爬取引擎：在一个浏览器内按并发数处理 (序号, 网址) 序列（可以是迭代器，按需读取）
+    
+    进度以事件形式发到 events（EventBus），事件类型见 crawl_events；
+    各阶段耗时和页面、字节、错误计数记录到 metrics（CrawlMetrics）；
+    should_stop() 返回 True 或到达总时限时取消正在处理的网址并结束。返回 (成功数, 完成数)。
+    """
+    output_dir = Path(settings["output_dir"])
+    browser_config, run_config = build_crawl_configs(settings)
+    
+    # 本地结果缓存：未过期的页面直接复用，不再打开浏览器页面
+    cache_options = {
+        "filter_type": settings["filter_type"],
+        "keywords": settings["keywords"],
+        "pdf": settings["export_pdf"],
+        "screenshot": settings["export_screenshot"]
+    }
+    cache = None
+    if settings["cache_mode"] != "bypass":
+        cache = ResultCache(output_dir / ".cache" / "results.db", settings["cache_mode"])
+    
+    # 增量爬取：按导出配置记录校验信息，未变化的页面不再渲染和导出
+    validators = None
+    if settings["incremental"]:
+        scope = {key: settings[key] for key in (
+            "filter_type", "keywords", "export_markdown", "export_pdf", "export_screenshot", "export_info"
+        )}
+        # 截图转换选项也影响输出文件，默认（原始 PNG）时不写入，与之前记录的校验信息保持一致
+        if settings["export_screenshot"] and needs_processing(screenshot_options(settings)):
+            scope["screenshot_options"] = screenshot_options(settings)
+        # 文件布局和保存方式同理，默认的 flat、files 不写入
+        if settings.get("layout", "flat") != "flat":
+            scope["layout"] = settings["layout"]
+        if settings.get("sink", "files") != "files":
+            scope["sink"] = settings["sink"]
+        scope = json.dumps(scope, sort_keys=True)
+        validators = ValidatorStore(output_dir / ".cache" / "validators.db", scope=scope)
+    
+    # 任务日志：每完成一个网址立即落盘，中断后可以继续
+    journal = None
+    if settings.get("journal_dir"):
+        journal = BatchJournal(settings["journal_dir"], prefix="journal")
+    
+    # 单个页面的时限（秒）
+    url_timeout = settings.get("url_timeout", DEFAULT_URL_TIMEOUT)
+    
+    # 截图的格式、缩放和缩略图选项，“仅首屏”按窗口大小截取
+    shot_options = screenshot_options(settings)
+    viewport = (settings["viewport_width"], settings["viewport_height"])
+    
+    # 文件写入放到线程池，保存大文件时不阻塞其他页面；去重时相同内容只保存一份
+    # 同时记录各文件的哈希，写入输出清单
+    store = ContentStore(output_dir / ".store", metrics) if settings.get("dedup") else None
+    writer = AsyncFileWriter(metrics=metrics, store=store)
+    
+    # 结果库：Markdown 和信息记录写入 results.db，不再每个网址单独保存文件
+    sink = ResultSink(output_dir / SINK_NAME, metrics=metrics) if settings.get("sink") == "sqlite" else None
+    
+    # 压缩归档：连同原始 HTML 写入 archive 目录下滚动的 WARC 文件
+    archive = CrawlArchive(output_dir / ARCHIVE_DIR, metrics=metrics) if settings.get("sink") == "archive" else None
+    
+    # 同一网址同时被处理多次时只爬取一次
+    inflight = SingleFlight()
+    
+    success_count = 0
+    done_count = 0
+    
+    # 并发控制：同一个浏览器内最多同时处理 concurrency 个页面，网址按站点排队、
+    # 在站点之间轮转派发，同一站点受单站点并发数、每秒请求数和请求间隔限制；
+    # 暂时性失败放回队列退避重试，连续失败的站点熔断
+    scheduler = HostScheduler(settings["concurrency"], settings.get("per_host"),
+                              rate=settings.get("host_rate") or None, crawl_delay=settings.get("crawl_delay", 0),
+                              retry=RetryPolicy(settings.get("retries", 2)), breaker=CircuitBreaker())
+    
+    async def process_url(crawler, i, url, slot):
+        """处理单个网址（受并发数限制）"""
+        nonlocal success_count
+        
+        # 同一网址的输出文件和错误随完成事件一起发出，显示时整块输出，避免并发时相互穿插
+        outputs = []
+        digests = {}  # 写入线程计算的文件哈希 {路径: SHA-256}
+        errors = []
+        succeeded = False
+        status = "failed"
+        result = None
+        error = None
+        started = time.monotonic()
+        
+        if should_stop():  # 检查是否被停止
+            return
+        
+        def finish(files):
+            """记录任务日志并发出完成事件"""
+            nonlocal done_count
+            done_count += 1
+            metrics.count("pages", status)
+            if journal is not None:
+                journal.record(i, url, {"success": succeeded, "status": status, "files": files,
+                                        "retries": slot.attempt})
+            events.emit(URL_FINISHED, i, url, status=status, elapsed=time.monotonic() - started,
+                        bytes=sum(output["bytes"] for output in outputs), retries=slot.attempt,
+                        files=files, outputs=outputs, errors=errors, total=total_count,
+                        content_length=len(result.markdown) if succeeded and result is not None else None)
+        
+        def fail(message):
+            errors.append(message)
+            events.emit(ERROR, i, url, message=message)
+        
+        def written(kind, path, size):
+            """记录一个已写入的输出文件并发出文件事件"""
+            outputs.append({"kind": kind, "path": str(path), "bytes": size, "sha256": digests.get(str(path))})
+            events.emit(FILE_WRITTEN, i, url, file_kind=kind, path=str(path), bytes=size)
+        
+        async def save(kind, path, write, *args):
+            """写入一个输出文件"""
+            written(kind, path, await write(path, *args, digests=digests))
+        
+        if slot.circuit_open:
+            metrics.count("errors", "circuit_open")
+            fail("站点连续失败已熔断，跳过")
+        else:
+            events.emit(URL_STARTED, i, url, attempt=slot.attempt, total=total_count)
+        
+        try:
+            if slot.circuit_open:
+                previous = None
+            elif validators is not None:
+                with metrics.timer("validate"):
+                    previous = await validators.check_unchanged(url)
+            else:
+                previous = None
+            if previous is not None:
+                success_count += 1
+                succeeded = True
+                status = "unchanged"
+                finish(previous["files"])
+                return
+        
+            async def fetch():
+                if cache is not None:
+                    return await cache.arun(crawler, url, run_config, **cache_options)
+                return await crawler.arun(url=url, config=run_config)
+        
+            if not slot.circuit_open:
+                # 超时后取消爬取并关闭页面，按暂时性失败重试
+                fetch_started = time.perf_counter()
+                try:
+                    result = await asyncio.wait_for(
+                        inflight.run(ResultCache.make_key(url, **cache_options), fetch), url_timeout
+                    )
+                finally:
+                    stage = "cache" if getattr(result, 'from_cache', False) else "fetch"
+                    metrics.observe(stage, time.perf_counter() - fetch_started)
+        except asyncio.TimeoutError:
+            error = TimeoutError(f"超过 {url_timeout} 秒未完成")
+        except Exception as e:
+            error = e
+        
+        if error is not None or (result is not None and not result.success):
+            metrics.count("errors", error_type(result, error))
+        
+        # 429、5xx、超时等暂时性失败按退避时间重试，服务器给出 Retry-After 时按其等待
+        if error is not None or (result is not None and is_transient(result)):
+            if slot.retry(retry_after_of(result) if result is not None else None):
+                reason = str(error) if error is not None else (result.error_message or result.status_code)
+                events.emit(URL_RETRY, i, url, attempt=slot.attempt + 1, reason=str(reason),
+                            elapsed=time.monotonic() - started, total=total_count)
+                return
+        elif result is not None:
+            slot.succeed()
+        if error is not None:
+            fail(f"处理异常: {str(error)}")
+        
+        # 页面取回后即归还调度名额，保存文件时其他页面可以继续爬取
+        slot.release()
+        
+        try:
+            if result is None:
+                pass
+            elif result.success:
+                success_count += 1
+                succeeded = True
+                status = "cached" if getattr(result, 'from_cache', False) else "success"
+        
+                # 生成文件名：哈希布局按网址哈希分层存放，否则为“序号_网址”
+                if settings.get("layout") == "hashed":
+                    target = lambda directory, suffix: hashed_path(output_dir / directory, url, suffix)
+                else:
+                    filename_prefix = f"{i:03d}_{flat_name(url)}"
+                    target = lambda directory, suffix: output_dir / directory / f"{filename_prefix}{suffix}"
+        
+                # 保存Markdown（归档时和信息一起写入归档）
+                if settings["export_markdown"] and archive is None:
+                    if sink is not None:
+                        written("markdown", *await sink.write_markdown(url, result.markdown, i))
+                    else:
+                        await save("markdown", target("markdown", ".md"), writer.write_text, result.markdown)
+        
+                # 保存PDF
+                if settings["export_pdf"] and result.pdf:
+                    await save("pdf", target("pdf", ".pdf"), writer.write_bytes, result.pdf)
+        
+                # 保存截图
+                if settings["export_screenshot"] and result.screenshot:
+                    try:
+                        images = await writer.write_screenshot(target("screenshots", ".png"), result.screenshot,
+                                                               shot_options, viewport, digests)
+                        for kind, (path, size) in zip(("screenshot", "thumbnail"), images):
+                            written(kind, path, size)
+                    except Exception as e:
+                        fail(f"截图保存失败: {str(e)}")
+        
+                # 保存信息
+                info = None
+                if settings["export_info"]:
+                    info = {
+                        "url": result.url,
+                        "title": getattr(result, 'title', 'N/A'),
+                        "content_length": len(result.markdown),
+                        "word_count": len(result.markdown.split()),
+                        "links": {
+                            "internal": len(result.links.get('internal', [])),
+                            "external": len(result.links.get('external', []))
+                        } if result.links else {"internal": 0, "external": 0},
+                        "images": len(result.media.get('images', [])) if result.media else 0,
+                        "extract_time": datetime.now().isoformat()
+                    }
+        
+                    if sink is not None:
+                        written("info", *await sink.write_info(url, info, i))
+                    elif archive is None:
+                        await save("info", target("info", "_info.json"), writer.write_json, info)
+        
+                # 压缩归档：原始 HTML、Markdown 和信息作为一组 WARC 记录写入
+                if archive is not None:
+                    written("archive", *await archive.write_page(
+                        url, i, html=getattr(result, 'html', None),
+                        markdown=result.markdown if settings["export_markdown"] else None, metadata=info))
+        
+                if validators is not None:
+                    with metrics.timer("validate"):
+                        await validators.record(url, getattr(result, 'response_headers', None),
+                                                files=[output["path"] for output in outputs])
+        
+            else:
+                fail(f"爬取失败: {result.error_message}")
+        
+        except Exception as e:
+            fail(f"处理异常: {str(e)}")
+        
+        finish([output["path"] for output in outputs])
+
+    try:
+        async with AsyncWebCrawler(config=browser_config) as crawler:
+            await scheduler.run(indexed_urls, lambda i, url, slot: process_url(crawler, i, url, slot),
+                                should_stop, settings.get("deadline_at"))
+        if scheduler.timed_out:
+            events.emit(LOG, message="⏰ 已到总时限，正在处理的网址已取消，可点击“继续上次任务”完成剩余网址")
+    finally:
+        writer.close()
+        if sink is not None:
+            await sink.close()
+        if archive is not None:
+            await archive.close()
+        if journal is not None:
+            journal.close()
+        if cache is not None:
+            cache.close()
+        if validators is not None:
+            validators.close()
+    
+    return success_count, done_count
+
+def run_crawl_shard(source, skip, hosts, settings, message_queue, stop_event):
+    """工作进程入口：用独立的浏览器爬取 hosts 中各主机的网址，进度事件成批通过 message_queue 回传，
+    返回 (成功数, 完成数, 性能指标, 性能分析数据（未开启时为 None）)"""
+    async def crawl_shard():
+        events = EventBus()
+        batcher = events.subscribe(EventBatcher(message_queue.put))
+        flusher = asyncio.ensure_future(batcher.run())
+        try:
+            metrics = CrawlMetrics()
+            success_count, done_count = await crawl_url_list(iter_pending(source, skip, hosts), settings,
+                                                             len(source), events, stop_event.is_set, metrics)
+            return success_count, done_count, metrics
+        finally:
+            flusher.cancel()
+            batcher.flush()
+    
+    profiler = None
+    if settings.get("profile"):
+        profiler = CrawlProfiler()
+        profiler.start()
+    try:
+        success_count, done_count, metrics = asyncio.run(crawl_shard())
+    finally:
+        if profiler is not None:
+            profiler.stop()
+    return success_count, done_count, metrics, profiler
+
 def main():
     """主函数"""
     # 创建主窗口
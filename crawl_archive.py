@@ -0,0 +1,331 @@
+"""
+Crawl4AI 压缩归档
+把每个网址的原始 HTML、Markdown 和信息记录写成 WARC 记录（resource、conversion、metadata），
+压缩后追加到滚动的归档文件中（archive/crawl-时间-进程号-序号.warc.zst，单个文件达到上限后
+换新文件）。文本内容压缩率很高，磁盘占用和传输时间远小于逐个保存的文件。
+
+每个网址的记录单独压缩为一个 zstd 帧或 gzip 成员，index.db（SQLite）记录它所在的文件、
+偏移和长度（按规范网址索引，与输出清单一致）：按网址读取时只解压这一段，不需要解压整个归档。归档文件本身是标准的
+WARC（.warc.gz 可直接交给 warcio 等工具读取）。
+
+安装 zstandard（pip install zstandard）时使用 zstd，否则使用 gzip。
+"""
+
+import asyncio
+import gzip
+import json
+import os
+import sqlite3
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+from urllib.parse import quote, unquote
+
+from crawl_urls import canonicalize_url
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+ARCHIVE_DIR = "archive"
+INDEX_NAME = "index.db"
+
+# 单个归档文件的大小上限（字节），超过后换新文件
+MAX_ARCHIVE_BYTES = 1024 * 1024 * 1024
+
+# 压缩级别
+ZSTD_LEVEL = 9
+GZIP_LEVEL = 6
+
+# 累计多少条索引或多少秒后提交一次
+COMMIT_EVERY = 200
+COMMIT_INTERVAL = 2.0
+
+# 压缩方式 -> 文件扩展名
+EXTENSIONS = {"zstd": ".warc.zst", "gzip": ".warc.gz"}
+
+# 继续任务时每次查询的网址数
+QUERY_CHUNK = 500
+
+
+def default_compression():
+    """已安装 zstandard 时使用 zstd，否则使用 gzip"""
+    return "zstd" if zstandard is not None else "gzip"
+
+
+def _compress(data, compression):
+    if compression == "zstd":
+        return zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(data)
+    return gzip.compress(data, compresslevel=GZIP_LEVEL, mtime=0)
+
+
+def _decompress(data, path):
+    if str(path).endswith(EXTENSIONS["zstd"]):
+        if zstandard is None:
+            raise RuntimeError(f"读取 {Path(path).name} 需要安装 zstandard（pip install zstandard）")
+        return zstandard.ZstdDecompressor().decompress(data)
+    return gzip.decompress(data)
+
+
+def warc_record(record_type, url, content_type, body, date, record_id, related=None):
+    """生成一条 WARC/1.0 记录，related 为 (头名称, 记录ID)"""
+    headers = [
+        ("WARC-Type", record_type),
+        ("WARC-Record-ID", f"<{record_id}>"),
+        ("WARC-Date", date),
+        ("WARC-Target-URI", url),
+    ]
+    if related:
+        headers.append((related[0], f"<{related[1]}>"))
+    headers += [("Content-Type", content_type), ("Content-Length", str(len(body)))]
+    head = "WARC/1.0\r\n" + "".join(f"{name}: {value}\r\n" for name, value in headers) + "\r\n"
+    return head.encode('utf-8') + body + b"\r\n\r\n"
+
+
+def page_records(url, html=None, markdown=None, metadata=None):
+    """一个网址的 WARC 记录：原始 HTML 为 resource，Markdown 为其 conversion，信息为 metadata"""
+    date = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+    main_id = f"urn:uuid:{uuid.uuid4()}"
+    records = []
+    if html is not None:
+        records.append(warc_record("resource", url, "text/html; charset=utf-8",
+                                   str(html).encode('utf-8'), date, main_id))
+    related = ("WARC-Refers-To", main_id) if html is not None else None
+    if markdown is not None:
+        records.append(warc_record("conversion", url, "text/markdown; charset=utf-8",
+                                   str(markdown).encode('utf-8'), date,
+                                   main_id if html is None else f"urn:uuid:{uuid.uuid4()}", related))
+    if metadata is not None:
+        records.append(warc_record("metadata", url, "application/json",
+                                   json.dumps(metadata, ensure_ascii=False).encode('utf-8'), date,
+                                   f"urn:uuid:{uuid.uuid4()}",
+                                   ("WARC-Concurrent-To", main_id) if records else None))
+    return b"".join(records)
+
+
+def parse_records(data):
+    """解析解压后的 WARC 记录，返回 {"html", "markdown", "metadata"} 中存在的部分"""
+    page = {}
+    position = 0
+    while position < len(data):
+        end = data.index(b"\r\n\r\n", position)
+        headers = {}
+        for line in data[position:end].decode('utf-8').split("\r\n")[1:]:
+            name, _, value = line.partition(":")
+            headers[name.strip().lower()] = value.strip()
+        start = end + 4
+        length = int(headers["content-length"])
+        body = data[start:start + length]
+        position = start + length + 4
+
+        record_type = headers.get("warc-type")
+        if record_type == "resource":
+            page["html"] = body.decode('utf-8')
+        elif record_type == "conversion":
+            page["markdown"] = body.decode('utf-8')
+        elif record_type == "metadata":
+            page["metadata"] = json.loads(body)
+    return page
+
+
+class CrawlArchive:
+    """滚动的压缩归档及其索引
+
+    多个工作进程各自写入自己的归档文件（文件名含进程号），共用同一个 index.db。
+    同一网址再次写入时追加新记录并更新索引，旧记录留在原文件中不再被读取。
+    metrics 为 CrawlMetrics 时记录每次写入的耗时（write_archive）和写入的压缩后字节数。
+    """
+
+    def __init__(self, directory, compression=None, max_bytes=MAX_ARCHIVE_BYTES, metrics=None):
+        """打开或创建归档目录（如 outputs/archive），compression 为 zstd 或 gzip，默认按是否安装 zstandard 选择"""
+        self.directory = Path(directory)
+        self.compression = compression or default_compression()
+        if self.compression == "zstd" and zstandard is None:
+            raise RuntimeError("zstd 压缩需要安装 zstandard（pip install zstandard）")
+        self.max_bytes = max_bytes
+        self.metrics = metrics
+        self.prefix = f"crawl-{datetime.now().strftime('%Y%m%d%H%M%S')}-{os.getpid()}"
+        self.serial = 0
+        self.file = None
+        self.file_path = None
+        self.pending = 0
+        self.last_commit = time.monotonic()
+
+        # 归档文件和 SQLite 连接只在这一个线程中使用，追加写入不会交错
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="crawl-archive")
+        self.conn = self.executor.submit(self._connect).result()
+
+    def _connect(self):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(str(self.directory / INDEX_NAME), timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript("""
+            CREATE TABLE IF NOT EXISTS pages (
+                url TEXT PRIMARY KEY,
+                batch_index INTEGER,
+                file TEXT NOT NULL,
+                offset INTEGER NOT NULL,
+                length INTEGER NOT NULL,
+                raw_bytes INTEGER NOT NULL,
+                updated_at REAL NOT NULL
+            );
+        """)
+        conn.commit()
+        return conn
+
+    def locator(self, path, url):
+        """一个网址的归档记录在输出文件列表中的表示：归档文件路径#page:网址（网址经过转义）"""
+        return f"{path}#page:{quote(url, safe='')}"
+
+    async def write_page(self, url, index=None, html=None, markdown=None, metadata=None):
+        """把网址的原始 HTML、Markdown 和信息写入归档，返回 (记录位置, 压缩后的字节数)"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, self._write_page, url, index, html, markdown, metadata)
+
+    def _write_page(self, url, index, html, markdown, metadata):
+        started = time.perf_counter()
+        raw = page_records(url, html, markdown, metadata)
+        data = _compress(raw, self.compression)
+
+        if self.file is None or self.file.tell() + len(data) > self.max_bytes and self.file.tell() > 0:
+            self._roll()
+        offset = self.file.tell()
+        self.file.write(data)
+        self.file.flush()
+
+        self.conn.execute(
+            "INSERT OR REPLACE INTO pages (url, batch_index, file, offset, length, raw_bytes, updated_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (canonicalize_url(url), index, self.file_path.name, offset, len(data), len(raw), time.time())
+        )
+        self.pending += 1
+        if self.pending >= COMMIT_EVERY or time.monotonic() - self.last_commit >= COMMIT_INTERVAL:
+            self._commit()
+
+        if self.metrics is not None:
+            self.metrics.observe("write_archive", time.perf_counter() - started)
+            self.metrics.count("bytes", "warc", len(data))
+        return self.locator(self.file_path, url), len(data)
+
+    def _roll(self):
+        """关闭当前归档文件，开始下一个"""
+        if self.file is not None:
+            self.file.close()
+        self.serial += 1
+        self.file_path = self.directory / f"{self.prefix}-{self.serial:05d}{EXTENSIONS[self.compression]}"
+        self.file = open(self.file_path, 'ab')
+
+    def _commit(self):
+        # 索引提交前先把归档内容写到磁盘，索引不会指向尚未落盘的数据
+        if self.file is not None:
+            os.fsync(self.file.fileno())
+        self.conn.commit()
+        self.pending = 0
+        self.last_commit = time.monotonic()
+
+    def drop_unsaved(self, completed):
+        """从任务日志读出的已完成结果 {序号: 结果} 中去掉索引里没有的网址，返回去掉的数量
+
+        索引按批提交，崩溃前最后一批的网址在索引中找不到，需要重新爬取。
+        """
+        wanted = {}  # 序号 -> 网址
+        for i, result in completed.items():
+            files = result.get("files") or ([result["file"]] if result.get("file") else [])
+            for name in files:
+                path, _, record = name.rpartition("#")
+                if record.startswith("page:") and Path(path).parent == self.directory:
+                    wanted[i] = canonicalize_url(unquote(record[len("page:"):]))
+
+        urls = sorted(set(wanted.values()))
+        archived = self.executor.submit(self._archived, urls).result()
+        unsaved = [i for i, url in wanted.items() if url not in archived]
+        for i in unsaved:
+            del completed[i]
+        return len(unsaved)
+
+    def _archived(self, urls):
+        archived = set()
+        for start in range(0, len(urls), QUERY_CHUNK):
+            chunk = urls[start:start + QUERY_CHUNK]
+            rows = self.conn.execute(
+                f"SELECT url FROM pages WHERE url IN ({', '.join('?' * len(chunk))})", chunk
+            )
+            archived.update(url for url, in rows)
+        return archived
+
+    async def close(self):
+        """提交索引并关闭归档文件"""
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(self.executor, self._close)
+        self.executor.shutdown(wait=True)
+
+    def _close(self):
+        self._commit()
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+        self.conn.close()
+
+
+class ArchiveReader:
+    """按网址读取归档：查索引后只解压该网址的一段"""
+
+    def __init__(self, directory):
+        self.directory = Path(directory)
+        if (self.directory / ARCHIVE_DIR / INDEX_NAME).exists():
+            self.directory = self.directory / ARCHIVE_DIR
+        self.conn = sqlite3.connect(str(self.directory / INDEX_NAME), timeout=30)
+
+    def get(self, url):
+        """读取网址的 {"url", "html", "markdown", "metadata"}（只包含归档了的部分），没有记录时返回 None"""
+        row = self.conn.execute(
+            "SELECT file, offset, length FROM pages WHERE url = ?", (canonicalize_url(url),)
+        ).fetchone()
+        if row is None:
+            return None
+        path = self.directory / row[0]
+        with open(path, 'rb') as f:
+            f.seek(row[1])
+            data = f.read(row[2])
+        return {"url": url, **parse_records(_decompress(data, path))}
+
+    def urls(self):
+        """按写入顺序列出归档中的网址"""
+        return [url for url, in self.conn.execute("SELECT url FROM pages ORDER BY file, offset")]
+
+    def summary(self):
+        """归档汇总：网址数、归档文件数、压缩前后的总大小"""
+        pages, files, compressed, raw = self.conn.execute(
+            "SELECT COUNT(*), COUNT(DISTINCT file), COALESCE(SUM(length), 0), COALESCE(SUM(raw_bytes), 0) FROM pages"
+        ).fetchone()
+        return {"pages": pages, "files": files, "compressed_bytes": compressed, "raw_bytes": raw}
+
+    def close(self):
+        self.conn.close()
+
+
+def print_archive(directory, url=None):
+    """在终端中显示归档汇总，指定 url 时显示该网址的信息和 Markdown"""
+    reader = ArchiveReader(directory)
+    try:
+        if url:
+            page = reader.get(url)
+            if page is None:
+                print(f"❌ 归档中没有该网址: {url}")
+                return
+            if "metadata" in page:
+                print(json.dumps(page["metadata"], ensure_ascii=False, indent=2))
+            print(page.get("markdown", ""))
+            return
+        summary = reader.summary()
+        ratio = summary["raw_bytes"] / summary["compressed_bytes"] if summary["compressed_bytes"] else 0
+        print(f"🗜️ 归档: {reader.directory}")
+        print(f"   网址: {summary['pages']} 个，归档文件 {summary['files']} 个")
+        print(f"   大小: 压缩前 {summary['raw_bytes'] / 1024 / 1024:.1f} MB，"
+              f"压缩后 {summary['compressed_bytes'] / 1024 / 1024:.1f} MB（{ratio:.1f} 倍）")
+    finally:
+        reader.close()
@@ -0,0 +1,172 @@
+"""
+Crawl4AI 本地结果缓存
+按规范化URL和影响输出的配置缓存爬取结果，支持过期时间和总大小上限（LRU淘汰）
+
+缓存模式：
+- enabled: 优先读取缓存，未命中或已过期时爬取并写入缓存
+- read_only: 只读取缓存，不写入
+- write_only: 总是重新爬取，并用新结果刷新缓存
+- bypass: 不使用缓存
+"""
+
+import hashlib
+import json
+import sqlite3
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+from crawl_urls import canonicalize_url
+
+CACHE_MODES = ["enabled", "read_only", "write_only", "bypass"]
+
+DEFAULT_TTL = 24 * 3600
+DEFAULT_MAX_SIZE_MB = 1024
+
+
+class ResultCache:
+    """基于 SQLite 的爬取结果缓存"""
+
+    def __init__(self, path, mode="enabled", ttl=DEFAULT_TTL, max_size_mb=DEFAULT_MAX_SIZE_MB):
+        """初始化缓存，path 为数据库文件路径"""
+        if mode not in CACHE_MODES:
+            raise ValueError(f"未知的缓存模式: {mode}")
+
+        self.path = Path(path)
+        self.mode = mode
+        self.ttl = ttl
+        self.max_size = int(max_size_mb * 1024 * 1024)
+        self.hits = 0
+        self.misses = 0
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        # 多个工作进程可能同时使用同一个缓存库
+        self.conn = sqlite3.connect(str(self.path), timeout=30)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS results (
+                key TEXT PRIMARY KEY,
+                url TEXT NOT NULL,
+                data TEXT NOT NULL,
+                pdf BLOB,
+                size INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                expires_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            )
+        """)
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_results_last_access ON results (last_access)")
+        self.conn.commit()
+
+    @property
+    def readable(self):
+        return self.mode in ("enabled", "read_only")
+
+    @property
+    def writable(self):
+        return self.mode in ("enabled", "write_only")
+
+    @staticmethod
+    def make_key(url, filter_type="none", keywords="", pdf=False, screenshot=False):
+        """由规范化URL和影响输出的配置生成缓存键"""
+        options = {
+            "url": canonicalize_url(url),
+            "filter_type": filter_type,
+            "keywords": keywords if filter_type == "bm25" else "",
+            "pdf": bool(pdf),
+            "screenshot": bool(screenshot)
+        }
+        material = json.dumps(options, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+    def get(self, key):
+        """读取未过期的缓存结果，未命中返回 None"""
+        row = self.conn.execute(
+            "SELECT data, pdf, expires_at FROM results WHERE key = ?", (key,)
+        ).fetchone()
+
+        now = time.time()
+        if row is None or row[2] < now:
+            if row is not None:
+                self.conn.execute("DELETE FROM results WHERE key = ?", (key,))
+                self.conn.commit()
+            self.misses += 1
+            return None
+
+        self.conn.execute("UPDATE results SET last_access = ? WHERE key = ?", (now, key))
+        self.conn.commit()
+        self.hits += 1
+
+        data = json.loads(row[0])
+        return SimpleNamespace(success=True, error_message=None, pdf=row[1], from_cache=True, **data)
+
+    def put(self, key, result):
+        """写入成功的爬取结果，并按大小上限淘汰最久未使用的条目
+
+        原始 HTML、状态码和响应头也一并缓存，命中的结果可以写入压缩归档和增量校验信息。
+        """
+        data = {
+            "url": result.url,
+            "title": getattr(result, 'title', 'N/A'),
+            "markdown": str(result.markdown or ""),
+            "html": getattr(result, 'html', None),
+            "status_code": getattr(result, 'status_code', None),
+            "response_headers": dict(getattr(result, 'response_headers', None) or {}),
+            "screenshot": result.screenshot,
+            "links": result.links or {},
+            "media": result.media or {}
+        }
+        payload = json.dumps(data, ensure_ascii=False)
+        pdf = result.pdf or None
+        size = len(payload.encode("utf-8")) + (len(pdf) if pdf else 0)
+
+        if size > self.max_size:
+            return
+
+        now = time.time()
+        self.conn.execute(
+            "INSERT OR REPLACE INTO results (key, url, data, pdf, size, created_at, expires_at, last_access) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (key, result.url, payload, pdf, size, now, now + self.ttl, now)
+        )
+        self.evict(now)
+        self.conn.commit()
+
+    def evict(self, now=None):
+        """删除过期条目，总大小仍超出上限时按最近访问时间淘汰"""
+        now = now or time.time()
+        self.conn.execute("DELETE FROM results WHERE expires_at < ?", (now,))
+
+        total = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM results").fetchone()[0]
+        if total <= self.max_size:
+            return
+
+        while total > self.max_size:
+            rows = self.conn.execute(
+                "SELECT key, size FROM results ORDER BY last_access LIMIT 100"
+            ).fetchall()
+            if not rows:
+                break
+            for key, size in rows:
+                self.conn.execute("DELETE FROM results WHERE key = ?", (key,))
+                total -= size
+                if total <= self.max_size:
+                    break
+
+    async def arun(self, crawler, url, config=None, **options):
+        """带缓存的 crawler.arun：命中时直接返回缓存结果，options 为 make_key 的配置参数"""
+        key = self.make_key(url, **options)
+
+        if self.readable:
+            cached = self.get(key)
+            if cached is not None:
+                return cached
+
+        result = await crawler.arun(url=url, config=config)
+        if self.writable and result.success:
+            self.put(key, result)
+        return result
+
+    def close(self):
+        """关闭数据库连接"""
+        self.conn.close()
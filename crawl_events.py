@@ -0,0 +1,149 @@
+"""
+Crawl4AI 进度事件
+爬取引擎不再直接输出格式化好的文字，而是发出带时间戳的结构化事件（开始、重试、
+写入文件、出错、完成），由界面、命令行和事件日志文件各自订阅并决定如何显示。
+跨线程、跨进程传递时先攒成批再发送，减少每条消息的开销
+"""
+
+import asyncio
+import time
+from collections import deque
+
+# 事件类型
+TASK_STARTED = "task_started"      # total、skipped
+TASK_FINISHED = "task_finished"
+URL_STARTED = "url_started"        # attempt、total
+URL_RETRY = "url_retry"            # attempt（下一次是第几次重试）、reason、elapsed、total
+URL_FINISHED = "url_finished"      # status、elapsed、bytes、retries、files、outputs、errors、total；
+                                   # resumed 为 True 时是上次任务已完成的网址
+FILE_WRITTEN = "file_written"      # file_kind（markdown、pdf等）、path、bytes
+ERROR = "error"                    # message
+LOG = "log"                        # message
+URL_FILE_SCANNED = "url_file_scanned"  # 界面加载的网址文件扫描完成：path、source、preview 或 error
+
+
+class CrawlEvent:
+    """一个进度事件：类型、时间戳（time.time()）、网址序号和网址，其余字段放在 data 中"""
+
+    __slots__ = ("kind", "time", "index", "url", "data")
+
+    def __init__(self, kind, index=None, url=None, timestamp=None, **data):
+        self.kind = kind
+        self.time = timestamp if timestamp is not None else time.time()
+        self.index = index
+        self.url = url
+        self.data = data
+
+    def get(self, key, default=None):
+        return self.data.get(key, default)
+
+    def to_dict(self):
+        """转换为写入事件日志的字典"""
+        record = {"event": self.kind, "time": round(self.time, 3)}
+        if self.index is not None:
+            record["index"] = self.index
+            record["url"] = self.url
+        record.update(self.data)
+        return record
+
+
+class EventBus:
+    """同步的事件分发：emit 时依次调用所有订阅者，订阅者应尽快返回"""
+
+    def __init__(self):
+        self.handlers = []
+
+    def subscribe(self, handler):
+        """订阅事件，handler(event)；返回 handler 以便之后取消订阅"""
+        self.handlers.append(handler)
+        return handler
+
+    def unsubscribe(self, handler):
+        if handler in self.handlers:
+            self.handlers.remove(handler)
+
+    def emit(self, kind, index=None, url=None, **data):
+        """创建并分发一个事件"""
+        event = CrawlEvent(kind, index, url, **data)
+        self.publish(event)
+        return event
+
+    def publish(self, event):
+        """分发已有的事件（如从工作进程转发来的事件）"""
+        for handler in self.handlers:
+            handler(event)
+
+
+class EventBatcher:
+    """把事件攒成列表再交给 send（如 queue.put），攒满 max_size 个立即发送，
+    其余由 run() 每隔 max_delay 秒发送一次"""
+
+    def __init__(self, send, max_size=500, max_delay=0.1):
+        self.send = send
+        self.max_size = max_size
+        self.max_delay = max_delay
+        self.buffer = []
+
+    def __call__(self, event):
+        self.buffer.append(event)
+        if len(self.buffer) >= self.max_size:
+            self.flush()
+
+    def flush(self):
+        """发送已攒下的事件"""
+        if self.buffer:
+            batch, self.buffer = self.buffer, []
+            self.send(batch)
+
+    async def run(self):
+        """定时发送，在爬取期间作为后台任务运行，结束时取消并再调用一次 flush()"""
+        while True:
+            await asyncio.sleep(self.max_delay)
+            self.flush()
+
+
+class ThroughputStats:
+    """根据事件统计进度和吞吐量，速度按最近 window 秒内完成的网址计算"""
+
+    def __init__(self, total=0, skipped=0, window=30.0):
+        self.total = total
+        self.done = skipped
+        self.succeeded = 0
+        self.failed = 0
+        self.retries = 0
+        self.bytes = 0
+        self.window = window
+        self.recent = deque()  # (完成时间, 写入字节数)
+
+    def __call__(self, event):
+        if event.kind == TASK_STARTED:
+            self.__init__(event.get("total", 0), event.get("skipped", 0), self.window)
+        elif event.kind == URL_RETRY:
+            self.retries += 1
+        elif event.kind == URL_FINISHED and not event.get("resumed"):
+            self.done += 1
+            if event.get("status") in ("success", "cached", "unchanged"):
+                self.succeeded += 1
+            else:
+                self.failed += 1
+            size = event.get("bytes") or 0
+            self.bytes += size
+            self.recent.append((event.time, size))
+
+    def rates(self, now=None):
+        """返回最近时间窗口内的 (网址数/秒, 字节数/秒)"""
+        now = now or time.time()
+        while self.recent and self.recent[0][0] < now - self.window:
+            self.recent.popleft()
+        if not self.recent:
+            return 0.0, 0.0
+        span = max(1.0, min(self.window, now - self.recent[0][0]))
+        return len(self.recent) / span, sum(size for _, size in self.recent) / span
+
+    def summary(self):
+        """状态栏中显示的进度文字"""
+        urls_per_second, bytes_per_second = self.rates()
+        text = f"已完成 {self.done}/{self.total}（成功 {self.succeeded}，失败 {self.failed}）"
+        if urls_per_second:
+            text += f" · {urls_per_second:.2f} 个/秒 · {bytes_per_second / 1024:.0f} KB/秒"
+        return text
@@ -0,0 +1,109 @@
+"""
+Crawl4AI 截图处理
+把浏览器返回的 base64 PNG 截图转换为 WebP/JPEG、按最大宽高缩小、只保留首屏（视口）
+部分，并可另存一张小缩略图。处理在文件写入线程池中执行（见 crawl_writer），不阻塞爬取。
+
+格式转换和缩放需要 Pillow（pip install pillow）；未安装时截图按原始 PNG 保存。
+"""
+
+import base64
+import io
+from pathlib import Path
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+# 截图格式：名称 -> (Pillow 格式名, 文件扩展名)
+SCREENSHOT_FORMATS = {
+    "png": ("PNG", ".png"),
+    "webp": ("WEBP", ".webp"),
+    "jpeg": ("JPEG", ".jpg"),
+}
+
+# 默认截图选项：原始 PNG，不缩放，不生成缩略图
+# max_width、max_height、thumbnail 为 0 表示不限制或不生成
+DEFAULT_SCREENSHOT_OPTIONS = {
+    "format": "png",
+    "quality": 85,
+    "max_width": 0,
+    "max_height": 0,
+    "thumbnail": 0,
+    "viewport_only": False,
+}
+
+# crawl4ai BrowserConfig 的默认视口，未指定视口时用于截取首屏
+DEFAULT_VIEWPORT = (1080, 600)
+
+# 缩略图文件名后缀
+THUMBNAIL_SUFFIX = "_thumb"
+
+
+def screenshot_options(settings, prefix="screenshot_"):
+    """从扁平的配置字典（如界面配置中的 screenshot_format）中取出截图选项"""
+    return {key: settings.get(prefix + key, default) for key, default in DEFAULT_SCREENSHOT_OPTIONS.items()}
+
+
+def needs_processing(options):
+    """截图是否需要解码处理（否则直接保存原始 PNG）"""
+    options = {**DEFAULT_SCREENSHOT_OPTIONS, **(options or {})}
+    return (options["format"] != "png" or options["max_width"] or options["max_height"]
+            or options["thumbnail"] or options["viewport_only"])
+
+
+def missing_pillow(options):
+    """需要处理截图但未安装 Pillow 时返回 True，调用方可提示截图将按原始 PNG 保存"""
+    return Image is None and bool(needs_processing(options))
+
+
+def _encode(image, image_format, quality):
+    """把图像编码为指定格式的字节"""
+    pillow_format = SCREENSHOT_FORMATS[image_format][0]
+    if pillow_format == "JPEG" and image.mode not in ("RGB", "L"):
+        image = image.convert("RGB")
+    buffer = io.BytesIO()
+    if pillow_format == "PNG":
+        image.save(buffer, pillow_format)
+    else:
+        image.save(buffer, pillow_format, quality=quality)
+    return buffer.getvalue()
+
+
+def encode_screenshot(encoded, path, options=None, viewport=None):
+    """解码 base64 截图并按选项转换，返回 [(文件路径, 文件内容)]
+
+    第一项为截图本身（扩展名按格式修改），开启缩略图时第二项为缩略图（文件名加 _thumb）。
+    viewport 为 (宽, 高)，viewport_only 时按视口宽高比截取页面顶部。
+    """
+    data = base64.b64decode(encoded)
+    path = Path(path)
+    options = {**DEFAULT_SCREENSHOT_OPTIONS, **(options or {})}
+    if Image is None or not needs_processing(options):
+        return [(path.with_suffix(".png"), data)]
+
+    image_format = options["format"]
+    suffix = SCREENSHOT_FORMATS[image_format][1]
+    with Image.open(io.BytesIO(data)) as image:
+        image.load()
+
+        # 只保留首屏：截图宽度对应视口宽度，按宽高比换算首屏高度（兼容高分屏的缩放）
+        if options["viewport_only"]:
+            width, height = viewport or DEFAULT_VIEWPORT
+            visible = round(image.width * height / width)
+            if visible < image.height:
+                image = image.crop((0, 0, image.width, visible))
+
+        # 按最大宽高等比缩小，不放大
+        if options["max_width"] or options["max_height"]:
+            image.thumbnail((options["max_width"] or image.width, options["max_height"] or image.height),
+                            Image.LANCZOS)
+
+        outputs = [(path.with_suffix(suffix), _encode(image, image_format, options["quality"]))]
+
+        if options["thumbnail"]:
+            thumbnail = image.copy()
+            thumbnail.thumbnail((options["thumbnail"], options["thumbnail"]), Image.LANCZOS)
+            outputs.append((path.with_name(path.stem + THUMBNAIL_SUFFIX + suffix),
+                            _encode(thumbnail, image_format, options["quality"])))
+    return outputs
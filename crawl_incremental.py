@@ -0,0 +1,188 @@
+"""
+Crawl4AI 增量爬取支持
+记录每个URL上次爬取时的校验信息（ETag、Last-Modified、内容哈希），再次爬取前先发送
+轻量的条件请求，服务器返回 304 或内容哈希未变化时跳过浏览器渲染和文件导出。
+没有任何校验信息的URL不探测，直接完整爬取，避免每个网址多下载一次页面；服务器不提供
+ETag 和 Last-Modified 的页面在完整爬取后取一次原始内容记录哈希，供下次比较。
+"""
+
+import asyncio
+import hashlib
+import json
+import sqlite3
+import time
+import urllib.error
+import urllib.request
+from pathlib import Path
+
+from crawl_urls import canonicalize_url
+
+PROBE_USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"
+
+
+def _header(headers, name):
+    """不区分大小写地读取响应头"""
+    for key, value in (headers or {}).items():
+        if key.lower() == name.lower():
+            return value
+    return None
+
+
+def _output_exists(name):
+    """输出文件是否还在；结果库和归档中的记录（“文件#类型:网址”）检查所在的库文件"""
+    return Path(name).exists() or ("#" in name and Path(name.rpartition("#")[0]).exists())
+
+
+def _probe(url, etag, last_modified, timeout, method="HEAD"):
+    """发送条件请求，返回 (状态码, 响应头, 内容哈希)
+
+    HEAD 请求只取响应头，内容哈希为 None；只有内容哈希可比较时才用 GET 下载页面。
+    """
+    headers = {"User-Agent": PROBE_USER_AGENT}
+    if etag:
+        headers["If-None-Match"] = etag
+    if last_modified:
+        headers["If-Modified-Since"] = last_modified
+
+    request = urllib.request.Request(url, headers=headers, method=method)
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            if method == "HEAD":
+                return response.status, dict(response.headers), None
+            body = response.read()
+            return response.status, dict(response.headers), hashlib.sha256(body).hexdigest()
+    except urllib.error.HTTPError as e:
+        if e.code == 304:
+            return 304, dict(e.headers), None
+        raise
+
+
+class ValidatorStore:
+    """基于 SQLite 的URL校验信息存储"""
+
+    def __init__(self, path, scope="", probe_timeout=10):
+        """初始化存储，path 为数据库文件路径
+        
+        scope 区分不同的导出配置，配置不同时各自记录，避免沿用缺少所需文件的旧结果。
+        """
+        self.path = Path(path)
+        self.scope = scope
+        self.probe_timeout = probe_timeout
+        # 页面已变化时的探测结果，等完整爬取成功后再写入，失败时不会误判为未变化
+        self._pending = {}
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(str(self.path), timeout=30)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS validators (
+                scope TEXT NOT NULL,
+                url TEXT NOT NULL,
+                etag TEXT,
+                last_modified TEXT,
+                content_hash TEXT,
+                files TEXT NOT NULL DEFAULT '[]',
+                updated_at REAL NOT NULL,
+                PRIMARY KEY (scope, url)
+            )
+        """)
+        self.conn.commit()
+
+    def get(self, url):
+        """读取URL的校验信息，没有记录时返回 None"""
+        row = self.conn.execute(
+            "SELECT etag, last_modified, content_hash, files FROM validators WHERE scope = ? AND url = ?",
+            (self.scope, canonicalize_url(url))
+        ).fetchone()
+        if row is None:
+            return None
+        return {
+            "etag": row[0],
+            "last_modified": row[1],
+            "content_hash": row[2],
+            "files": json.loads(row[3])
+        }
+
+    def remember(self, url, headers=None, content_hash=None, files=None):
+        """更新URL的校验信息，未提供的字段保留原值（或使用本次探测得到的值）"""
+        old = self.get(url) or {"etag": None, "last_modified": None, "content_hash": None, "files": []}
+        probe_headers, probe_hash = self._pending.pop(canonicalize_url(url), (None, None))
+        headers = {**(probe_headers or {}), **(headers or {})}
+        content_hash = content_hash or probe_hash
+        self.conn.execute(
+            "INSERT OR REPLACE INTO validators (scope, url, etag, last_modified, content_hash, files, updated_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (
+                self.scope,
+                canonicalize_url(url),
+                _header(headers, "ETag") or old["etag"],
+                _header(headers, "Last-Modified") or old["last_modified"],
+                content_hash or old["content_hash"],
+                json.dumps(files if files is not None else old["files"], ensure_ascii=False),
+                time.time()
+            )
+        )
+        self.conn.commit()
+
+    async def record(self, url, headers=None, files=None):
+        """完整爬取成功后记录校验信息，headers 为爬取结果的响应头，files 为输出文件
+
+        响应中没有 ETag 和 Last-Modified、本次也没有探测得到内容哈希时，用与探测相同的
+        GET 请求取一次原始内容计算哈希（浏览器渲染后的 HTML 与服务器返回的内容不同，
+        不能用来比较），下次爬取前按哈希判断页面是否变化。
+        """
+        probe_headers, probe_hash = self._pending.get(canonicalize_url(url), (None, None))
+        merged = {**(probe_headers or {}), **(headers or {})}
+        content_hash = None
+        if not (_header(merged, "ETag") or _header(merged, "Last-Modified") or probe_hash):
+            loop = asyncio.get_running_loop()
+            try:
+                _, _, content_hash = await loop.run_in_executor(
+                    None, _probe, url, None, None, self.probe_timeout, "GET"
+                )
+            except Exception:
+                # 取不到时不记录哈希，下次仍完整爬取
+                content_hash = None
+        self.remember(url, headers, content_hash, files)
+
+    async def check_unchanged(self, url):
+        """发送条件请求检查页面是否变化，未变化时返回上次的记录，否则返回 None
+        
+        首次遇到、没有任何校验信息或上次的输出文件已被删除的URL不探测，直接返回 None。
+        有 ETag 或 Last-Modified 时发送条件 HEAD 请求；只有内容哈希时才用 GET 比较哈希。
+        """
+        old = self.get(url)
+        if old is None or not old["files"] or not all(_output_exists(name) for name in old["files"]):
+            return None
+        if not (old["etag"] or old["last_modified"] or old["content_hash"]):
+            return None
+
+        method = "HEAD" if old["etag"] or old["last_modified"] else "GET"
+        loop = asyncio.get_running_loop()
+        try:
+            status, headers, content_hash = await loop.run_in_executor(
+                None, _probe, url, old["etag"], old["last_modified"], self.probe_timeout, method
+            )
+        except Exception:
+            # 探测失败（包括不支持 HEAD 的服务器）时按已变化处理，交给浏览器完整爬取
+            return None
+
+        if method == "HEAD":
+            # 忽略条件请求头的服务器返回 200，校验信息与上次相同时同样视为未变化
+            if old["etag"]:
+                same = _header(headers, "ETag") == old["etag"]
+            else:
+                same = _header(headers, "Last-Modified") == old["last_modified"]
+            unchanged = status == 304 or (status == 200 and same)
+        else:
+            unchanged = status == 304 or content_hash == old["content_hash"]
+        if unchanged:
+            self.remember(url, headers)
+            return old
+
+        self._pending[canonicalize_url(url)] = (headers, content_hash)
+        return None
+
+    def close(self):
+        """关闭数据库连接"""
+        self.conn.close()
@@ -0,0 +1,113 @@
+"""
+Crawl4AI 批量任务日志和流式报告
+批量爬取时每完成一个URL就追加一行JSON记录并立即落盘，程序崩溃或被关闭后
+可以读取日志跳过已完成的URL，继续未完成的部分
+"""
+
+import json
+import os
+from datetime import datetime
+from pathlib import Path
+
+
+class BatchJournal:
+    """只追加的批量任务日志
+
+    每个进程写入自己的文件（前缀.进程号.jsonl），多进程批量爬取时互不干扰，
+    读取时合并同一前缀的所有文件。
+    """
+
+    def __init__(self, directory, prefix="batch_journal"):
+        """打开（或创建）当前进程的日志文件"""
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.path = self.directory / f"{prefix}.{os.getpid()}.jsonl"
+        self.file = open(self.path, 'a', encoding='utf-8')
+
+    def record(self, index, url, result):
+        """记录一个URL的处理结果，写入后立即刷新到磁盘"""
+        line = json.dumps({
+            "index": index,
+            "url": url,
+            "result": result,
+            "finished_at": datetime.now().isoformat()
+        }, ensure_ascii=False)
+        self.file.write(line + "\n")
+        self.file.flush()
+        os.fsync(self.file.fileno())
+
+    def close(self):
+        """关闭日志文件"""
+        self.file.close()
+
+    @staticmethod
+    def load(directory, prefix="batch_journal"):
+        """读取日志中的全部记录，返回 {序号: 记录}，同一序号以最后一条为准
+
+        崩溃时最后一行可能只写了一半（可能截断在多字节字符中间），无法解析的行会被忽略。
+        """
+        records = {}
+        directory = Path(directory)
+        if not directory.exists():
+            return records
+
+        for path in sorted(directory.glob(f"{prefix}.*.jsonl"), key=lambda p: p.stat().st_mtime):
+            with open(path, 'r', encoding='utf-8', errors='replace') as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue
+                    records[entry["index"]] = entry
+        return records
+
+    @staticmethod
+    def load_completed(directory, indexed_urls, prefix="batch_journal"):
+        """返回已成功完成的记录 {序号: 结果}，只认序号和URL都与当前列表一致的记录
+        
+        indexed_urls 可以是按序号递增的迭代器，读到日志中最大的序号后即停止。
+        """
+        records = BatchJournal.load(directory, prefix)
+        completed = {}
+        if not records:
+            return completed
+        last = max(records)
+        for i, url in indexed_urls:
+            if i > last:
+                break
+            entry = records.get(i)
+            if entry and entry["url"] == url and entry["result"].get("success"):
+                completed[i] = entry["result"]
+        return completed
+
+    @staticmethod
+    def clear(directory, prefix="batch_journal"):
+        """删除旧的日志文件"""
+        directory = Path(directory)
+        if directory.exists():
+            for path in directory.glob(f"{prefix}.*.jsonl"):
+                path.unlink()
+
+
+class JsonlReport:
+    """流式批量报告：每行一个紧凑的JSON记录，写入后立即刷新，便于 tail -f 和 jq 跟踪"""
+
+    def __init__(self, path):
+        """以追加方式打开报告文件"""
+        self.path = Path(path)
+        self.file = open(self.path, 'a', encoding='utf-8')
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def write(self, record):
+        """追加一条记录，整行一次写入并立即刷新"""
+        self.file.write(json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n")
+        self.file.flush()
+
+    def close(self):
+        """关闭报告文件"""
+        self.file.close()
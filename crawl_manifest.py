@@ -0,0 +1,207 @@
+"""
+Crawl4AI 输出清单
+在输出目录的 manifest.db（SQLite）中记录每个网址的状态和输出文件（路径、类型、大小、
+SHA-256、时间），查询某个网址的文件或“爬过哪些网址”时走索引，不需要扫描目录。
+记录先缓存在内存中，按批在一个短事务里写入，每完成一个网址不必单独写盘，多个工作进程
+同时写入同一个清单时也只短暂持有写锁（中断时由任务日志保证可以继续）。
+
+另外提供按网址哈希命名、分层存放的文件布局（layout="hashed"）：
+markdown/ab/cd/abcd....md，不同网址不会重名，查询参数不会产生非法文件名，
+单个目录中的文件数也保持在较小的规模。平铺布局的文件名由 flat_name() 生成，
+同样带有网址哈希，在各平台上都是合法的文件名。
+"""
+
+import hashlib
+import json
+import re
+import sqlite3
+import time
+from pathlib import Path
+
+from crawl_events import URL_FINISHED
+from crawl_urls import canonicalize_url
+
+# 输出文件布局：flat 为“序号_网址_哈希”命名、放在同一目录（原有方式）；hashed 为按网址哈希分层
+LAYOUTS = ["flat", "hashed"]
+
+# 哈希文件名的长度（十六进制字符数）
+NAME_LENGTH = 32
+
+# 平铺布局文件名中网址部分的最大长度和附加的哈希长度
+FLAT_NAME_LENGTH = 50
+FLAT_HASH_LENGTH = 12
+
+# 文件名中只保留这些字符，其余（? : * " < > | 等）替换为下划线
+UNSAFE_CHARS = re.compile(r"[^A-Za-z0-9._-]+")
+
+# 累计多少条记录或多少秒后写入一次
+COMMIT_EVERY = 200
+COMMIT_INTERVAL = 2.0
+
+MANIFEST_NAME = "manifest.db"
+
+
+def url_digest(url):
+    """网址（规范化后）的哈希文件名"""
+    return hashlib.sha256(canonicalize_url(url).encode('utf-8')).hexdigest()[:NAME_LENGTH]
+
+
+def flat_name(url, max_length=FLAT_NAME_LENGTH):
+    """平铺布局下网址的文件名主体：去掉协议的网址（不安全字符换成下划线、截断）加网址哈希
+
+    哈希保证不同网址不会重名（截断或替换字符后相同也不会），文件名在各平台上都合法。
+    """
+    readable = url.split("://", 1)[-1]
+    readable = UNSAFE_CHARS.sub("_", readable)[:max_length].strip("._")
+    return f"{readable}_{url_digest(url)[:FLAT_HASH_LENGTH]}"
+
+
+def hashed_path(directory, url, suffix):
+    """哈希布局下网址的输出文件路径：directory/前两位/三四位/哈希+suffix，并创建所在目录"""
+    name = url_digest(url)
+    parent = Path(directory) / name[:2] / name[2:4]
+    parent.mkdir(parents=True, exist_ok=True)
+    return parent / f"{name}{suffix}"
+
+
+class OutputManifest:
+    """基于 SQLite 的输出清单，多个工作进程可以同时写入同一个清单"""
+
+    def __init__(self, path):
+        """打开或创建清单，path 为数据库文件路径（或所在的输出目录）"""
+        path = Path(path)
+        self.path = path / MANIFEST_NAME if path.is_dir() else path
+        self.pending = []
+        self.last_commit = time.monotonic()
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(str(self.path), timeout=30)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS urls (
+                url TEXT PRIMARY KEY,
+                batch_index INTEGER,
+                status TEXT NOT NULL,
+                error TEXT,
+                updated_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS urls_status ON urls (status);
+            CREATE TABLE IF NOT EXISTS files (
+                path TEXT PRIMARY KEY,
+                url TEXT NOT NULL,
+                kind TEXT,
+                bytes INTEGER,
+                sha256 TEXT,
+                created_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS files_url ON files (url);
+            CREATE INDEX IF NOT EXISTS files_sha256 ON files (sha256);
+        """)
+        self.conn.commit()
+
+    def record(self, url, status, outputs=None, index=None, error=None):
+        """记录一个网址的结果
+
+        outputs 为 [{"kind", "path", "bytes", "sha256"}]，替换该网址之前记录的文件；
+        为 None 时（如未变化的页面沿用上次的文件）保留原有的文件记录。
+        """
+        files = None
+        if outputs is not None:
+            files = [(str(output["path"]), output.get("kind"), output.get("bytes"), output.get("sha256"))
+                     for output in outputs]
+        self.pending.append((canonicalize_url(url), index, status, error, time.time(), files))
+        if len(self.pending) >= COMMIT_EVERY or time.monotonic() - self.last_commit >= COMMIT_INTERVAL:
+            self.commit()
+
+    def on_event(self, event):
+        """事件订阅函数：记录每个完成的网址（跳过继续任务时已完成的网址）"""
+        if event.kind != URL_FINISHED or event.get("resumed"):
+            return
+        # 未变化或失败时没有新文件，保留上次记录的文件
+        outputs = event.get("outputs") or None
+        error = "; ".join(event.get("errors") or []) or event.get("error")
+        self.record(event.url, event.get("status"), outputs, index=event.index, error=error)
+
+    def commit(self):
+        """在一个事务中写入缓存的记录"""
+        pending, self.pending = self.pending, []
+        self.last_commit = time.monotonic()
+        if not pending:
+            return
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO urls (url, batch_index, status, error, updated_at) VALUES (?, ?, ?, ?, ?)",
+                [record[:5] for record in pending]
+            )
+            for key, _, _, _, now, files in pending:
+                if files is None:
+                    continue
+                self.conn.execute("DELETE FROM files WHERE url = ?", (key,))
+                self.conn.executemany(
+                    "INSERT OR REPLACE INTO files (path, url, kind, bytes, sha256, created_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    [(path, key, kind, size, sha256, now) for path, kind, size, sha256 in files]
+                )
+
+    def get(self, url):
+        """查询网址的状态和输出文件，没有记录时返回 None"""
+        self.commit()
+        key = canonicalize_url(url)
+        row = self.conn.execute(
+            "SELECT batch_index, status, error, updated_at FROM urls WHERE url = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        files = self.conn.execute(
+            "SELECT path, kind, bytes, sha256, created_at FROM files WHERE url = ? ORDER BY path", (key,)
+        ).fetchall()
+        return {
+            "url": key,
+            "index": row[0],
+            "status": row[1],
+            "error": row[2],
+            "updated_at": row[3],
+            "files": [dict(zip(("path", "kind", "bytes", "sha256", "created_at"), f)) for f in files]
+        }
+
+    def find_by_hash(self, sha256):
+        """查询内容哈希相同的文件 [(路径, 网址)]"""
+        self.commit()
+        return self.conn.execute("SELECT path, url FROM files WHERE sha256 = ?", (sha256,)).fetchall()
+
+    def summary(self):
+        """清单汇总：各状态的网址数、文件数、总大小和不同内容的数量"""
+        self.commit()
+        statuses = dict(self.conn.execute("SELECT status, COUNT(*) FROM urls GROUP BY status").fetchall())
+        files, size, distinct = self.conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(bytes), 0), COUNT(DISTINCT sha256) FROM files"
+        ).fetchone()
+        return {"urls": sum(statuses.values()), "statuses": statuses, "files": files, "bytes": size,
+                "distinct_contents": distinct}
+
+    def close(self):
+        """提交并关闭数据库连接"""
+        self.commit()
+        self.conn.close()
+
+
+def print_manifest(path, url=None):
+    """在终端中显示清单汇总，指定 url 时显示该网址的记录"""
+    manifest = OutputManifest(path)
+    try:
+        if url:
+            entry = manifest.get(url)
+            if entry is None:
+                print(f"❌ 清单中没有该网址: {url}")
+            else:
+                print(json.dumps(entry, ensure_ascii=False, indent=2))
+            return
+        summary = manifest.summary()
+        print(f"📒 清单: {manifest.path}")
+        print(f"   网址: {summary['urls']} 个（" +
+              "，".join(f"{status} {count}" for status, count in sorted(summary["statuses"].items())) + "）")
+        print(f"   文件: {summary['files']} 个，共 {summary['bytes'] / 1024 / 1024:.1f} MB，"
+              f"不同内容 {summary['distinct_contents']} 份")
+    finally:
+        manifest.close()
@@ -0,0 +1,209 @@
+"""
+Crawl4AI 性能指标
+记录各阶段耗时（浏览器爬取、缓存命中、条件请求检查、文件写入）的分布，以及页面数、
+写入字节数和按类型分类的错误数；导出为 Prometheus 文本格式（写入文件，或由本地
+/metrics 地址提供），并在批量报告末尾给出每个阶段的 p50/p95/p99
+"""
+
+import random
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from crawl_writer import atomic_write
+
+# 耗时直方图的桶上限（秒）
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+# 每个阶段最多保留的耗时样本数，用于计算分位数，超过后随机替换（蓄水池抽样）
+MAX_SAMPLES = 10000
+
+# 计数器：名称 -> (Prometheus 指标名, 标签名, 说明)
+COUNTERS = {
+    "pages": ("crawl_pages_total", "status", "处理完的页面数"),
+    "bytes": ("crawl_bytes_written_total", "kind", "写入输出文件的字节数"),
+    "errors": ("crawl_errors_total", "type", "按类型统计的失败次数（包括之后重试成功的）"),
+    "store": ("crawl_store_writes_total", "result", "内容寻址存储的写入结果（new、dedup、unchanged、copy）"),
+}
+
+
+class StageHistogram:
+    """单个阶段的耗时分布"""
+
+    def __init__(self):
+        self.buckets = [0] * len(BUCKETS)
+        self.count = 0
+        self.sum = 0.0
+        self.samples = []
+
+    def observe(self, seconds):
+        """记录一次耗时"""
+        self.count += 1
+        self.sum += seconds
+        for k, bound in enumerate(BUCKETS):
+            if seconds <= bound:
+                self.buckets[k] += 1
+                break
+        if len(self.samples) < MAX_SAMPLES:
+            self.samples.append(seconds)
+        else:
+            k = random.randrange(self.count)
+            if k < MAX_SAMPLES:
+                self.samples[k] = seconds
+
+    def merge(self, other):
+        """合并另一个进程记录的分布"""
+        self.buckets = [a + b for a, b in zip(self.buckets, other.buckets)]
+        self.count += other.count
+        self.sum += other.sum
+        samples = self.samples + other.samples
+        self.samples = samples if len(samples) <= MAX_SAMPLES else random.sample(samples, MAX_SAMPLES)
+
+    def quantile(self, q):
+        """按样本估算分位数，没有样本时返回 None"""
+        if not self.samples:
+            return None
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class CrawlMetrics:
+    """性能指标汇总，可以在多个线程中记录和导出，多进程时用 merge() 合并各进程的结果"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.stages = {}
+        self.counters = {}  # (计数器名称, 标签值) -> 数值
+        self.started = time.time()
+
+    def observe(self, stage, seconds):
+        """记录某个阶段的一次耗时（秒）"""
+        with self.lock:
+            histogram = self.stages.get(stage)
+            if histogram is None:
+                histogram = self.stages[stage] = StageHistogram()
+            histogram.observe(seconds)
+
+    @contextmanager
+    def timer(self, stage):
+        """计时上下文：with metrics.timer("fetch"): ...，出现异常时同样记录"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - start)
+
+    def count(self, name, label, value=1):
+        """计数器加 value，name 为 COUNTERS 中的名称"""
+        with self.lock:
+            key = (name, label)
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def merge(self, other):
+        """合并另一个 CrawlMetrics（如工作进程返回的）"""
+        with self.lock:
+            for stage, histogram in other.stages.items():
+                if stage in self.stages:
+                    self.stages[stage].merge(histogram)
+                else:
+                    self.stages[stage] = histogram
+            for key, value in other.counters.items():
+                self.counters[key] = self.counters.get(key, 0) + value
+
+    def __getstate__(self):
+        # 锁不能跨进程传递
+        state = self.__dict__.copy()
+        del state["lock"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.lock = threading.Lock()
+
+    def summary(self):
+        """返回可写入报告的汇总：各阶段的次数、总耗时和分位数，以及各计数器"""
+        with self.lock:
+            result = {"stages": {}}
+            for stage, histogram in sorted(self.stages.items()):
+                result["stages"][stage] = {
+                    "count": histogram.count,
+                    "total_seconds": round(histogram.sum, 3),
+                    **{name: round(histogram.quantile(q), 3) for name, q in (("p50", 0.5), ("p95", 0.95), ("p99", 0.99))}
+                }
+            for name in COUNTERS:
+                result[name] = {label: value for (key, label), value in sorted(self.counters.items()) if key == name}
+            return result
+
+    def summary_lines(self):
+        """用于终端和日志显示的汇总文字"""
+        summary = self.summary()
+        lines = []
+        for stage, item in summary["stages"].items():
+            lines.append(f"   {stage}: {item['count']} 次，p50 {item['p50']:.2f}s，p95 {item['p95']:.2f}s，"
+                         f"p99 {item['p99']:.2f}s，共 {item['total_seconds']:.1f}s")
+        if summary["errors"]:
+            lines.append("   错误: " + "，".join(f"{label} {value}" for label, value in summary["errors"].items()))
+        return lines
+
+    def to_prometheus(self):
+        """导出为 Prometheus 文本格式"""
+        lines = []
+        with self.lock:
+            lines.append("# HELP crawl_stage_seconds 各阶段耗时（秒）")
+            lines.append("# TYPE crawl_stage_seconds histogram")
+            for stage, histogram in sorted(self.stages.items()):
+                cumulative = 0
+                for bound, count in zip(BUCKETS, histogram.buckets):
+                    cumulative += count
+                    lines.append(f'crawl_stage_seconds_bucket{{stage="{stage}",le="{bound}"}} {cumulative}')
+                lines.append(f'crawl_stage_seconds_bucket{{stage="{stage}",le="+Inf"}} {histogram.count}')
+                lines.append(f'crawl_stage_seconds_sum{{stage="{stage}"}} {histogram.sum:.6f}')
+                lines.append(f'crawl_stage_seconds_count{{stage="{stage}"}} {histogram.count}')
+
+            for name, (metric, label_name, description) in COUNTERS.items():
+                lines.append(f"# HELP {metric} {description}")
+                lines.append(f"# TYPE {metric} counter")
+                for (key, label), value in sorted(self.counters.items()):
+                    if key == name:
+                        lines.append(f'{metric}{{{label_name}="{label}"}} {value}')
+
+            lines.append("# HELP crawl_start_time_seconds 开始记录的时间（Unix 时间戳）")
+            lines.append("# TYPE crawl_start_time_seconds gauge")
+            lines.append(f"crawl_start_time_seconds {self.started:.3f}")
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path):
+        """写入 Prometheus 文本文件（可供 node_exporter 的 textfile 收集器读取）"""
+        atomic_write(path, self.to_prometheus().encode('utf-8'))
+
+
+class MetricsServer:
+    """在后台线程中提供 http://host:port/metrics，供 Prometheus 抓取或直接用浏览器查看"""
+
+    def __init__(self, metrics, port, host="127.0.0.1"):
+        """启动服务，port 为 0 时自动选择端口（见 self.port）"""
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = metrics.to_prometheus().encode('utf-8')
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.port = self.server.server_address[1]
+        self.thread = threading.Thread(target=self.server.serve_forever, name="crawl-metrics", daemon=True)
+        self.thread.start()
+
+    def close(self):
+        """停止服务"""
+        self.server.shutdown()
+        self.server.server_close()
@@ -0,0 +1,173 @@
+"""
+Crawl4AI 性能分析
+爬取期间用 cProfile 记录事件循环所在线程的函数调用（内容过滤、Markdown 生成、
+JSON 序列化等都在这里执行），同时按固定间隔对所有线程的调用栈采样（包括写文件的
+线程池中的 base64 解码和写入），结束后保存在输出目录中：
+
+- profile.pstats：可用 python -m pstats 或 snakeviz 等工具查看
+- profile.collapsed：折叠调用栈，每行“线程;外层函数;...;内层函数 采样次数”，
+  可直接交给 flamegraph.pl 或 speedscope 生成火焰图
+- profile.txt：自身耗时最多的函数，报告中也附带同样的摘要
+
+cProfile 会明显拖慢纯 Python 代码，只在排查性能问题时开启。
+"""
+
+import cProfile
+import marshal
+import pstats
+import sys
+import threading
+from collections import Counter
+from pathlib import Path
+
+from crawl_writer import atomic_write
+
+# 调用栈采样间隔（秒）
+SAMPLE_INTERVAL = 0.01
+
+# 摘要中列出的函数数
+TOP_FUNCTIONS = 15
+
+# 线程空闲等待时所在的函数，采样时跳过这些调用栈，摘要中也不列出
+IDLE_FUNCTIONS = {
+    ("selectors.py", "select"),
+    ("windows_events.py", "select"),
+    ("threading.py", "wait"),
+    ("queue.py", "get"),
+    ("thread.py", "_worker"),
+    ("__init__.py", "mainloop"),
+}
+
+# cProfile 中表示等待 I/O 的内置函数（名称片段）
+IDLE_BUILTINS = ("poll", "select", "control", "GetQueuedCompletionStatus", "acquire", "sleep")
+
+
+def frame_label(filename, lineno, name):
+    """调用栈中一个函数的显示名称：函数名 (文件名:行号)"""
+    if filename == "~":
+        return name
+    return f"{name} ({Path(filename).name}:{lineno})"
+
+
+class CrawlProfiler:
+    """记录一次爬取的性能分析数据，多进程时用 merge() 合并各进程的结果
+
+    self.stats 为 pstats 格式的函数统计（与 cProfile.Profile.stats 相同），
+    self.stacks 为折叠调用栈的采样次数。
+    """
+
+    def __init__(self, interval=SAMPLE_INTERVAL):
+        self.interval = interval
+        self.stats = {}
+        self.stacks = Counter()
+        self.samples = 0
+        self.profile = None
+        self.thread = None
+        self.stopped = threading.Event()
+
+    def start(self):
+        """在当前线程开启 cProfile，并启动调用栈采样线程"""
+        self.profile = cProfile.Profile()
+        self.profile.enable()
+        self.stopped.clear()
+        self.thread = threading.Thread(target=self.sample_loop, name="crawl-profiler", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        """停止记录，需要在调用 start() 的线程中调用"""
+        if self.profile is not None:
+            self.profile.disable()
+            self.profile.create_stats()
+            self.merge_stats(self.profile.stats)
+            self.profile = None
+        if self.thread is not None:
+            self.stopped.set()
+            self.thread.join()
+            self.thread = None
+
+    def sample_loop(self):
+        own = threading.get_ident()
+        while not self.stopped.wait(self.interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                code = frame.f_code
+                if (Path(code.co_filename).name, code.co_name) in IDLE_FUNCTIONS:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(frame_label(code.co_filename, code.co_firstlineno, code.co_name))
+                    frame = frame.f_back
+                stack.append(names.get(ident, f"thread-{ident}"))
+                self.stacks[";".join(reversed(stack))] += 1
+            self.samples += 1
+
+    def merge_stats(self, stats):
+        """累加 pstats 格式的函数统计"""
+        for func, stat in stats.items():
+            old = self.stats.get(func, (0, 0, 0, 0, {}))
+            self.stats[func] = pstats.add_func_stats(old, stat)
+
+    def merge(self, other):
+        """合并另一个 CrawlProfiler（如工作进程返回的）"""
+        self.merge_stats(other.stats)
+        self.stacks.update(other.stacks)
+        self.samples += other.samples
+
+    def __getstate__(self):
+        # 只传递记录的数据
+        return {"interval": self.interval, "stats": self.stats, "stacks": self.stacks, "samples": self.samples}
+
+    def __setstate__(self, state):
+        self.__init__(state["interval"])
+        self.stats = state["stats"]
+        self.stacks = state["stacks"]
+        self.samples = state["samples"]
+
+    def top_functions(self, limit=TOP_FUNCTIONS):
+        """自身耗时最多的函数（跳过空闲等待），返回字典列表"""
+        entries = []
+        for (filename, lineno, name), (_, calls, self_time, cumulative, _) in self.stats.items():
+            if (Path(filename).name, name) in IDLE_FUNCTIONS:
+                continue
+            if filename == "~" and any(part in name for part in IDLE_BUILTINS):
+                continue
+            entries.append({
+                "function": frame_label(filename, lineno, name),
+                "calls": calls,
+                "self_seconds": round(self_time, 4),
+                "cumulative_seconds": round(cumulative, 4),
+            })
+        entries.sort(key=lambda entry: entry["self_seconds"], reverse=True)
+        return entries[:limit]
+
+    def summary(self, limit=TOP_FUNCTIONS):
+        """返回可写入报告的摘要"""
+        return {
+            "pstats": "profile.pstats",
+            "collapsed": "profile.collapsed",
+            "samples": self.samples,
+            "sample_interval": self.interval,
+            "top_functions": self.top_functions(limit),
+        }
+
+    def summary_lines(self, limit=10):
+        """用于终端和日志显示的摘要文字"""
+        return [f"   {entry['self_seconds']:.3f}s 自身 / {entry['cumulative_seconds']:.3f}s 累计 "
+                f"{entry['calls']} 次  {entry['function']}" for entry in self.top_functions(limit)]
+
+    def save(self, output_dir):
+        """把 profile.pstats、profile.collapsed 和 profile.txt 写入 output_dir，返回摘要"""
+        output_dir = Path(output_dir)
+        atomic_write(output_dir / "profile.pstats", marshal.dumps(self.stats))
+        collapsed = "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+        atomic_write(output_dir / "profile.collapsed", collapsed.encode('utf-8'))
+
+        summary = self.summary()
+        lines = [f"采样 {self.samples} 次（间隔 {self.interval * 1000:.0f} ms），自身耗时最多的函数:"]
+        lines += [f"{entry['self_seconds']:>10.4f}s {entry['cumulative_seconds']:>10.4f}s {entry['calls']:>10}  "
+                  f"{entry['function']}" for entry in summary["top_functions"]]
+        atomic_write(output_dir / "profile.txt", ("\n".join(lines) + "\n").encode('utf-8'))
+        return summary
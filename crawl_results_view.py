@@ -0,0 +1,250 @@
+"""
+Crawl4AI 结果列表
+每个网址一行，显示状态、耗时、字节数、重试次数和输出文件，可以排序和筛选。
+表格只创建可见的那几行，滚动时替换这几行的内容，十万行也不会变慢；
+结果按批更新，数据变化后最多每隔一段时间重新排序和显示一次。
+"""
+
+import time
+import tkinter as tk
+from tkinter import ttk
+
+# 状态在表格中显示的名称
+STATUS_LABELS = {
+    "running": "⏳ 爬取中",
+    "retrying": "🔁 等待重试",
+    "success": "✅ 成功",
+    "cached": "♻️ 缓存",
+    "unchanged": "⏸️ 未变化",
+    "failed": "❌ 失败",
+}
+
+# 列名、标题、宽度和排序键
+COLUMNS = (
+    ("index", "序号", 60, lambda row: row["index"]),
+    ("status", "状态", 100, lambda row: row.get("status", "")),
+    ("elapsed", "耗时(秒)", 80, lambda row: row.get("elapsed") or 0),
+    ("bytes", "大小(KB)", 80, lambda row: row.get("bytes") or 0),
+    ("retries", "重试", 50, lambda row: row.get("retries") or 0),
+    ("url", "网址", 360, lambda row: row["url"]),
+    ("files", "输出文件", 300, lambda row: len(row.get("files") or ())),
+)
+
+# 两次重新排序和显示之间的最短间隔（秒）
+REFRESH_INTERVAL = 0.3
+
+
+class ResultsModel:
+    """结果数据：{序号: 行}，按当前的排序和筛选条件生成显示顺序"""
+
+    def __init__(self):
+        self.rows = {}
+        self.sort_column = "index"
+        self.reverse = False
+        self.status_filter = None
+        self.text_filter = ""
+        self.order = []
+        self.stale = False  # 显示顺序需要重新计算
+        self.changed = False  # 有数据变化，需要重新显示
+
+    def clear(self):
+        """清空所有结果"""
+        self.rows.clear()
+        self.order = []
+        self.stale = False
+        self.changed = True
+
+    def update(self, records):
+        """按序号合并一批结果记录"""
+        for record in records:
+            row = self.rows.get(record["index"])
+            if row is None:
+                self.rows[record["index"]] = dict(record)
+                self.stale = True
+            else:
+                row.update(record)
+        # 按序号排序且不筛选时，已有行的变化不影响顺序，只需重新显示
+        if self.sort_column != "index" or self.status_filter or self.text_filter:
+            self.stale = True
+        self.changed = True
+
+    def set_sort(self, column):
+        """按列排序，重复点击同一列时切换升序和降序"""
+        if self.sort_column == column:
+            self.reverse = not self.reverse
+        else:
+            self.sort_column = column
+            self.reverse = False
+        self.stale = self.changed = True
+
+    def set_filter(self, status=None, text=""):
+        """只显示指定状态（None 为全部）且网址包含 text 的行"""
+        self.status_filter = status
+        self.text_filter = text.strip().lower()
+        self.stale = self.changed = True
+
+    def matches(self, row):
+        if self.status_filter and row.get("status") != self.status_filter:
+            return False
+        return not self.text_filter or self.text_filter in row["url"].lower()
+
+    def view(self):
+        """返回当前显示顺序（序号列表），需要时重新筛选和排序"""
+        if self.stale:
+            key = next(column[3] for column in COLUMNS if column[0] == self.sort_column)
+            rows = [row for row in self.rows.values() if self.matches(row)]
+            rows.sort(key=key, reverse=self.reverse)
+            self.order = [row["index"] for row in rows]
+            self.stale = False
+        return self.order
+
+
+def format_row(row):
+    """把一行结果转换为表格中显示的文本"""
+    elapsed = row.get("elapsed")
+    size = row.get("bytes")
+    files = row.get("files") or ()
+    return (
+        row["index"],
+        STATUS_LABELS.get(row.get("status"), row.get("status", "")),
+        f"{elapsed:.1f}" if elapsed is not None else "",
+        f"{size / 1024:.1f}" if size else "",
+        row.get("retries") or "",
+        row["url"],
+        ", ".join(str(f).replace("\\", "/").rsplit("/", 1)[-1] for f in files),
+    )
+
+
+class ResultsTable(ttk.Frame):
+    """虚拟化的结果表格
+
+    Treeview 中只保留 height 个条目，滚动条和鼠标滚轮改变的是显示的起始位置，
+    每次只更新这几个条目的内容。
+    """
+
+    def __init__(self, parent, height=12):
+        """创建筛选栏、表格和滚动条"""
+        super().__init__(parent)
+        self.model = ResultsModel()
+        self.height = height
+        self.offset = 0
+        self.shown = 0  # 上次显示时的总行数
+        self.last_refresh = 0.0
+
+        # 筛选栏
+        filter_frame = ttk.Frame(self)
+        filter_frame.grid(row=0, column=0, columnspan=2, sticky=(tk.W, tk.E), pady=(0, 5))
+
+        ttk.Label(filter_frame, text="状态:").grid(row=0, column=0, padx=(0, 5))
+        self.status_var = tk.StringVar(value="全部")
+        status_combo = ttk.Combobox(filter_frame, textvariable=self.status_var, state="readonly", width=12,
+                                    values=["全部"] + list(STATUS_LABELS.values()))
+        status_combo.grid(row=0, column=1, padx=(0, 15))
+        status_combo.bind('<<ComboboxSelected>>', self.on_filter_change)
+
+        ttk.Label(filter_frame, text="网址包含:").grid(row=0, column=2, padx=(0, 5))
+        self.search_var = tk.StringVar()
+        search_entry = ttk.Entry(filter_frame, textvariable=self.search_var, width=30)
+        search_entry.grid(row=0, column=3, padx=(0, 15))
+        search_entry.bind('<KeyRelease>', self.on_filter_change)
+
+        self.count_var = tk.StringVar(value="共 0 个")
+        ttk.Label(filter_frame, textvariable=self.count_var, foreground="gray").grid(row=0, column=4)
+
+        # 表格：条目数固定，不使用 Treeview 自带的滚动
+        self.tree = ttk.Treeview(self, columns=[c[0] for c in COLUMNS], show="headings",
+                                 height=height, selectmode="browse")
+        for name, title, width, _ in COLUMNS:
+            self.tree.heading(name, text=title, command=lambda n=name: self.on_sort(n))
+            self.tree.column(name, width=width, stretch=name in ("url", "files"),
+                             anchor=tk.W if name in ("url", "files", "status") else tk.E)
+        self.tree.grid(row=1, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
+
+        self.scrollbar = ttk.Scrollbar(self, orient=tk.VERTICAL, command=self.on_scroll)
+        self.scrollbar.grid(row=1, column=1, sticky=(tk.N, tk.S))
+
+        for sequence in ("<MouseWheel>", "<Button-4>", "<Button-5>"):
+            self.tree.bind(sequence, self.on_wheel)
+
+        self.columnconfigure(0, weight=1)
+        self.rowconfigure(1, weight=1)
+
+    def clear(self):
+        """清空表格"""
+        self.model.clear()
+        self.offset = 0
+        self.refresh(force=True)
+
+    def update_rows(self, records):
+        """合并一批结果记录，显示最多每隔 REFRESH_INTERVAL 秒刷新一次"""
+        if records:
+            self.model.update(records)
+        self.refresh()
+
+    def refresh(self, force=False):
+        """有变化时重新显示可见的行"""
+        if not self.model.changed and not force:
+            return
+        now = time.monotonic()
+        if not force and now - self.last_refresh < REFRESH_INTERVAL:
+            return
+        self.last_refresh = now
+        self.model.changed = False
+
+        # 停在末尾时跟随新增的行
+        at_end = self.offset >= self.shown - self.height
+        order = self.model.view()
+        max_offset = max(0, len(order) - self.height)
+        self.offset = max_offset if at_end else min(self.offset, max_offset)
+        self.render(order)
+
+    def render(self, order):
+        """把 order[offset:offset+height] 写入表格中的固定条目"""
+        visible = order[self.offset:self.offset + self.height]
+        items = self.tree.get_children()
+        for k in range(len(items), len(visible)):
+            self.tree.insert("", tk.END, iid=f"row{k}")
+        for k in range(len(visible), len(items)):
+            self.tree.delete(items[k])
+
+        for k, index in enumerate(visible):
+            self.tree.item(f"row{k}", values=format_row(self.model.rows[index]))
+
+        total = self.shown = len(order)
+        if total:
+            self.scrollbar.set(self.offset / total, min(1.0, (self.offset + self.height) / total))
+        else:
+            self.scrollbar.set(0.0, 1.0)
+        self.count_var.set(f"显示 {total} / 共 {len(self.model.rows)} 个")
+
+    def scroll_to(self, offset):
+        order = self.model.view()
+        self.offset = max(0, min(int(offset), len(order) - self.height))
+        self.render(order)
+
+    def on_scroll(self, action, amount, unit=None):
+        """滚动条拖动（moveto）和点击箭头、空白处（scroll）"""
+        if action == "moveto":
+            self.scroll_to(float(amount) * len(self.model.view()))
+        elif action == "scroll":
+            step = self.height if unit == "pages" else 1
+            self.scroll_to(self.offset + int(amount) * step)
+
+    def on_wheel(self, event):
+        if event.num == 4 or getattr(event, 'delta', 0) > 0:
+            self.scroll_to(self.offset - 3)
+        else:
+            self.scroll_to(self.offset + 3)
+        return "break"
+
+    def on_sort(self, column):
+        self.model.set_sort(column)
+        self.offset = 0
+        self.refresh(force=True)
+
+    def on_filter_change(self, event=None):
+        label = self.status_var.get()
+        status = next((key for key, value in STATUS_LABELS.items() if value == label), None)
+        self.model.set_filter(status, self.search_var.get())
+        self.offset = 0
+        self.refresh(force=True)
@@ -0,0 +1,142 @@
+"""
+Crawl4AI 失败重试和熔断
+暂时性错误（网络异常、超时、429/5xx）按带随机抖动的指数退避重试，服务器给出
+Retry-After 时按其等待；同一主机连续失败时熔断，一段时间内不再向该主机发请求，
+多次熔断后该主机剩余的URL直接判为失败，不再占用并发名额
+"""
+
+import random
+import time
+from email.utils import parsedate_to_datetime
+
+# 可以重试的HTTP状态码
+RETRY_STATUSES = {408, 425, 429, 500, 502, 503, 504}
+
+# 错误信息中表示暂时性问题的关键字
+TRANSIENT_MARKERS = (
+    "timeout", "timed out", "net::err_connection", "net::err_network", "net::err_timed_out",
+    "net::err_name_not_resolved", "connection reset", "connection refused", "temporarily"
+)
+
+
+def parse_retry_after(value):
+    """解析 Retry-After 响应头（秒数或HTTP日期），返回等待秒数，无法解析时返回 None"""
+    if not value:
+        return None
+    value = str(value).strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def retry_after_of(result):
+    """从爬取结果的响应头中读取 Retry-After"""
+    for key, value in (getattr(result, 'response_headers', None) or {}).items():
+        if key.lower() == "retry-after":
+            return parse_retry_after(value)
+    return None
+
+
+def is_transient(result=None, error=None):
+    """判断失败是否为暂时性的（值得重试），error 为爬取时抛出的异常"""
+    if error is not None:
+        return True
+    if getattr(result, 'status_code', None) in RETRY_STATUSES:
+        return True
+    if result is not None and not result.success:
+        message = str(result.error_message or "").lower()
+        return any(marker in message for marker in TRANSIENT_MARKERS)
+    return False
+
+
+def error_type(result=None, error=None):
+    """失败类型，用于按类型统计错误：timeout、http_429、http_5xx、http_4xx、network 或 other"""
+    status = getattr(result, 'status_code', None)
+    if error is not None:
+        message = f"{type(error).__name__} {error}".lower()
+    else:
+        message = str(getattr(result, 'error_message', None) or "").lower()
+    if "timeout" in message or "timed out" in message or "timed_out" in message:
+        return "timeout"
+    if status == 429:
+        return "http_429"
+    if status and status >= 500:
+        return "http_5xx"
+    if status and status >= 400:
+        return "http_4xx"
+    if "net::" in message or "connection" in message:
+        return "network"
+    return "other"
+
+
+class RetryPolicy:
+    """重试策略：第 n 次重试前等待 base_delay * 2^n 秒以内的随机时间（full jitter）"""
+
+    def __init__(self, max_retries=2, base_delay=1.0, max_delay=60.0):
+        """max_retries 为最多重试次数，0 表示不重试"""
+        self.max_retries = max(0, max_retries)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def backoff(self, attempt, retry_after=None):
+        """返回第 attempt 次重试（从0开始）前的等待秒数，服务器要求的等待时间优先"""
+        if retry_after is not None:
+            return min(retry_after, self.max_delay)
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+
+class CircuitBreaker:
+    """按主机的熔断器
+
+    连续 failure_threshold 次暂时性失败后熔断 cooldown 秒（每次熔断时间翻倍），
+    到期后只放行一个试探请求：成功则恢复，失败则再次熔断。
+    连续熔断 max_trips 次后认为该主机不可用，其余URL直接判为失败。
+    """
+
+    def __init__(self, failure_threshold=5, cooldown=30.0, max_trips=3):
+        """初始化熔断器"""
+        self.failure_threshold = max(1, failure_threshold)
+        self.cooldown = cooldown
+        self.max_trips = max(1, max_trips)
+        self.hosts = {}
+
+    def _state(self, host):
+        return self.hosts.setdefault(host, {"failures": 0, "open_until": 0.0, "trips": 0})
+
+    def wait_time(self, host, now):
+        """熔断中返回剩余的等待秒数，否则返回0"""
+        state = self.hosts.get(host)
+        if state is None:
+            return 0.0
+        return max(0.0, state["open_until"] - now)
+
+    def half_open(self, host):
+        """熔断过且尚未恢复：只允许一个试探请求"""
+        state = self.hosts.get(host)
+        return state is not None and state["trips"] > 0
+
+    def is_dead(self, host):
+        """连续熔断次数达到上限，不再尝试该主机"""
+        state = self.hosts.get(host)
+        return state is not None and state["trips"] >= self.max_trips
+
+    def record_success(self, host):
+        """主机有正常响应，恢复为关闭状态"""
+        self.hosts.pop(host, None)
+
+    def record_failure(self, host, now=None):
+        """记录一次暂时性失败，返回是否因此熔断"""
+        now = now or time.monotonic()
+        state = self._state(host)
+        state["failures"] += 1
+        if state["trips"] == 0 and state["failures"] < self.failure_threshold:
+            return False
+
+        # 达到阈值或试探请求失败，熔断（冷却时间按熔断次数翻倍）
+        state["failures"] = 0
+        state["trips"] += 1
+        state["open_until"] = now + self.cooldown * (2 ** (state["trips"] - 1))
+        return True
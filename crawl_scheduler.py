@@ -0,0 +1,262 @@
+"""
+Crawl4AI 按站点调度
+每个主机一个等待队列，按轮转顺序在主机之间交替派发URL，避免按站点分组的列表集中
+访问同一个主机而其他主机空闲；每个主机用令牌桶限制请求速率，并可设置两次请求之间的
+最小间隔（crawl delay），在不触发限流或封禁的前提下尽量提高总吞吐量。
+需要重试的URL放回所属主机的队列，等待退避时间期间不占用并发名额；熔断中的主机暂停派发。
+停止或超过总时限时立即取消正在处理的URL，未完成的URL留给断点续爬
+"""
+
+import asyncio
+import time
+from collections import deque
+
+from crawl_retry import RetryPolicy
+from crawl_urls import url_host
+
+# 调度器最多预读的URL数，URL按需读取，内存占用与URL总数无关
+DEFAULT_BUFFER_SIZE = 10000
+
+# 单个URL的默认爬取时限（秒）
+DEFAULT_URL_TIMEOUT = 120
+
+# 检查停止请求的间隔（秒）
+STOP_POLL_INTERVAL = 0.2
+
+
+class HostState:
+    """单个主机的等待队列和限流状态"""
+
+    def __init__(self, rate, burst):
+        """rate 为每秒请求数（None 表示不限），burst 为令牌桶容量"""
+        self.queue = deque()
+        self.active = 0
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.next_allowed = 0.0
+
+    def wait_time(self, now, per_host):
+        """距离可以向该主机发出下一个请求还需等待的秒数，并发已满时返回 None"""
+        if self.active >= per_host:
+            return None
+
+        wait = max(0.0, self.next_allowed - now)
+        if self.rate:
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens < 1:
+                wait = max(wait, (1 - self.tokens) / self.rate)
+        return wait
+
+    def take(self, now, crawl_delay):
+        """发出一个请求：消耗一个令牌并记录下次最早可以请求的时间"""
+        if self.rate:
+            self.tokens -= 1
+        self.next_allowed = now + crawl_delay
+        self.active += 1
+
+
+class Slot:
+    """一次派发占用的并发名额
+
+    处理函数结束时自动归还；也可以在页面取回后调用 release() 提前归还，
+    保存文件时其他页面即可开始爬取。重复调用没有影响。
+    attempt 为该URL已重试的次数；circuit_open 为 True 时主机已被熔断，
+    处理函数应直接判为失败而不发请求。
+    """
+
+    def __init__(self, scheduler, host, index, url, attempt=0, circuit_open=False):
+        self.scheduler = scheduler
+        self.host = host
+        self.index = index
+        self.url = url
+        self.attempt = attempt
+        self.circuit_open = circuit_open
+        self.released = False
+
+    def release(self):
+        """归还名额"""
+        if not self.released:
+            self.released = True
+            self.scheduler._release(self.host)
+
+    def succeed(self):
+        """主机有正常响应（包括非暂时性的失败，如404），恢复熔断计数"""
+        if self.scheduler.breaker is not None:
+            self.scheduler.breaker.record_success(self.host)
+
+    def retry(self, retry_after=None):
+        """暂时性失败：计入熔断并在退避后重试，重试次数用完时返回 False"""
+        if self.scheduler.breaker is not None:
+            self.scheduler.breaker.record_failure(self.host)
+        if self.attempt >= self.scheduler.retry.max_retries:
+            return False
+        self.scheduler._requeue(self, self.scheduler.retry.backoff(self.attempt, retry_after))
+        return True
+
+
+class HostScheduler:
+    """按主机轮转派发的调度器
+
+    concurrency 为同时处理的URL总数，per_host 为同一主机同时处理的上限，
+    rate 为每个主机每秒的请求数（None 不限），burst 为允许的瞬时突发请求数，
+    crawl_delay 为同一主机两次请求之间的最小间隔（秒）。
+    retry 为 RetryPolicy（默认不重试），breaker 为 CircuitBreaker（可选）。
+    """
+
+    def __init__(self, concurrency, per_host=None, rate=None, burst=1, crawl_delay=0,
+                 retry=None, breaker=None, buffer_size=DEFAULT_BUFFER_SIZE):
+        """初始化调度器"""
+        self.concurrency = max(1, concurrency)
+        self.per_host = max(1, per_host) if per_host else self.concurrency
+        self.rate = rate or None
+        self.burst = max(1, burst)
+        self.crawl_delay = max(0, crawl_delay or 0)
+        self.buffer_size = max(self.concurrency, buffer_size)
+        self.retry = retry or RetryPolicy(max_retries=0)
+        self.breaker = breaker
+
+        self.hosts = {}
+        self.active = 0
+        self._ring = deque()  # 有待处理URL的主机，按轮转顺序排列
+        self._buffered = 0
+        self._wake = None
+        self.timed_out = False
+
+    def _release(self, host):
+        self.hosts[host].active -= 1
+        self.active -= 1
+        self._wake.set()
+
+    def _requeue(self, slot, delay):
+        """把需要重试的URL放回主机队列的最前面，退避期间暂停向该主机派发"""
+        state = self.hosts[slot.host]
+        state.queue.appendleft((slot.index, slot.url, slot.attempt + 1))
+        state.next_allowed = max(state.next_allowed, time.monotonic() + delay)
+        if len(state.queue) == 1:
+            self._ring.append(slot.host)
+        self._buffered += 1
+        self._wake.set()
+
+    def _wait_time(self, host, state, now):
+        """综合并发、限速和熔断状态，返回该主机还需等待的秒数（None 表示等待名额归还）"""
+        wait = state.wait_time(now, self.per_host)
+        if wait is None or self.breaker is None:
+            return wait
+        if self.breaker.half_open(host) and state.active > 0:
+            return None
+        return max(wait, self.breaker.wait_time(host, now))
+
+    async def run(self, indexed_urls, handler, should_stop=None, deadline=None):
+        """从 (序号, URL) 迭代器中取出URL，调用 handler(序号, URL, 名额) 处理
+
+        should_stop() 返回 True 或到达 deadline（time.time() 时间戳）时不再派发新的URL，
+        并取消正在处理的URL（处理函数中抛出 CancelledError），全部结束后返回；
+        因超时结束时 timed_out 为 True。
+        """
+        self._wake = asyncio.Event()
+        self.timed_out = False
+        tasks = set()
+        errors = []
+        source = iter(indexed_urls)
+
+        def finished(task):
+            tasks.discard(task)
+            if not task.cancelled() and task.exception() is not None:
+                errors.append(task.exception())
+            self._wake.set()
+
+        async def run_one(i, url, slot):
+            try:
+                await handler(i, url, slot)
+            finally:
+                slot.release()
+
+        ring = self._ring
+        exhausted = False
+
+        try:
+            while True:
+                if deadline is not None and time.time() >= deadline:
+                    self.timed_out = True
+                cancelling = self.timed_out or (should_stop is not None and should_stop())
+                stopping = bool(errors) or cancelling
+                if cancelling:
+                    for task in tasks:
+                        task.cancel()
+
+                # 预读URL放入各主机的队列，缓冲区满时暂停读取
+                while not stopping and not exhausted and self._buffered < self.buffer_size:
+                    try:
+                        i, url = next(source)
+                    except StopIteration:
+                        exhausted = True
+                        break
+                    host = url_host(url)
+                    state = self.hosts.get(host)
+                    if state is None:
+                        state = self.hosts[host] = HostState(self.rate, self.burst)
+                    if not state.queue:
+                        ring.append(host)
+                    state.queue.append((i, url, 0))
+                    self._buffered += 1
+
+                # 轮转派发：每轮每个主机最多派发一个URL
+                dispatched = False
+                timeout = None
+                now = time.monotonic()
+                for _ in range(len(ring) if not stopping else 0):
+                    if self.active >= self.concurrency:
+                        break
+                    host = ring.popleft()
+                    state = self.hosts[host]
+                    # 不可用的主机不再限速，剩余URL立即派发并直接判为失败
+                    dead = self.breaker is not None and self.breaker.is_dead(host)
+                    wait = 0 if dead else self._wait_time(host, state, now)
+                    if wait == 0:
+                        i, url, attempt = state.queue.popleft()
+                        self._buffered -= 1
+                        if dead:
+                            state.active += 1
+                        else:
+                            state.take(now, self.crawl_delay)
+                        self.active += 1
+                        slot = Slot(self, host, i, url, attempt, circuit_open=dead)
+                        task = asyncio.ensure_future(run_one(i, url, slot))
+                        tasks.add(task)
+                        task.add_done_callback(finished)
+                        dispatched = True
+                        if state.queue:
+                            ring.append(host)
+                    else:
+                        ring.append(host)
+                        if wait is not None:
+                            timeout = wait if timeout is None else min(timeout, wait)
+
+                if not tasks and (stopping or (exhausted and not ring)):
+                    break
+                if dispatched:
+                    # 让新任务开始运行，然后继续读取和派发
+                    await asyncio.sleep(0)
+                    continue
+
+                # 等待名额归还、最早的主机限流到期、总时限到期或检查停止请求
+                if deadline is not None and not self.timed_out:
+                    remaining = max(0.0, deadline - time.time())
+                    timeout = remaining if timeout is None else min(timeout, remaining)
+                if should_stop is not None:
+                    timeout = STOP_POLL_INTERVAL if timeout is None else min(timeout, STOP_POLL_INTERVAL)
+                self._wake.clear()
+                try:
+                    await asyncio.wait_for(self._wake.wait(), timeout)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            # 调度本身被取消时也不留下仍在运行的任务
+            for task in list(tasks):
+                task.cancel()
+
+        if errors:
+            raise errors[0]
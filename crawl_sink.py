@@ -0,0 +1,175 @@
+"""
+Crawl4AI 单文件结果库
+把 Markdown 和信息记录写入输出目录中的一个 SQLite 数据库（results.db），代替每个网址
+一个 .md 和一个 _info.json 文件：百万级的批量任务不再产生大量小文件，备份和下游读取时
+按 rowid 顺序扫描一张表即可。PDF 和截图体积较大，仍保存为单独的文件。
+
+记录先缓存在内存中，按批在专用线程里用一个事务写入，不阻塞事件循环；多个工作进程可以
+同时写入同一个数据库（WAL 模式，每次只短暂持有写锁）。任务日志可能记下了尚未写入的
+记录，继续任务时用 drop_unsaved() 把这些网址重新加入待爬列表。
+
+读取示例::
+
+    conn = sqlite3.connect("outputs/results.db")
+    for url, markdown, info in conn.execute("SELECT url, markdown, info FROM results ORDER BY rowid"):
+        ...
+"""
+
+import asyncio
+import json
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from urllib.parse import quote, unquote
+
+# 输出方式：files 为每个网址单独的文件（原有方式）；sqlite 为写入 results.db；
+# archive 为连同原始 HTML 写入压缩归档（见 crawl_archive）
+SINKS = ["files", "sqlite", "archive"]
+
+SINK_NAME = "results.db"
+
+# 累计多少条记录或多少秒后写入一次
+BATCH_SIZE = 200
+FLUSH_INTERVAL = 2.0
+
+# 记录类型 -> 数据库列
+COLUMNS = {"markdown": "markdown", "info": "info"}
+
+# 继续任务时每次查询的网址数（SQLite 参数个数有上限）
+QUERY_CHUNK = 500
+
+
+class ResultSink:
+    """批量写入 Markdown 和信息记录的 SQLite 结果库
+
+    每个网址一行（以网址为主键），同一网址再次爬取时覆盖原有内容。
+    输出文件列表、任务日志和输出清单中用 locator() 生成的“库文件名#类型:网址”表示一条记录。
+    metrics 为 CrawlMetrics 时记录每次写入的耗时（write_sink）和写入的字节数。
+    """
+
+    def __init__(self, path, batch_size=BATCH_SIZE, interval=FLUSH_INTERVAL, metrics=None):
+        """打开或创建结果库，path 为数据库文件路径（或所在的输出目录）"""
+        path = Path(path)
+        self.path = path / SINK_NAME if path.is_dir() else path
+        self.batch_size = batch_size
+        self.interval = interval
+        self.metrics = metrics
+        self.pending = []
+        self.last_flush = time.monotonic()
+        self.flushing = None
+
+        # SQLite 连接只在这一个线程中使用
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="crawl-sink")
+        self.conn = self.executor.submit(self._connect).result()
+
+    def _connect(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(str(self.path), timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript("""
+            CREATE TABLE IF NOT EXISTS results (
+                url TEXT PRIMARY KEY,
+                batch_index INTEGER,
+                markdown TEXT,
+                info TEXT,
+                updated_at REAL NOT NULL
+            );
+        """)
+        conn.commit()
+        return conn
+
+    def locator(self, kind, url):
+        """一条记录在输出文件列表中的表示：库文件路径#类型:网址（网址经过转义）"""
+        return f"{self.path}#{kind}:{quote(url, safe='')}"
+
+    async def write_markdown(self, url, markdown, index=None):
+        """写入网址的 Markdown，返回 (记录位置, 字节数)"""
+        return await self._put("markdown", url, str(markdown), index)
+
+    async def write_info(self, url, info, index=None):
+        """写入网址的信息记录（JSON），返回 (记录位置, 字节数)"""
+        return await self._put("info", url, json.dumps(info, ensure_ascii=False), index)
+
+    async def _put(self, kind, url, text, index):
+        size = len(text.encode('utf-8'))
+        self.pending.append((kind, url, index, text, time.time()))
+        if self.metrics is not None:
+            self.metrics.count("bytes", "md" if kind == "markdown" else "json", size)
+        if len(self.pending) >= self.batch_size or time.monotonic() - self.last_flush >= self.interval:
+            await self.flush()
+        return self.locator(kind, url), size
+
+    async def flush(self):
+        """把缓存的记录交给写入线程；上一批尚未写完时先等待（背压）"""
+        if self.flushing is not None:
+            await asyncio.wrap_future(self.flushing)
+            self.flushing = None
+        pending, self.pending = self.pending, []
+        self.last_flush = time.monotonic()
+        if pending:
+            self.flushing = self.executor.submit(self._write, pending)
+
+    def _write(self, rows):
+        """在写入线程中用一个事务写入一批记录"""
+        started = time.perf_counter()
+        with self.conn:
+            for kind, url, index, text, now in rows:
+                column = COLUMNS[kind]
+                self.conn.execute(
+                    f"INSERT INTO results (url, batch_index, {column}, updated_at) VALUES (?, ?, ?, ?) "
+                    f"ON CONFLICT(url) DO UPDATE SET batch_index = excluded.batch_index, "
+                    f"{column} = excluded.{column}, updated_at = excluded.updated_at",
+                    (url, index, text, now)
+                )
+        if self.metrics is not None:
+            self.metrics.observe("write_sink", time.perf_counter() - started)
+
+    def drop_unsaved(self, completed):
+        """从任务日志读出的已完成结果 {序号: 结果} 中去掉记录未写入本库的项，返回去掉的数量
+
+        结果中的 files（或命令行报告的 file）列出了记录位置；崩溃前最后一批尚未写入的
+        记录在库中找不到，对应的网址需要重新爬取。
+        """
+        prefix = f"{self.path}#"
+        wanted = {}  # 序号 -> [(类型, 网址)]
+        for i, result in completed.items():
+            files = result.get("files") or ([result["file"]] if result.get("file") else [])
+            records = []
+            for name in files:
+                if name.startswith(prefix):
+                    kind, _, url = name[len(prefix):].partition(":")
+                    records.append((kind, unquote(url)))
+            if records:
+                wanted[i] = records
+
+        urls = sorted({url for records in wanted.values() for _, url in records})
+        saved = self.executor.submit(self._saved_kinds, urls).result()
+        unsaved = [i for i, records in wanted.items()
+                   if any(kind not in saved.get(url, ()) for kind, url in records)]
+        for i in unsaved:
+            del completed[i]
+        return len(unsaved)
+
+    def _saved_kinds(self, urls):
+        """查询各网址已写入的记录类型 {网址: {类型}}"""
+        saved = {}
+        for start in range(0, len(urls), QUERY_CHUNK):
+            chunk = urls[start:start + QUERY_CHUNK]
+            rows = self.conn.execute(
+                f"SELECT url, markdown IS NOT NULL, info IS NOT NULL FROM results "
+                f"WHERE url IN ({', '.join('?' * len(chunk))})", chunk
+            )
+            for url, has_markdown, has_info in rows:
+                saved[url] = {kind for kind, present in (("markdown", has_markdown), ("info", has_info)) if present}
+        return saved
+
+    async def close(self):
+        """写入剩余的记录并关闭数据库"""
+        await self.flush()
+        if self.flushing is not None:
+            await asyncio.wrap_future(self.flushing)
+            self.flushing = None
+        self.executor.submit(self.conn.close).result()
+        self.executor.shutdown(wait=True)
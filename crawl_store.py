@@ -0,0 +1,79 @@
+"""
+Crawl4AI 内容寻址存储
+输出文件的内容按 SHA-256 保存在 .store/objects/ 下（每种内容只保存一份），
+各网址的输出文件是指向这些对象的硬链接：镜像站、跳转和几乎相同的落地页产生的
+相同 PDF、截图和 Markdown 不再重复占用磁盘；再次爬取时内容未变化的文件保持不动。
+
+输出文件总是整体替换（先建链接再重命名），不会原地修改，共享同一对象的其他文件不受影响。
+不支持硬链接时（如输出目录和存储目录不在同一磁盘）退回为保存副本。
+"""
+
+import hashlib
+import os
+import threading
+from pathlib import Path
+
+from crawl_writer import atomic_write
+
+
+class ContentStore:
+    """按内容哈希保存输出文件，在指定路径创建硬链接
+
+    metrics 为 CrawlMetrics 时按结果计数（store 计数器）：new 新内容、dedup 内容已存在、
+    unchanged 文件已是同一内容、copy 无法建立硬链接而保存了副本。
+    """
+
+    def __init__(self, root, metrics=None):
+        """root 为存储目录（如 outputs/.store）"""
+        self.root = Path(root)
+        self.objects = self.root / "objects"
+        self.objects.mkdir(parents=True, exist_ok=True)
+        self.metrics = metrics
+
+    def object_path(self, digest):
+        """对象文件路径：按哈希前两位分子目录"""
+        return self.objects / digest[:2] / digest[2:]
+
+    def put(self, data, digest=None):
+        """保存内容（已存在时跳过），返回 (哈希, 是否新保存)；已算好哈希时可通过 digest 传入"""
+        digest = digest or hashlib.sha256(data).hexdigest()
+        path = self.object_path(digest)
+        if path.exists():
+            return digest, False
+        path.parent.mkdir(exist_ok=True)
+        atomic_write(path, data)
+        return digest, True
+
+    def write(self, path, data, digest=None):
+        """把 data 写为 path：保存到存储中并在 path 建立硬链接，返回字节数（与 atomic_write 相同）"""
+        path = Path(path)
+        digest, created = self.put(data, digest)
+        target = self.object_path(digest)
+
+        # 再次爬取时内容未变化：文件已经是同一对象的链接，不再写入
+        if not created and path.exists():
+            try:
+                if os.path.samefile(path, target):
+                    self._count("unchanged")
+                    return len(data)
+            except OSError:
+                pass
+
+        # 先在同一目录建立临时链接再替换，读取方不会看到缺失的文件
+        tmp_path = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.link")
+        try:
+            tmp_path.unlink(missing_ok=True)
+            os.link(target, tmp_path)
+            os.replace(tmp_path, path)
+        except OSError:
+            tmp_path.unlink(missing_ok=True)
+            atomic_write(path, data)
+            self._count("copy")
+            return len(data)
+
+        self._count("new" if created else "dedup")
+        return len(data)
+
+    def _count(self, result):
+        if self.metrics is not None:
+            self.metrics.count("store", result)
@@ -0,0 +1,447 @@
+"""
+Crawl4AI 批量网址来源
+网址文件不再整体读入内存：打开时扫描一遍建立稀疏的偏移索引（每隔固定条数记录一次
+文件位置），之后按需逐行读取；断点续爬时可以直接跳到第一个未完成的网址。
+扫描时按规范化后的网址去重，重复的网址只爬取第一次出现的那个（保持原始写法）。
+"""
+
+import asyncio
+import hashlib
+import os
+import shutil
+import sqlite3
+from collections import Counter
+from itertools import islice
+from pathlib import Path
+from urllib.parse import urlparse, urlsplit, urlunsplit
+
+# 每隔多少个网址记录一次文件偏移
+CHECKPOINT_INTERVAL = 1024
+
+# 去重时精确集合的容量，超过后改用磁盘上的临时库做外部排序去重
+EXACT_DEDUP_LIMIT = 100000
+
+# 转入临时库后，记录攒够多少条在一个事务中批量写入
+SPILL_BATCH = 20000
+
+# 不影响页面内容的跟踪参数
+TRACKING_PARAMS = {"gclid", "fbclid", "msclkid", "yclid", "dclid", "mc_cid", "mc_eid", "igshid", "_ga", "spm"}
+TRACKING_PREFIXES = ("utm_",)
+
+
+def parse_url_line(line):
+    """解析一行文本，空行和 # 开头的注释行返回 None"""
+    url = line.strip()
+    if not url or url.startswith('#'):
+        return None
+    return url
+
+
+def canonicalize_url(url):
+    """规范化网址：协议和主机名小写，去掉默认端口、片段、跟踪参数和路径末尾的斜杠，
+    查询参数按名称排序（参数值保持原样，不重新编码；用户名和密码保持原样）
+
+    只用作键：批量去重、结果缓存、增量爬取的校验信息和输出清单都用它生成网址的键，
+    被合并的重复网址在各处都对应同一条记录；实际爬取、报告和保存的仍是原始网址。
+    """
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    userinfo, at, host = parts.netloc.rpartition("@")
+    host = host.lower()
+    if (scheme == "http" and host.endswith(":80")) or (scheme == "https" and host.endswith(":443")):
+        host = host.rsplit(":", 1)[0]
+    netloc = userinfo + at + host
+
+    path = parts.path or "/"
+    if len(path) > 1 and path.endswith("/"):
+        path = path.rstrip("/") or "/"
+
+    params = []
+    for param in parts.query.split("&"):
+        name = param.split("=", 1)[0].lower()
+        if not param or name in TRACKING_PARAMS or name.startswith(TRACKING_PREFIXES):
+            continue
+        params.append(param)
+    query = "&".join(sorted(params, key=lambda param: param.split("=", 1)[0]))
+
+    return urlunsplit((scheme, netloc, path, query, ""))
+
+
+def key_digest(key):
+    """去重键的 16 字节摘要，转入临时库后代替键本身排序和比较"""
+    return hashlib.blake2b(key.encode("utf-8"), digest_size=16).digest()
+
+
+def dedup_key(canonical_url):
+    """去重用的键：http 和 https 视为同一个网址"""
+    scheme, sep, rest = canonical_url.partition("://")
+    if sep and scheme in ("http", "https"):
+        return rest
+    return canonical_url
+
+
+class UrlDeduplicator:
+    """网址去重：记录每个去重键第一次出现的序号和网址
+
+    数量不超过 exact_limit 时使用内存中的字典，add() 立即给出结果；超过后改为外部排序
+    去重，内存占用不再随网址数量增长：每个网址的键摘要、序号和网址追加到磁盘上的临时
+    SQLite 库（攒够 SPILL_BATCH 条在一个事务中写入，不维护索引），扫描结束后 finish()
+    一次建立索引，按摘要分组找出重复的网址。整个过程耗时随网址数线性增长。
+    """
+
+    def __init__(self, exact_limit=EXACT_DEDUP_LIMIT):
+        self.exact_limit = exact_limit
+        self.seen = {}
+        self.conn = None
+        self.pending = []  # 尚未写入临时库的记录 (摘要, 序号, 网址)
+
+    def _spill(self):
+        """精确字典超出容量，转为临时库"""
+        self.conn = sqlite3.connect("")  # 空路径为自动删除的临时库
+        self.conn.execute("PRAGMA journal_mode=OFF")
+        self.conn.execute("PRAGMA synchronous=OFF")
+        self.conn.execute("CREATE TABLE seen (digest BLOB, idx INTEGER, url TEXT)")
+        self.pending = [(key_digest(key), index, url) for key, (index, url) in self.seen.items()]
+        self.seen = None
+        self._flush()
+
+    def _flush(self):
+        """在一个事务中追加写入攒下的记录"""
+        with self.conn:
+            self.conn.executemany("INSERT INTO seen VALUES (?, ?, ?)", self.pending)
+        self.pending = []
+
+    def add(self, key, index, url):
+        """第一次出现时记录并返回 None，重复时返回第一次出现的 (序号, 网址)
+
+        转入临时库后一律返回 None，重复的网址由 finish() 给出。
+        """
+        if self.conn is None:
+            first = self.seen.get(key)
+            if first is not None:
+                return first
+            self.seen[key] = (index, url)
+            if len(self.seen) > self.exact_limit:
+                self._spill()
+            return None
+
+        self.pending.append((key_digest(key), index, url))
+        if len(self.pending) >= SPILL_BATCH:
+            self._flush()
+        return None
+
+    def finish(self):
+        """扫描结束后找出转入临时库以来的重复网址，按序号返回 [(序号, 网址, 首次出现的序号, 网址)]"""
+        if self.conn is None:
+            return []
+        self._flush()
+        self.conn.execute("CREATE INDEX seen_digest ON seen (digest, idx)")
+        return self.conn.execute("""
+            SELECT s.idx, s.url, f.idx, f.url
+            FROM (SELECT digest, MIN(idx) AS first FROM seen GROUP BY digest HAVING COUNT(*) > 1) g
+            JOIN seen f ON f.digest = g.digest AND f.idx = g.first
+            JOIN seen s ON s.digest = g.digest AND s.idx > g.first
+            ORDER BY s.idx
+        """).fetchall()
+
+    def close(self):
+        """释放临时库"""
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+
+
+def prefer_https(kept, other):
+    """同一网址的 http 和 https 写法合并时返回应爬取的写法：保留的是 http 而另一个是 https 时换成 https"""
+    if other.lower().startswith("https://") and kept.lower().startswith("http://"):
+        return other
+    return kept
+
+
+def url_host(url):
+    """返回网址的主机名（小写），用于按主机限流和分配进程"""
+    return urlparse(url).netloc.lower()
+
+
+class UrlSource:
+    """批量网址来源：若干直接给出的网址，后接一个逐行读取的网址文件
+
+    序号从1开始按输入顺序编号（空行和注释不计），与任务日志和报告中的 index 一致。
+    规范化（见 canonicalize_url）后重复的网址只产出第一次出现的那个，产出的是它的原始写法；
+    同一网址的 http 和 https 写法合并时产出 https 写法（记录在 upgrades 中，{序号: https 网址}）。
+    其余重复记录在 duplicates 中（{序号: (原始网址, 保留的序号, 保留的网址)}）。
+    对象只保存文件路径、偏移索引和重复记录，可以传给工作进程，由各进程自行读取文件。
+    """
+
+    def __init__(self, path=None, urls=None, checkpoint_interval=CHECKPOINT_INTERVAL,
+                 dedup_limit=EXACT_DEDUP_LIMIT):
+        """path 为网址文件路径（可选），urls 为排在文件之前的网址列表"""
+        self.path = Path(path) if path else None
+        self.head = [url for url in (parse_url_line(u) for u in urls or []) if url]
+        self.checkpoint_interval = checkpoint_interval
+        self.checkpoints = []
+        self.file_count = 0
+        self.duplicates = {}
+        self.upgrades = {}
+        self._build_index(dedup_limit)
+
+    def _collapse(self, index, url, first_index, first_url):
+        """记录第 index 个网址与第 first_index 个重复，需要时把保留的网址换成 https 写法"""
+        kept = prefer_https(first_url, url)
+        if kept != first_url:
+            self.upgrades.setdefault(first_index, kept)
+        self.duplicates[index] = (url, first_index, first_url)
+
+    def _build_index(self, dedup_limit):
+        """扫描网址，统计数量、记录偏移索引并找出重复的网址"""
+        dedup = UrlDeduplicator(dedup_limit)
+
+        def check(index, url):
+            first = dedup.add(dedup_key(canonicalize_url(url)), index, url)
+            if first is not None:
+                self._collapse(index, url, *first)
+
+        try:
+            for i, url in enumerate(self.head, 1):
+                check(i, url)
+
+            if self.path is not None:
+                offset = 0
+                with open(self.path, 'rb') as f:
+                    for line in f:
+                        url = parse_url_line(line.decode('utf-8', errors='replace'))
+                        if url:
+                            if self.file_count % self.checkpoint_interval == 0:
+                                self.checkpoints.append(offset)
+                            self.file_count += 1
+                            check(len(self.head) + self.file_count, url)
+                        offset += len(line)
+
+            for index, url, first_index, first_url in dedup.finish():
+                self._collapse(index, url, first_index, first_url)
+        finally:
+            dedup.close()
+        self._resolve_duplicates()
+
+    @classmethod
+    def from_index(cls, path, checkpoints, count, checkpoint_interval=CHECKPOINT_INTERVAL):
+        """用已知的偏移索引打开一个没有重复网址的文件，不扫描文件"""
+        source = cls.__new__(cls)
+        source.path = Path(path)
+        source.head = []
+        source.checkpoint_interval = checkpoint_interval
+        source.checkpoints = list(checkpoints)
+        source.file_count = count
+        source.duplicates = {}
+        source.upgrades = {}
+        return source
+
+    def with_head(self, urls):
+        """返回在前面加上 urls 的新来源，复用本来源的偏移索引和重复记录，不重新扫描文件
+
+        新加的网址之间会去重；它们与文件中网址的重复要等 save() 逐行写出列表时才补上。
+        """
+        source = UrlSource(urls=list(urls) + self.head, checkpoint_interval=self.checkpoint_interval)
+        shift = len(source.head) - len(self.head)
+        source.path = self.path
+        source.checkpoints = self.checkpoints
+        source.file_count = self.file_count
+        for i, (url, first, kept) in self.duplicates.items():
+            if i > len(self.head):
+                source.duplicates[i + shift] = (url, first + shift, kept)
+        for i, url in self.upgrades.items():
+            if i > len(self.head):
+                source.upgrades[i + shift] = url
+        source._resolve_duplicates()
+        return source
+
+    def _resolve_duplicates(self):
+        """重复记录改为指向最终保留的序号和实际爬取的写法（保留的网址本身也重复或换成了 https 时）"""
+        for i, (url, first, kept) in self.duplicates.items():
+            while first in self.duplicates:
+                first, kept = self.duplicates[first][1:]
+            self.duplicates[i] = (url, first, self.upgrades.get(first, kept))
+
+    def save(self, path):
+        """把去重后的网址逐行写入 path，返回指向该文件的来源（序号从1重新编号）
+
+        写出时顺带记录偏移索引，不再扫描写出的文件；直接给出的网址与文件中网址之间的
+        重复也在这一遍中找出并记入 duplicates（文件中是 https 写法时直接给出的网址随之换成
+        https，因此文件部分先写入临时文件，最后接在直接给出的网址之后）。先写临时文件再替换，
+        path 就是本来源读取的文件时也不会读写冲突。
+        """
+        path = Path(path)
+        tmp_path = path.with_name(path.name + ".tmp")
+        body_path = path.with_name(path.name + ".body.tmp")
+        head_keys = {}
+        for i, url in enumerate(self.head, 1):
+            if i not in self.duplicates:
+                head_keys.setdefault(dedup_key(canonicalize_url(url)), i)
+
+        # 文件部分：序号从 len(head_keys) 开始，偏移先相对于文件部分的开头记录
+        count = len(head_keys)
+        body_checkpoints = []
+        offset = 0
+        with open(body_path, 'wb') as body:
+            for i, url in self._iter_raw(len(self.head) + 1):
+                if i in self.duplicates:
+                    continue
+                first = head_keys.get(dedup_key(canonicalize_url(url))) if head_keys else None
+                if first is not None:
+                    self._collapse(i, url, first, self.upgrades.get(first, self.head[first - 1]))
+                    continue
+                if count % self.checkpoint_interval == 0:
+                    body_checkpoints.append(offset)
+                line = (self.upgrades.get(i, url) + "\n").encode('utf-8')
+                body.write(line)
+                offset += len(line)
+                count += 1
+
+        checkpoints = []
+        offset = 0
+        try:
+            with open(tmp_path, 'wb') as f:
+                for position, i in enumerate(sorted(head_keys.values())):
+                    if position % self.checkpoint_interval == 0:
+                        checkpoints.append(offset)
+                    line = (self.upgrades.get(i, self.head[i - 1]) + "\n").encode('utf-8')
+                    f.write(line)
+                    offset += len(line)
+                with open(body_path, 'rb') as body:
+                    shutil.copyfileobj(body, f)
+        finally:
+            body_path.unlink(missing_ok=True)
+        os.replace(tmp_path, path)
+        self._resolve_duplicates()
+        checkpoints.extend(offset + checkpoint for checkpoint in body_checkpoints)
+        return UrlSource.from_index(path, checkpoints, count, self.checkpoint_interval)
+
+    def __len__(self):
+        """输入的网址总数（包括重复的）"""
+        return len(self.head) + self.file_count
+
+    @property
+    def unique_count(self):
+        """去重后的网址数"""
+        return len(self) - len(self.duplicates)
+
+    def __iter__(self):
+        return self.iter_from(1)
+
+    def _iter_raw(self, start):
+        """从第 start 个网址开始产出 (序号, 原始网址)，借助偏移索引直接定位"""
+        for i in range(start, len(self.head) + 1):
+            yield i, self.head[i - 1]
+
+        if self.path is None:
+            return
+
+        # 文件中第 position 个网址（从0开始）对应的序号为 len(head) + position + 1
+        target = max(0, start - len(self.head) - 1)
+        if target >= self.file_count:
+            return
+        checkpoint = target // self.checkpoint_interval
+        position = checkpoint * self.checkpoint_interval
+
+        with open(self.path, 'rb') as f:
+            f.seek(self.checkpoints[checkpoint])
+            for line in f:
+                url = parse_url_line(line.decode('utf-8', errors='replace'))
+                if not url:
+                    continue
+                if position >= target:
+                    yield len(self.head) + position + 1, url
+                position += 1
+
+    def iter_from(self, start=1):
+        """从第 start 个网址开始逐个产出 (序号, 网址)，跳过重复的网址
+
+        网址为原始写法（http 和 https 写法合并时为 https 写法），不做规范化。
+        """
+        for i, url in self._iter_raw(max(1, start)):
+            if i not in self.duplicates:
+                yield i, self.upgrades.get(i, url)
+
+    def get(self, index):
+        """读取第 index 个网址（与 iter_from 产出的写法相同），不存在或为重复网址时返回 None"""
+        for i, url in self.iter_from(index):
+            return url if i == index else None
+        return None
+
+    def preview(self, limit=20):
+        """返回前 limit 个网址，用于界面预览"""
+        return [url for _, url in islice(self, limit)]
+
+    def host_counts(self):
+        """统计每个主机的网址数（只保存主机名，不保存网址）"""
+        return Counter(url_host(url) for _, url in self)
+
+    def collapsed(self):
+        """返回被合并的网址列表，每项包含原始网址和实际爬取的那个网址（保留的序号和写法）"""
+        return [
+            {"index": i, "url": url, "kept_index": first, "kept": kept}
+            for i, (url, first, kept) in sorted(self.duplicates.items())
+        ]
+
+
+def iter_pending(source, skip=(), hosts=None):
+    """产出尚未完成的 (序号, 网址)
+
+    skip 为已完成的序号集合，开头连续完成的部分借助偏移索引直接跳过；
+    hosts 不为 None 时只产出这些主机的网址（多进程时每个进程负责一部分主机）。
+    """
+    start = 1
+    while start in skip or start in source.duplicates:
+        start += 1
+
+    for i, url in source.iter_from(start):
+        if i in skip:
+            continue
+        if hosts is not None and url_host(url) not in hosts:
+            continue
+        yield i, url
+
+
+def shard_hosts(host_counts, workers):
+    """把主机分成 workers 份，返回主机名集合列表，同一主机总在同一份中
+
+    网址多的主机优先分配，每个主机整体放入当前网址最少的一份，使各进程负载均衡。
+    """
+    workers = max(1, workers)
+    shards = [set() for _ in range(workers)]
+    loads = [0] * workers
+    for host, count in sorted(host_counts.items(), key=lambda item: item[1], reverse=True):
+        k = loads.index(min(loads))
+        shards[k].add(host)
+        loads[k] += count
+    return [shard for shard in shards if shard]
+
+
+class SingleFlight:
+    """合并同时进行的相同请求：同一个键正在执行时，后来的调用等待并共享第一次调用的结果
+
+    某个调用方被取消（如超时或停止）时不影响其他调用方；所有调用方都放弃后取消这次请求。
+    """
+
+    def __init__(self):
+        self._inflight = {}
+        self.coalesced = 0
+
+    async def run(self, key, func):
+        """执行 func()（返回协程），同一个键同时只执行一次"""
+        entry = self._inflight.get(key)
+        if entry is not None:
+            self.coalesced += 1
+        else:
+            task = asyncio.ensure_future(func())
+            entry = self._inflight[key] = {"task": task, "waiters": 0}
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+
+        task = entry["task"]
+        entry["waiters"] += 1
+        try:
+            return await asyncio.shield(task)
+        finally:
+            entry["waiters"] -= 1
+            if entry["waiters"] == 0 and not task.done():
+                task.cancel()
@@ -8,9 +8,13 @@ import nest_asyncio
 import argparse
 import json
 import os
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import asynccontextmanager
 from pathlib import Path
+from types import SimpleNamespace
 from datetime import datetime
-import base64
 
 # 应用nest_asyncio以支持在已有事件循环中运行
 nest_asyncio.apply()
@@ -19,20 +23,192 @@ from crawl4ai import AsyncWebCrawler, BrowserConfig, CrawlerRunConfig, CacheMode
 from crawl4ai.content_filter_strategy import PruningContentFilter, BM25ContentFilter
 from crawl4ai.markdown_generation_strategy import DefaultMarkdownGenerator
 
+from crawl_archive import ARCHIVE_DIR, INDEX_NAME, CrawlArchive, print_archive
+from crawl_cache import CACHE_MODES, DEFAULT_MAX_SIZE_MB, DEFAULT_TTL, ResultCache
+from crawl_events import FILE_WRITTEN, URL_FINISHED, URL_RETRY, URL_STARTED, EventBus
+from crawl_images import DEFAULT_SCREENSHOT_OPTIONS, SCREENSHOT_FORMATS, missing_pillow
+from crawl_incremental import ValidatorStore
+from crawl_journal import BatchJournal, JsonlReport
+from crawl_manifest import LAYOUTS, MANIFEST_NAME, OutputManifest, flat_name, hashed_path, print_manifest
+from crawl_metrics import CrawlMetrics, MetricsServer
+from crawl_profile import CrawlProfiler
+from crawl_retry import CircuitBreaker, RetryPolicy, error_type, is_transient, retry_after_of
+from crawl_scheduler import DEFAULT_URL_TIMEOUT, HostScheduler
+from crawl_sink import SINK_NAME, SINKS, ResultSink
+from crawl_store import ContentStore
+from crawl_urls import SingleFlight, UrlSource, iter_pending, shard_hosts, url_host
+from crawl_writer import AsyncFileWriter
+
 class CrawlUtility:
-    """Crawl4AI 实用工具类"""
+    """Crawl4AI 实用工具类
+    
+    默认启用本地结果缓存（保存在 输出目录/.cache 中），cache_mode 为 "bypass" 时
+    每次都重新爬取。
+    
+    metrics 记录创建以来各阶段的耗时（fetch 为浏览器爬取，包括页面加载、渲染、
+    内容过滤和Markdown、PDF、截图生成；cache 为缓存命中；validate 为增量模式的条件请求；
+    write_* 为文件写入）以及页面数、写入字节数和按类型分类的错误数。
+    
+    dedup 为 True 时输出文件按内容保存在 输出目录/.store 中（见 crawl_store），
+    相同内容只占用一份磁盘空间，各输出文件为硬链接。
     
-    def __init__(self, output_dir="outputs"):
-        """初始化工具"""
+    可作为异步上下文管理器使用，在 ``async with`` 范围内所有方法共享同一个
+    浏览器，空闲超过 idle_timeout 秒后自动关闭，下次调用时再重新启动；退出时关闭浏览器
+    和结果缓存的数据库连接（再次进入时重新打开）::
+    
+        async with CrawlUtility() as utility:
+            await utility.simple_crawl(url)
+            await utility.pdf_export(url)
+    """
+    
+    def __init__(self, output_dir="outputs", idle_timeout=300, cache_mode="enabled",
+                 cache_ttl=DEFAULT_TTL, cache_size_mb=DEFAULT_MAX_SIZE_MB, url_timeout=DEFAULT_URL_TIMEOUT,
+                 dedup=False):
+        """初始化工具，url_timeout 为单个页面的爬取时限（秒）"""
         self.output_dir = Path(output_dir)
         self.output_dir.mkdir(exist_ok=True)
+        self.url_timeout = url_timeout
+        
+        # 本地结果缓存
+        self.cache_options = {
+            "cache_mode": cache_mode,
+            "cache_ttl": cache_ttl,
+            "cache_size_mb": cache_size_mb
+        }
+        self.cache = None
+        self._open_cache()
+        
+        # 性能指标
+        self.metrics = CrawlMetrics()
+        
+        # 文件解码和写入在线程池中执行，不阻塞事件循环；去重时写入内容寻址存储，
+        # 写入时计算的哈希记入输出清单
+        self.store = ContentStore(self.output_dir / ".store", self.metrics) if dedup else None
+        self.writer = AsyncFileWriter(metrics=self.metrics, store=self.store)
+        
+        # 同一页面同时被多次请求时只爬取一次
+        self.inflight = SingleFlight()
+        
+        # 批量爬取的进度事件，默认输出到终端，也可以订阅后自行处理
+        self.events = EventBus()
+        self.events.subscribe(print_batch_event)
+        
+        # 共享浏览器会话
+        self.idle_timeout = idle_timeout
+        self._in_session = False
+        self._crawler = None
+        self._crawler_lock = None
+        self._active_calls = 0
+        self._idle_task = None
+        
+    def _open_cache(self):
+        """打开结果缓存（cache_mode 为 bypass 时不使用缓存）"""
+        if self.cache is None and self.cache_options["cache_mode"] != "bypass":
+            self.cache = ResultCache(self.output_dir / ".cache" / "results.db", self.cache_options["cache_mode"],
+                                     self.cache_options["cache_ttl"], self.cache_options["cache_size_mb"])
+        
+    async def __aenter__(self):
+        """进入会话：之后的调用复用同一个浏览器"""
+        self._open_cache()
+        self._in_session = True
+        self._crawler_lock = asyncio.Lock()
+        return self
+        
+    async def __aexit__(self, exc_type, exc, tb):
+        """退出会话，关闭浏览器和结果缓存"""
+        self._in_session = False
+        await self.close()
+        if self.cache is not None:
+            self.cache.close()
+            self.cache = None
+        
+    async def close(self):
+        """关闭共享浏览器"""
+        if self._idle_task is not None:
+            self._idle_task.cancel()
+            self._idle_task = None
+        
+        if self._crawler is not None:
+            crawler, self._crawler = self._crawler, None
+            await crawler.close()
+            
+    async def _arun(self, crawler, url, config=None, **options):
+        """执行爬取，启用缓存时优先使用未过期的缓存结果
+        
+        相同页面（规范化URL和输出配置都相同）的并发请求共享同一次爬取。
+        超过 url_timeout 秒时取消爬取（关闭页面），返回失败结果。
+        耗时计入 fetch（缓存命中时为 cache）阶段，失败按类型计数。
+        """
+        async def fetch():
+            if self.cache is None:
+                return await crawler.arun(url=url, config=config)
+            return await self.cache.arun(crawler, url, config, **options)
+        
+        start = time.perf_counter()
+        try:
+            result = await asyncio.wait_for(
+                self.inflight.run(ResultCache.make_key(url, **options), fetch), self.url_timeout
+            )
+        except asyncio.TimeoutError:
+            result = SimpleNamespace(url=url, success=False, status_code=None, response_headers={},
+                                     error_message=f"Timeout: 超过 {self.url_timeout} 秒未完成")
+        except Exception as e:
+            self.metrics.observe("fetch", time.perf_counter() - start)
+            self.metrics.count("errors", error_type(error=e))
+            raise
+        
+        self.metrics.observe("cache" if getattr(result, 'from_cache', False) else "fetch",
+                             time.perf_counter() - start)
+        if not result.success:
+            self.metrics.count("errors", error_type(result))
+        if getattr(result, 'from_cache', False):
+            print(f"♻️ 使用缓存结果: {url}")
+        return result
+        
+    @asynccontextmanager
+    async def _crawler_session(self):
+        """获取爬虫实例：会话中复用共享浏览器，否则临时启动一个"""
+        if not self._in_session:
+            async with AsyncWebCrawler() as crawler:
+                yield crawler
+            return
+        
+        async with self._crawler_lock:
+            if self._idle_task is not None:
+                self._idle_task.cancel()
+                self._idle_task = None
+            
+            if self._crawler is None:
+                crawler = AsyncWebCrawler()
+                await crawler.start()
+                self._crawler = crawler
+            
+            self._active_calls += 1
+        
+        try:
+            yield self._crawler
+        finally:
+            self._active_calls -= 1
+            if self._active_calls == 0 and self.idle_timeout:
+                self._idle_task = asyncio.ensure_future(self._close_when_idle())
+                
+    async def _close_when_idle(self):
+        """空闲超时后关闭共享浏览器"""
+        await asyncio.sleep(self.idle_timeout)
+        
+        async with self._crawler_lock:
+            if self._active_calls == 0 and self._crawler is not None:
+                self._idle_task = None
+                crawler, self._crawler = self._crawler, None
+                await crawler.close()
+                print(f"💤 浏览器空闲超过 {self.idle_timeout} 秒，已关闭")
         
     async def simple_crawl(self, url, output_file=None):
         """简单爬取网页内容"""
         print(f"🌐 开始爬取: {url}")
         
-        async with AsyncWebCrawler() as crawler:
-            result = await crawler.arun(url=url)
+        async with self._crawler_session() as crawler:
+            result = await self._arun(crawler, url)
             
             if result.success:
                 print(f"✅ 爬取成功，内容长度: {len(result.markdown)} 字符")
@@ -41,11 +217,10 @@ class CrawlUtility:
                 if output_file:
                     output_path = self.output_dir / output_file
                 else:
-                    filename = url.replace("https://", "").replace("http://", "").replace("/", "_")
+                    filename = flat_name(url)
                     output_path = self.output_dir / f"{filename}.md"
                 
-                with open(output_path, 'w', encoding='utf-8') as f:
-                    f.write(result.markdown)
+                await self.writer.write_text(output_path, result.markdown)
                 
                 print(f"📁 已保存到: {output_path}")
                 return result.markdown
@@ -73,8 +248,10 @@ class CrawlUtility:
             )
         )
         
-        async with AsyncWebCrawler() as crawler:
-            result = await crawler.arun(url=url, config=run_config)
+        async with self._crawler_session() as crawler:
+            result = await self._arun(crawler, url, run_config,
+                                      filter_type="bm25" if keywords else "pruning",
+                                      keywords=keywords or "")
             
             if result.success:
                 print(f"✅ 清洗完成，内容长度: {len(result.markdown)} 字符")
@@ -83,12 +260,11 @@ class CrawlUtility:
                 if output_file:
                     output_path = self.output_dir / output_file
                 else:
-                    filename = url.replace("https://", "").replace("http://", "").replace("/", "_")
+                    filename = flat_name(url)
                     suffix = f"_filtered_{keywords}" if keywords else "_cleaned"
                     output_path = self.output_dir / f"{filename}{suffix}.md"
                 
-                with open(output_path, 'w', encoding='utf-8') as f:
-                    f.write(result.markdown)
+                await self.writer.write_text(output_path, result.markdown)
                 
                 print(f"📁 已保存到: {output_path}")
                 return result.markdown
@@ -105,8 +281,8 @@ class CrawlUtility:
             pdf=True
         )
         
-        async with AsyncWebCrawler() as crawler:
-            result = await crawler.arun(url=url, config=run_config)
+        async with self._crawler_session() as crawler:
+            result = await self._arun(crawler, url, run_config, pdf=True)
             
             if result.success and result.pdf:
                 print(f"✅ PDF生成成功，大小: {len(result.pdf) / 1024:.1f} KB")
@@ -115,11 +291,10 @@ class CrawlUtility:
                 if output_file:
                     output_path = self.output_dir / output_file
                 else:
-                    filename = url.replace("https://", "").replace("http://", "").replace("/", "_")
+                    filename = flat_name(url)
                     output_path = self.output_dir / f"{filename}.pdf"
                 
-                with open(output_path, 'wb') as f:
-                    f.write(result.pdf)
+                await self.writer.write_bytes(output_path, result.pdf)
                 
                 print(f"📁 已保存到: {output_path}")
                 return str(output_path)
@@ -127,8 +302,12 @@ class CrawlUtility:
                 print(f"❌ PDF导出失败: {result.error_message if not result.success else 'PDF生成失败'}")
                 return None
                 
-    async def screenshot(self, url, output_file=None):
-        """截取网页截图"""
+    async def screenshot(self, url, output_file=None, options=None):
+        """截取网页截图
+        
+        options 为截图选项（键见 crawl_images.DEFAULT_SCREENSHOT_OPTIONS）：格式（png、webp、jpeg）、
+        质量、最大宽高、缩略图边长和是否只保留首屏；转换在写入线程中进行，需要 Pillow。
+        """
         print(f"📸 开始截图: {url}")
         
         run_config = CrawlerRunConfig(
@@ -136,26 +315,28 @@ class CrawlUtility:
             screenshot=True
         )
         
-        async with AsyncWebCrawler() as crawler:
-            result = await crawler.arun(url=url, config=run_config)
+        async with self._crawler_session() as crawler:
+            result = await self._arun(crawler, url, run_config, screenshot=True)
             
             if result.success and result.screenshot:
                 try:
-                    # 解码base64截图
-                    screenshot_data = base64.b64decode(result.screenshot)
-                    print(f"✅ 截图成功，大小: {len(screenshot_data) / 1024 / 1024:.1f} MB")
-                    
                     # 保存截图
                     if output_file:
                         output_path = self.output_dir / output_file
                     else:
-                        filename = url.replace("https://", "").replace("http://", "").replace("/", "_")
+                        filename = flat_name(url)
                         output_path = self.output_dir / f"{filename}.png"
                     
-                    with open(output_path, 'wb') as f:
-                        f.write(screenshot_data)
+                    if missing_pillow(options):
+                        print("⚠️ 未安装 Pillow，截图按原始 PNG 保存（pip install pillow）")
                     
+                    # 在写入线程中解码和转换base64截图
+                    images = await self.writer.write_screenshot(output_path, result.screenshot, options)
+                    output_path, screenshot_size = images[0]
+                    print(f"✅ 截图成功，大小: {screenshot_size / 1024 / 1024:.1f} MB")
                     print(f"📁 已保存到: {output_path}")
+                    if len(images) > 1:
+                        print(f"🖼️ 缩略图: {images[1][0]} ({images[1][1] / 1024:.1f} KB)")
                     return str(output_path)
                 except Exception as e:
                     print(f"❌ 截图处理失败: {str(e)}")
@@ -168,8 +349,8 @@ class CrawlUtility:
         """提取网页信息"""
         print(f"ℹ️ 开始信息提取: {url}")
         
-        async with AsyncWebCrawler() as crawler:
-            result = await crawler.arun(url=url)
+        async with self._crawler_session() as crawler:
+            result = await self._arun(crawler, url)
             
             if result.success:
                 # 提取信息
@@ -197,11 +378,10 @@ class CrawlUtility:
                 if output_file:
                     output_path = self.output_dir / output_file
                 else:
-                    filename = url.replace("https://", "").replace("http://", "").replace("/", "_")
+                    filename = flat_name(url)
                     output_path = self.output_dir / f"{filename}_info.json"
                 
-                with open(output_path, 'w', encoding='utf-8') as f:
-                    json.dump(info, f, ensure_ascii=False, indent=2)
+                await self.writer.write_json(output_path, info)
                 
                 print(f"📁 已保存到: {output_path}")
                 return info
@@ -209,92 +389,571 @@ class CrawlUtility:
                 print(f"❌ 信息提取失败: {result.error_message}")
                 return None
                 
-    async def batch_crawl(self, urls, output_dir=None):
-        """批量爬取多个URL"""
-        print(f"🔄 开始批量爬取 {len(urls)} 个URL")
+    async def _crawl_indexed(self, indexed_urls, total, batch_output_dir, options):
+        """在一个浏览器内爬取 (序号, URL) 序列，返回 ({序号: 结果}, 汇总计数)
+        
+        indexed_urls 可以是迭代器，由按主机轮转的调度器按需读取和派发。
+        options 为 batch_crawl 整理好的批量参数（concurrency、per_host、host_rate、
+        crawl_delay、retries、incremental、report、layout、sink）。流式报告模式下结果写入报告文件后即丢弃，返回的结果字典为空。
+        进度以事件形式发到 self.events，同时追加到输出目录中的 events.jsonl，
+        完成的URL和输出文件记录在输出目录的 manifest.db 中（见 crawl_manifest）。
+        """
+        results = {}
+        outputs = {}  # 序号 -> 写入的文件 [{"kind", "path", "bytes", "sha256"}]
+        stats = new_batch_stats()
+        scheduler = HostScheduler(options["concurrency"], options["per_host"],
+                                  rate=options["host_rate"], crawl_delay=options["crawl_delay"],
+                                  retry=RetryPolicy(options["retries"]), breaker=CircuitBreaker())
+        
+        # 增量模式：记录每个URL的校验信息，未变化的页面不再渲染和导出
+        validators = None
+        if options["incremental"]:
+            # 非默认的文件布局和保存方式各自记录，避免沿用另一种方式保存的文件
+            scope = ":".join(["batch"] + [value for value, default in ((options["layout"], "flat"),
+                                                                       (options["sink"], "files"))
+                                          if value != default])
+            validators = ValidatorStore(self.output_dir / ".cache" / "validators.db", scope=scope)
+        
+        # 任务日志：每完成一个URL立即落盘，中断后可以 --resume 继续
+        journal = BatchJournal(batch_output_dir)
+        
+        # 流式报告：每完成一个URL追加一行，内存占用不随URL数量增长
+        report = None
+        if options["report"] == "jsonl":
+            report = JsonlReport(batch_output_dir / "batch_report.jsonl")
+        
+        # 事件日志：每个进度事件一行，多进程时各进程追加到同一个文件
+        event_log = JsonlReport(batch_output_dir / "events.jsonl")
+        log_event = self.events.subscribe(lambda event: event_log.write(event.to_dict()))
+        
+        # 结果库：Markdown 写入 results.db，不再每个URL单独保存文件
+        sink = None
+        if options["sink"] == "sqlite":
+            sink = ResultSink(batch_output_dir / SINK_NAME, metrics=self.metrics)
+        
+        # 压缩归档：原始 HTML、Markdown 和元数据写入 archive 目录下滚动的 WARC 文件
+        archive = None
+        if options["sink"] == "archive":
+            archive = CrawlArchive(batch_output_dir / ARCHIVE_DIR, metrics=self.metrics)
+        
+        # 输出清单：每个URL的状态和输出文件，多进程时各进程写入同一个数据库
+        manifest = OutputManifest(batch_output_dir / MANIFEST_NAME)
+        self.events.subscribe(manifest.on_event)
+        
+        async def crawl_one(crawler, i, url, slot):
+            """爬取单个URL并记录结果，暂时性失败时放回队列等待重试（不记录结果）"""
+            if slot.circuit_open:
+                results[i] = {
+                    "url": url,
+                    "success": False,
+                    "error": "主机连续失败，已熔断"
+                }
+                self.metrics.count("errors", "circuit_open")
+                return
+            
+            self.events.emit(URL_STARTED, i, url, attempt=slot.attempt, total=total)
+            
+            if validators is not None:
+                with self.metrics.timer("validate"):
+                    previous = await validators.check_unchanged(url)
+                if previous is not None:
+                    results[i] = {
+                        "url": url,
+                        "success": True,
+                        "status": "unchanged",
+                        "file": previous["files"][0]
+                    }
+                    return
+            
+            try:
+                result = await self._arun(crawler, url)
+            except Exception as e:
+                if slot.retry():
+                    self.events.emit(URL_RETRY, i, url, attempt=slot.attempt + 1, reason=f"异常: {str(e)}",
+                                     total=total)
+                    return
+                results[i] = {
+                    "url": url,
+                    "success": False,
+                    "error": str(e)
+                }
+                return
+            
+            # 429、5xx、超时等暂时性失败按退避时间重试，服务器给出 Retry-After 时按其等待
+            if is_transient(result):
+                if slot.retry(retry_after_of(result)):
+                    self.events.emit(URL_RETRY, i, url, attempt=slot.attempt + 1,
+                                     reason=f"失败: {result.error_message or result.status_code}", total=total)
+                    return
+            else:
+                slot.succeed()
+            
+            # 页面取回后即归还调度名额，保存文件时其他页面可以继续爬取
+            slot.release()
+            
+            try:
+                if result.success:
+                    digests = {}  # 写入线程计算的文件哈希，只用于本网址
+                    if sink is not None:
+                        # 写入结果库
+                        output_file, size = await sink.write_markdown(url, result.markdown, i)
+                    elif archive is not None:
+                        # 连同原始 HTML 写入压缩归档
+                        output_file, size = await archive.write_page(
+                            url, i, html=getattr(result, 'html', None), markdown=result.markdown,
+                            metadata={"url": result.url, "status_code": getattr(result, 'status_code', None),
+                                      "extract_time": datetime.now().isoformat()})
+                    else:
+                        # 生成文件名：哈希布局按URL哈希分层存放，否则为“序号_URL”
+                        if options["layout"] == "hashed":
+                            output_file = hashed_path(batch_output_dir / "markdown", url, ".md")
+                        else:
+                            filename = flat_name(url)
+                            output_file = batch_output_dir / f"{i:03d}_{filename}.md"
+                        
+                        # 保存内容
+                        size = await self.writer.write_text(output_file, result.markdown, digests)
+                    outputs[i] = [{"kind": "markdown" if archive is None else "archive", "path": str(output_file),
+                                   "bytes": size, "sha256": digests.get(str(output_file))}]
+                    self.events.emit(FILE_WRITTEN, i, url, file_kind="markdown", path=str(output_file),
+                                     bytes=size)
+                    
+                    results[i] = {
+                        "url": url,
+                        "success": True,
+                        "file": str(output_file),
+                        "length": len(result.markdown)
+                    }
+                    if getattr(result, 'from_cache', False):
+                        results[i]["cached"] = True
+                    if validators is not None:
+                        with self.metrics.timer("validate"):
+                            await validators.record(url, getattr(result, 'response_headers', None),
+                                                    files=[str(output_file)])
+                else:
+                    results[i] = {
+                        "url": url,
+                        "success": False,
+                        "error": result.error_message
+                    }
+                    
+            except Exception as e:
+                results[i] = {
+                    "url": url,
+                    "success": False,
+                    "error": str(e)
+                }
+        
+        async def crawl_and_record(crawler, i, url, slot):
+            """爬取单个URL并写入任务日志和报告"""
+            started = time.monotonic()
+            await crawl_one(crawler, i, url, slot)
+            if i not in results:
+                return  # 已放回队列等待重试
+            
+            result = results.pop(i) if report is not None else results[i]
+            result["retries"] = slot.attempt
+            self.metrics.count("pages", batch_status(result))
+            files_written = outputs.pop(i, [])
+            self.events.emit(URL_FINISHED, i, url, status=batch_status(result), elapsed=time.monotonic() - started,
+                             bytes=sum(output["bytes"] for output in files_written), retries=slot.attempt,
+                             total=total, files=[result["file"]] if result.get("file") else [], outputs=files_written,
+                             error=result.get("error"), content_length=result.get("length"))
+            journal.record(i, url, result)
+            tally_result(stats, result)
+            if report is not None:
+                report.write({"index": i, **result})
+        
+        try:
+            async with self._crawler_session() as crawler:
+                await scheduler.run(indexed_urls, lambda i, url, slot: crawl_and_record(crawler, i, url, slot),
+                                    deadline=options["deadline_at"])
+        finally:
+            self.events.unsubscribe(log_event)
+            self.events.unsubscribe(manifest.on_event)
+            event_log.close()
+            manifest.close()
+            journal.close()
+            if report is not None:
+                report.close()
+            if validators is not None:
+                validators.close()
+            if sink is not None:
+                await sink.close()
+            if archive is not None:
+                await archive.close()
+        
+        return results, stats
+    
+    async def batch_crawl(self, urls, output_dir=None, concurrency=1, per_host=None, workers=1,
+                          incremental=False, resume=False, report="json", host_rate=None, crawl_delay=0,
+                          retries=2, deadline=None, profile=False, layout="flat", sink="files"):
+        """批量爬取多个URL
+        
+        urls 为URL列表或 UrlSource（URL文件按需逐行读取，适合超大列表）。
+        concurrency 为同时处理的页面数，per_host 为同一主机同时处理的页面上限
+        （默认不单独限制）。workers 大于1时按主机把URL分给多个进程，每个进程
+        使用独立的浏览器，concurrency 和 per_host 对每个进程分别生效。
+        URL按主机排队、在主机之间轮转派发；host_rate 为每个主机每秒的请求数上限，
+        crawl_delay 为同一主机两次请求之间的最小间隔（秒），同一主机总在同一进程中，
+        因此这两个限制对整个任务生效。
+        暂时性失败（异常、超时、429/5xx）最多重试 retries 次，报告中每个URL的
+        retries 字段为实际重试次数；同一主机连续失败时熔断，多次熔断后其余URL直接判为失败。
+        deadline 为整个任务的时限（秒），到期时取消正在爬取的页面，未完成的URL在报告中
+        标记为 "unfinished"，之后可以用 resume 继续。单个页面的时限见 url_timeout。
+        incremental 为 True 时先用条件请求检查页面是否变化，未变化的页面在报告中
+        标记为 "unchanged" 并沿用上次的输出文件。
+        resume 为 True 时读取输出目录中的任务日志（未指定 output_dir 时使用最近一次
+        的 batch_* 目录），跳过已成功完成的URL。
+        
+        report 为 "json" 时结束后写入 batch_report.json，结果顺序与输入顺序一致，
+        并返回结果列表；为 "jsonl" 时每完成一个URL向 batch_report.jsonl 追加一行
+        （带 index 字段，按完成顺序），最后追加一行汇总并返回汇总字典。
+        profile 为 True 时记录性能分析数据（见 crawl_profile），保存在输出目录中，
+        自身耗时最多的函数附在报告的 profile 字段中。
+        layout 为 "hashed" 时 Markdown 按URL哈希分层保存在 markdown/ab/cd/ 下（见 crawl_manifest），
+        默认的 "flat" 为“序号_URL_哈希.md”；两种布局下URL与文件的对应都记录在 manifest.db 中。
+        sink 为 "sqlite" 时 Markdown 写入输出目录的 results.db（见 crawl_sink），每个URL一行，
+        报告中的 file 字段为“results.db#markdown:转义后的URL”；为 "archive" 时原始 HTML、Markdown
+        和元数据压缩写入 archive 目录下的 WARC 归档（见 crawl_archive），可按URL单独读取。
+        规范化后重复的URL（协议、末尾斜杠、片段、跟踪参数不同）只爬取第一次出现的（保持原始写法，
+        http 和 https 写法合并时爬取 https 的），报告的 collapsed 列表（流式报告中 status 为
+        "duplicate" 的行）注明它们合并到的URL。
+        """
+        # URL列表和URL文件统一按需读取，文件不会整体读入内存；规范化后重复的URL只爬取一次
+        source = urls if isinstance(urls, UrlSource) else UrlSource(urls=urls)
+        total = len(source)
+        print(f"🔄 开始批量爬取 {total} 个URL")
+        if source.duplicates:
+            print(f"🔁 合并了 {len(source.duplicates)} 个重复URL，实际爬取 {source.unique_count} 个")
         
         if output_dir:
             batch_output_dir = Path(output_dir)
+        elif resume and sorted(self.output_dir.glob("batch_*")):
+            batch_output_dir = sorted(self.output_dir.glob("batch_*"))[-1]
         else:
             batch_output_dir = self.output_dir / f"batch_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
         
         batch_output_dir.mkdir(exist_ok=True)
         
-        results = []
+        concurrency = max(1, concurrency)
+        per_host = max(1, per_host) if per_host else concurrency
+        if concurrency > 1:
+            print(f"⚡ 并发数: {concurrency}，单主机上限: {per_host}")
+        if host_rate or crawl_delay:
+            print(f"🐢 单主机限速: {host_rate or '不限'} 次/秒，请求间隔 {crawl_delay or 0} 秒")
+        if incremental:
+            print("⏸️ 增量模式：跳过未变化的页面")
         
-        async with AsyncWebCrawler() as crawler:
-            for i, url in enumerate(urls, 1):
-                print(f"  📄 [{i}/{len(urls)}] {url}")
-                
-                try:
-                    result = await crawler.arun(url=url)
-                    
-                    if result.success:
-                        # 生成文件名
-                        filename = url.replace("https://", "").replace("http://", "").replace("/", "_")
-                        output_file = batch_output_dir / f"{i:03d}_{filename}.md"
-                        
-                        # 保存内容
-                        with open(output_file, 'w', encoding='utf-8') as f:
-                            f.write(result.markdown)
-                        
-                        results.append({
-                            "url": url,
-                            "success": True,
-                            "file": str(output_file),
-                            "length": len(result.markdown)
-                        })
-                        
-                        print(f"     ✅ 成功，{len(result.markdown)} 字符")
-                    else:
-                        results.append({
-                            "url": url,
-                            "success": False,
-                            "error": result.error_message
-                        })
-                        print(f"     ❌ 失败: {result.error_message}")
-                        
-                except Exception as e:
-                    results.append({
-                        "url": url,
-                        "success": False,
-                        "error": str(e)
-                    })
-                    print(f"     ❌ 异常: {str(e)}")
-        
-        # 保存批量结果报告
-        report_file = batch_output_dir / "batch_report.json"
-        with open(report_file, 'w', encoding='utf-8') as f:
-            json.dump({
-                "total_urls": len(urls),
-                "successful": sum(1 for r in results if r["success"]),
-                "failed": sum(1 for r in results if not r["success"]),
+        options = {
+            "concurrency": concurrency,
+            "per_host": per_host,
+            "host_rate": host_rate,
+            "crawl_delay": crawl_delay,
+            "retries": max(0, retries),
+            "url_timeout": self.url_timeout,
+            "deadline_at": time.time() + deadline if deadline else None,
+            "incremental": incremental,
+            "report": report,
+            "profile": profile,
+            "dedup": self.store is not None,
+            "layout": layout,
+            "sink": sink
+        }
+        
+        # 断点续爬：已成功完成的URL直接使用日志中的结果
+        completed = {}
+        if resume:
+            completed = BatchJournal.load_completed(batch_output_dir, source)
+            # 结果库和归档索引按批写入，中断前最后一批可能没有写入，这些URL重新爬取
+            if sink in ("sqlite", "archive"):
+                if sink == "sqlite":
+                    result_sink = ResultSink(batch_output_dir / SINK_NAME)
+                else:
+                    result_sink = CrawlArchive(batch_output_dir / ARCHIVE_DIR)
+                dropped = result_sink.drop_unsaved(completed)
+                await result_sink.close()
+                if dropped:
+                    print(f"🗃️ 结果库中缺少 {dropped} 个URL的记录，重新爬取")
+            print(f"⏩ 继续任务 {batch_output_dir}，跳过已完成的 {len(completed)} 个URL")
+        else:
+            BatchJournal.clear(batch_output_dir)
+            (batch_output_dir / "batch_report.jsonl").unlink(missing_ok=True)
+            (batch_output_dir / "events.jsonl").unlink(missing_ok=True)
+            
+            # 流式报告先写出被合并的URL，每行注明实际爬取的URL（kept）
+            if report == "jsonl" and source.duplicates:
+                with JsonlReport(batch_output_dir / "batch_report.jsonl") as report_writer:
+                    for entry in source.collapsed():
+                        report_writer.write({**entry, "status": "duplicate"})
+        skip = set(completed)
+        
+        # 流式报告下已完成的结果早已写入报告文件，只需计入汇总
+        stats = new_batch_stats()
+        indexed_results = {}
+        if report == "jsonl":
+            for result in completed.values():
+                tally_result(stats, result)
+        else:
+            indexed_results.update(completed)
+        
+        # 多进程时先统计各主机的URL数再分配主机，各进程自行读取URL文件中属于自己的部分
+        shards = []
+        if workers > 1:
+            host_counts = Counter(url_host(url) for _, url in iter_pending(source, skip))
+            shards = shard_hosts(host_counts, workers)
+        
+        # 性能分析：多进程时各工作进程分别记录，结束后合并
+        profiler = None
+        if profile:
+            profiler = CrawlProfiler()
+            profiler.start()
+            print("🔬 已开启性能分析")
+        shard_profilers = []
+        
+        try:
+            if len(shards) > 1:
+                print(f"🧩 使用 {len(shards)} 个工作进程")
+                loop = asyncio.get_running_loop()
+                with ProcessPoolExecutor(max_workers=len(shards)) as executor:
+                    shard_outputs = await asyncio.gather(*(
+                        loop.run_in_executor(executor, run_batch_shard, str(self.output_dir), self.cache_options,
+                                             source, skip, hosts, str(batch_output_dir), options)
+                        for hosts in shards
+                    ))
+                # 合并各工作进程记录的性能指标，性能分析数据在停止记录后合并
+                for _, _, shard_metrics, _ in shard_outputs:
+                    self.metrics.merge(shard_metrics)
+                shard_profilers = [output[3] for output in shard_outputs if output[3] is not None]
+                shard_outputs = [output[:2] for output in shard_outputs]
+            else:
+                shard_outputs = [await self._crawl_indexed(iter_pending(source, skip), total,
+                                                           batch_output_dir, options)]
+        finally:
+            if profiler is not None:
+                profiler.stop()
+        
+        profile_summary = None
+        if profiler is not None:
+            for shard_profiler in shard_profilers:
+                profiler.merge(shard_profiler)
+            profile_summary = profiler.save(batch_output_dir)
+        
+        for shard_results, shard_stats in shard_outputs:
+            indexed_results.update(shard_results)
+            if report == "jsonl":
+                for key, value in shard_stats.items():
+                    stats[key] += value
+        
+        summary = {"total_urls": total, "duplicates": len(source.duplicates)}
+        if report == "jsonl":
+            stats["unfinished"] = source.unique_count - stats["successful"] - stats["failed"]
+            summary.update(stats)
+            summary["metrics"] = self.metrics.summary()
+            if profile_summary:
+                summary["profile"] = profile_summary
+            summary["created_at"] = datetime.now().isoformat()
+            
+            # 流式报告最后追加一行汇总
+            with JsonlReport(batch_output_dir / "batch_report.jsonl") as report_writer:
+                report_writer.write({"summary": summary})
+            report_file = batch_output_dir / "batch_report.jsonl"
+            results = summary
+        else:
+            # 按输入位置合并结果，页面乱序完成也不影响报告顺序
+            # 超过总时限时没有结果的URL标记为未完成
+            results = [
+                indexed_results.get(i) or {"url": url, "success": False, "status": "unfinished"}
+                for i, url in source
+            ]
+            for result in results:
+                tally_result(stats, result)
+            summary.update(stats)
+            
+            # 保存批量结果报告
+            report_file = batch_output_dir / "batch_report.json"
+            report_data = {
+                **summary,
                 "results": results,
-                "created_at": datetime.now().isoformat()
-            }, f, ensure_ascii=False, indent=2)
+                "collapsed": source.collapsed(),
+                "metrics": self.metrics.summary()
+            }
+            if profile_summary:
+                report_data["profile"] = profile_summary
+            report_data["created_at"] = datetime.now().isoformat()
+            with open(report_file, 'w', encoding='utf-8') as f:
+                json.dump(report_data, f, ensure_ascii=False, indent=2)
+        
+        # 性能指标：Prometheus 文本文件，终端中显示各阶段耗时
+        self.metrics.write_prometheus(batch_output_dir / "metrics.prom")
         
-        successful = sum(1 for r in results if r["success"])
-        print(f"🎉 批量爬取完成: {successful}/{len(urls)} 成功")
+        print(f"🎉 批量爬取完成: {stats['successful']}/{source.unique_count} 成功")
+        if stats["cached"]:
+            print(f"♻️ 其中 {stats['cached']} 个来自缓存")
+        if stats["unchanged"]:
+            print(f"⏸️ 其中 {stats['unchanged']} 个页面未变化")
+        if stats["retries"]:
+            print(f"🔁 共重试 {stats['retries']} 次")
+        if stats["unfinished"]:
+            print(f"⏰ 超过总时限，{stats['unfinished']} 个URL未完成，可使用 --resume 继续")
+        print("⏱️ 各阶段耗时:")
+        for line in self.metrics.summary_lines():
+            print(line)
+        if profiler is not None:
+            print("🔬 自身耗时最多的函数:")
+            for line in profiler.summary_lines():
+                print(line)
+            print(f"   完整数据: {batch_output_dir / 'profile.pstats'}，火焰图数据: {batch_output_dir / 'profile.collapsed'}")
         print(f"📁 结果保存在: {batch_output_dir}")
+        print(f"📋 批量报告: {report_file}")
         
         return results
 
+def new_batch_stats():
+    """批量爬取的汇总计数"""
+    return {"successful": 0, "failed": 0, "cached": 0, "unchanged": 0, "retries": 0, "unfinished": 0}
+
+def batch_status(result):
+    """批量结果的状态：success、cached、unchanged、failed 或 unfinished"""
+    if result.get("status"):
+        return result["status"]
+    if not result["success"]:
+        return "failed"
+    return "cached" if result.get("cached") else "success"
+
+def print_batch_event(event):
+    """在终端中显示批量爬取的进度事件"""
+    position = f"[{event.index}/{event.get('total')}]"
+    if event.kind == URL_STARTED:
+        print(f"  📄 {position} {event.url}")
+    elif event.kind == URL_RETRY:
+        print(f"     🔁 {position} {event.get('reason')}，稍后第 {event.get('attempt')} 次重试")
+    elif event.kind == URL_FINISHED:
+        status = event.get("status")
+        if status == "unchanged":
+            print(f"     ⏸️ {position} 页面未变化，沿用: {event.get('files')[0]}")
+        elif status in ("success", "cached"):
+            print(f"     ✅ {position} 成功，{event.get('content_length')} 字符")
+        else:
+            print(f"     ❌ {position} 失败: {event.get('error')}  {event.url}")
+
+def tally_result(stats, result):
+    """把单个URL的结果计入汇总"""
+    if result.get("status") == "unfinished":
+        stats["unfinished"] += 1
+    elif result["success"]:
+        stats["successful"] += 1
+    else:
+        stats["failed"] += 1
+    if result.get("cached"):
+        stats["cached"] += 1
+    if result.get("status") == "unchanged":
+        stats["unchanged"] += 1
+    stats["retries"] += result.get("retries", 0)
+
+def run_batch_shard(output_dir, cache_options, source, skip, hosts, batch_output_dir, options):
+    """工作进程入口：用独立的浏览器爬取 hosts 中各主机的URL，
+    返回 ({序号: 结果}, 汇总计数, 性能指标, 性能分析数据（未开启时为 None）)"""
+    async def crawl_shard():
+        async with CrawlUtility(output_dir, url_timeout=options["url_timeout"], dedup=options["dedup"],
+                                **cache_options) as utility:
+            results, stats = await utility._crawl_indexed(iter_pending(source, skip, hosts), len(source),
+                                                          Path(batch_output_dir), options)
+            return results, stats, utility.metrics
+    
+    profiler = None
+    if options.get("profile"):
+        profiler = CrawlProfiler()
+        profiler.start()
+    try:
+        results, stats, metrics = asyncio.run(crawl_shard())
+    finally:
+        if profiler is not None:
+            profiler.stop()
+    return results, stats, metrics, profiler
+
 def main():
     """命令行入口"""
     parser = argparse.ArgumentParser(description="Crawl4AI 实用工具")
-    parser.add_argument("command", choices=["simple", "clean", "pdf", "screenshot", "info", "batch"], 
+    parser.add_argument("command", choices=["simple", "clean", "pdf", "screenshot", "info", "batch", "manifest", "archive"],
                         help="执行的命令")
-    parser.add_argument("url", nargs="?", help="目标URL（batch模式下为文件路径）")
+    parser.add_argument("url", nargs="?", help="目标URL（batch模式下为文件路径，manifest、archive模式下为批量输出目录）")
     parser.add_argument("-o", "--output", help="输出文件名")
     parser.add_argument("-k", "--keywords", help="关键词过滤（仅clean模式）")
     parser.add_argument("--output-dir", default="outputs", help="输出目录")
+    parser.add_argument("--concurrency", type=int, default=1, help="同时爬取的页面数（仅batch模式）")
+    parser.add_argument("--per-host", type=int, help="同一主机同时爬取的页面上限（仅batch模式）")
+    parser.add_argument("--host-rate", type=float, help="每个主机每秒的请求数上限（仅batch模式）")
+    parser.add_argument("--crawl-delay", type=float, default=0, help="同一主机两次请求之间的最小间隔秒数（仅batch模式）")
+    parser.add_argument("--retries", type=int, default=2, help="暂时性失败的最多重试次数（仅batch模式）")
+    parser.add_argument("--timeout", type=float, default=DEFAULT_URL_TIMEOUT, help="单个页面的爬取时限（秒）")
+    parser.add_argument("--deadline", type=float, help="整个批量任务的时限（秒），到期后停止并可用 --resume 继续（仅batch模式）")
+    parser.add_argument("--workers", type=int, default=1, help="工作进程数，按主机分配URL（仅batch模式）")
+    parser.add_argument("--resume", action="store_true", help="继续中断的批量任务，跳过已完成的URL（仅batch模式）")
+    parser.add_argument("--report", choices=["json", "jsonl"], default="json",
+                        help="批量报告格式，jsonl 为边爬边写的流式报告（仅batch模式）")
+    parser.add_argument("--incremental", action="store_true", help="增量爬取，跳过未变化的页面（仅batch模式）")
+    parser.add_argument("--dedup", action="store_true",
+                        help="相同内容的输出文件只保存一份（保存在输出目录的 .store 中，输出文件为硬链接）")
+    parser.add_argument("--layout", choices=LAYOUTS, default="flat",
+                        help="输出文件布局，hashed 按URL哈希分层存放在 markdown/ab/cd/ 下（仅batch模式）")
+    parser.add_argument("--sink", choices=SINKS, default="files",
+                        help="Markdown 的保存方式，sqlite 为写入输出目录中的 results.db，"
+                             "archive 为连同原始 HTML 压缩写入 archive 目录下的 WARC 归档（仅batch模式）")
+    parser.add_argument("--lookup", metavar="URL", help="查询清单中某个URL的状态和输出文件（manifest模式），或读取归档中该URL的内容（archive模式）")
+    parser.add_argument("--cache-mode", choices=CACHE_MODES, default="enabled", help="本地结果缓存模式")
+    parser.add_argument("--cache-ttl", type=int, default=DEFAULT_TTL, help="缓存有效期（秒）")
+    parser.add_argument("--cache-size", type=int, default=DEFAULT_MAX_SIZE_MB, help="缓存总大小上限（MB）")
+    parser.add_argument("--metrics-port", type=int,
+                        help="在 http://127.0.0.1:端口/metrics 提供 Prometheus 格式的性能指标（多进程时结束后合并）")
+    parser.add_argument("--image-format", choices=list(SCREENSHOT_FORMATS), default="png",
+                        help="截图格式（仅screenshot模式，webp/jpeg 需要 Pillow）")
+    parser.add_argument("--quality", type=int, default=DEFAULT_SCREENSHOT_OPTIONS["quality"],
+                        help="webp/jpeg 截图质量 1-100（仅screenshot模式）")
+    parser.add_argument("--max-width", type=int, default=0, help="截图最大宽度，超过时等比缩小（仅screenshot模式）")
+    parser.add_argument("--max-height", type=int, default=0, help="截图最大高度，超过时等比缩小（仅screenshot模式）")
+    parser.add_argument("--thumbnail", type=int, default=0,
+                        help="另存一张边长不超过此值的缩略图（文件名加 _thumb，仅screenshot模式）")
+    parser.add_argument("--viewport-only", action="store_true", help="只保留首屏（视口）部分（仅screenshot模式）")
+    parser.add_argument("--profile", action="store_true",
+                        help="记录性能分析数据，保存为输出目录中的 profile.pstats 和 profile.collapsed（仅batch模式）")
     
     args = parser.parse_args()
     
+    # 查询输出清单和归档不需要启动浏览器
+    if args.command == "manifest":
+        manifest_path = Path(args.url) if args.url else Path(args.output_dir)
+        if not manifest_path.exists():
+            print(f"❌ 清单不存在: {manifest_path}")
+            return
+        print_manifest(manifest_path, args.lookup)
+        return
+    if args.command == "archive":
+        archive_dir = Path(args.url) if args.url else Path(args.output_dir)
+        if not (archive_dir / ARCHIVE_DIR / INDEX_NAME).exists() and not (archive_dir / INDEX_NAME).exists():
+            print(f"❌ 归档不存在: {archive_dir}")
+            return
+        print_archive(archive_dir, args.lookup)
+        return
+    
     # 创建工具实例
-    utility = CrawlUtility(args.output_dir)
+    utility = CrawlUtility(args.output_dir, cache_mode=args.cache_mode,
+                           cache_ttl=args.cache_ttl, cache_size_mb=args.cache_size, url_timeout=args.timeout,
+                           dedup=args.dedup)
     
     async def run_command():
+        server = None
+        if args.metrics_port is not None:
+            server = MetricsServer(utility.metrics, args.metrics_port)
+            print(f"📈 性能指标: http://127.0.0.1:{server.port}/metrics")
+        try:
+            async with utility:
+                await dispatch_command()
+        finally:
+            if server is not None:
+                server.close()
+    
+    async def dispatch_command():
         if args.command == "simple":
             if not args.url:
                 print("❌ 请提供URL")
@@ -317,7 +976,14 @@ def main():
             if not args.url:
                 print("❌ 请提供URL")
                 return
-            await utility.screenshot(args.url, args.output)
+            await utility.screenshot(args.url, args.output, {
+                "format": args.image_format,
+                "quality": min(100, max(1, args.quality)),
+                "max_width": max(0, args.max_width),
+                "max_height": max(0, args.max_height),
+                "thumbnail": max(0, args.thumbnail),
+                "viewport_only": args.viewport_only
+            })
             
         elif args.command == "info":
             if not args.url:
@@ -330,11 +996,13 @@ def main():
                 print("❌ 请提供URL列表文件路径")
                 return
             
-            # 读取URL列表
+            # 建立URL文件的偏移索引，爬取时逐行读取
             try:
-                with open(args.url, 'r', encoding='utf-8') as f:
-                    urls = [line.strip() for line in f if line.strip() and not line.startswith('#')]
-                await utility.batch_crawl(urls, args.output)
+                urls = UrlSource(args.url)
+                await utility.batch_crawl(urls, args.output, args.concurrency, args.per_host, args.workers,
+                                         args.incremental, args.resume, args.report,
+                                         args.host_rate, args.crawl_delay, args.retries, args.deadline,
+                                         args.profile, args.layout, args.sink)
             except FileNotFoundError:
                 print(f"❌ 文件不存在: {args.url}")
             except Exception as e:
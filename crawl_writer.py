@@ -0,0 +1,134 @@
+"""
+Crawl4AI 输出文件写入
+把截图解码和转换、JSON序列化和磁盘写入放到线程池中执行，爬取协程只需等待自己的文件，
+事件循环可以继续处理其他页面；所有文件先写临时文件再重命名，读取方不会看到写了一半的文件
+"""
+
+import asyncio
+import base64
+import hashlib
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from pathlib import Path
+
+from crawl_images import encode_screenshot
+
+
+def atomic_write(path, data):
+    """原子写入：先写同目录下的临时文件，再重命名为目标文件，返回写入的字节数"""
+    path = Path(path)
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    try:
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
+    return len(data)
+
+
+def _write_text(path, text, put=atomic_write):
+    return put(path, text.encode('utf-8'))
+
+
+def _write_base64(path, encoded, put=atomic_write):
+    return put(path, base64.b64decode(encoded))
+
+
+def _write_screenshot(path, encoded, options, viewport, put=atomic_write):
+    return [(output_path, put(output_path, data))
+            for output_path, data in encode_screenshot(encoded, path, options, viewport)]
+
+
+def _write_json(path, obj, put=atomic_write):
+    return put(path, json.dumps(obj, ensure_ascii=False, indent=2).encode('utf-8'))
+
+
+class AsyncFileWriter:
+    """线程池文件写入器
+
+    max_pending 限制同时排队的写入数量，磁盘跟不上时新的写入会等待（背压），
+    避免大量待写的PDF和截图堆积在内存中。
+    metrics 为 CrawlMetrics 时记录每次写入的耗时（阶段名为 write_text、write_base64 等）
+    和写入的字节数。
+    store 为 ContentStore（见 crawl_store）时，Markdown、PDF 和截图按内容只保存一份，
+    输出文件为硬链接；JSON 信息文件带有时间戳，仍直接写入。
+    各 write_* 方法的 digests 为调用方提供的字典时，在写入线程中计算每个文件的 SHA-256
+    并记入其中（{路径: 哈希}），哈希随调用方的字典一起释放，写入器本身不保存。
+    """
+
+    def __init__(self, max_workers=4, max_pending=16, metrics=None, store=None):
+        """初始化写入器"""
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="crawl-writer")
+        self.max_pending = max_pending
+        self.metrics = metrics
+        self.store = store
+        self._slots = None
+        self._loop = None
+
+    async def _submit(self, stage, func, *args):
+        """在线程池中执行写入函数，返回写入的字节数"""
+        loop = asyncio.get_running_loop()
+        if self._slots is None or self._loop is not loop:
+            self._slots = asyncio.Semaphore(self.max_pending)
+            self._loop = loop
+
+        async with self._slots:
+            if self.metrics is None:
+                return await loop.run_in_executor(self.executor, func, *args)
+            return await loop.run_in_executor(self.executor, self._timed, stage, func, *args)
+
+    def put(self, path, data, dedup=True, digests=None):
+        """在写入线程中写入一个文件，需要时把哈希记入 digests、写入内容寻址存储"""
+        digest = None
+        if digests is not None or (self.store is not None and dedup):
+            digest = hashlib.sha256(data).hexdigest()
+            if digests is not None:
+                digests[str(path)] = digest
+        if self.store is not None and dedup:
+            return self.store.write(path, data, digest)
+        return atomic_write(path, data)
+
+    def _timed(self, stage, func, path, *args):
+        """在写入线程中计时（不包括排队等待的时间），写入字节数按文件扩展名分类计数"""
+        with self.metrics.timer(stage):
+            result = func(path, *args)
+        # 一次写入多个文件时返回 [(路径, 字节数)]
+        for output_path, size in (result if isinstance(result, list) else [(path, result)]):
+            self.metrics.count("bytes", Path(output_path).suffix.lstrip(".") or "other", size)
+        return result
+
+    async def write_text(self, path, text, digests=None):
+        """写入UTF-8文本文件"""
+        put = partial(self.put, digests=digests)
+        return await self._submit("write_text", partial(_write_text, put=put), path, str(text))
+
+    async def write_bytes(self, path, data, digests=None):
+        """写入二进制文件"""
+        return await self._submit("write_bytes", partial(self.put, digests=digests), path, data)
+
+    async def write_base64(self, path, encoded, digests=None):
+        """解码base64数据（如截图）并写入二进制文件，返回解码后的字节数"""
+        put = partial(self.put, digests=digests)
+        return await self._submit("write_base64", partial(_write_base64, put=put), path, encoded)
+
+    async def write_screenshot(self, path, encoded, options=None, viewport=None, digests=None):
+        """解码base64截图，按 options（见 crawl_images）转换格式、缩放并生成缩略图后写入，
+        返回 [(文件路径, 字节数)]，第一项为截图，开启缩略图时第二项为缩略图"""
+        put = partial(self.put, digests=digests)
+        return await self._submit("write_screenshot", partial(_write_screenshot, put=put),
+                                  path, encoded, options, viewport)
+
+    async def write_json(self, path, obj, digests=None):
+        """序列化为带缩进的JSON并写入"""
+        # 信息文件带有时间戳，每次内容都不同，不写入内容寻址存储
+        put = partial(self.put, dedup=False, digests=digests)
+        return await self._submit("write_json", partial(_write_json, put=put), path, obj)
+
+    def close(self):
+        """等待已提交的写入完成并关闭线程池"""
+        self.executor.shutdown(wait=True)
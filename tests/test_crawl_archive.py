@@ -0,0 +1,39 @@
+"""crawl_archive：按规范网址索引，缓存命中的结果也带有原始 HTML"""
+
+import asyncio
+from types import SimpleNamespace
+
+from crawl_archive import ArchiveReader, CrawlArchive
+from crawl_cache import ResultCache
+
+
+def test_lookup_uses_canonical_url(tmp_path):
+    """写入和读取时网址写法不同也能找到同一条记录，继续任务时也按规范网址核对"""
+    async def write():
+        archive = CrawlArchive(tmp_path / "archive", compression="gzip")
+        locator, _ = await archive.write_page("HTTPS://Example.com/a/?utm_source=x", 1, html="<p>a</p>")
+        await archive.close()
+        return locator
+
+    locator = asyncio.run(write())
+    reader = ArchiveReader(tmp_path)
+    assert reader.get("https://example.com/a")["html"] == "<p>a</p>"
+    assert reader.urls() == ["https://example.com/a"]
+    reader.close()
+
+    archive = CrawlArchive(tmp_path / "archive", compression="gzip")
+    completed = {1: {"files": [locator]}}
+    assert archive.drop_unsaved(completed) == 0 and 1 in completed
+    asyncio.run(archive.close())
+
+
+def test_cached_result_keeps_html(tmp_path):
+    """缓存命中的结果带有原始 HTML、状态码和响应头"""
+    cache = ResultCache(tmp_path / "cache.db")
+    result = SimpleNamespace(url="https://example.com/", title="t", markdown="# t", html="<h1>t</h1>",
+                             status_code=200, response_headers={"ETag": '"1"'}, screenshot=None,
+                             links={}, media={}, pdf=None)
+    cache.put("key", result)
+    cached = cache.get("key")
+    assert (cached.html, cached.status_code, cached.response_headers) == ("<h1>t</h1>", 200, {"ETag": '"1"'})
+    cache.close()
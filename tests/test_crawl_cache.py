@@ -0,0 +1,39 @@
+"""crawl_cache：过期时间和按最近访问淘汰"""
+
+import time
+from types import SimpleNamespace
+
+from crawl_cache import ResultCache
+
+
+def page(url, markdown="x"):
+    """构造一个成功的爬取结果"""
+    return SimpleNamespace(url=url, title="t", markdown=markdown, html="<p></p>", status_code=200,
+                           response_headers={}, screenshot=None, links={}, media={}, pdf=None)
+
+
+def test_expired_entries_are_misses(tmp_path):
+    """超过 ttl 的条目视为未命中并被删除"""
+    cache = ResultCache(tmp_path / "results.db", ttl=0.05)
+    cache.put("a", page("https://a.com/"))
+    assert cache.get("a").url == "https://a.com/"
+    time.sleep(0.1)
+    assert cache.get("a") is None
+    assert (cache.hits, cache.misses) == (1, 1)
+    assert cache.conn.execute("SELECT COUNT(*) FROM results").fetchone()[0] == 0
+    cache.close()
+
+
+def test_evicts_least_recently_used(tmp_path):
+    """总大小超过上限时淘汰最久未访问的条目，刚读取过的条目保留"""
+    cache = ResultCache(tmp_path / "results.db", max_size_mb=10000 / 1024 / 1024)
+    cache.put("a", page("https://a.com/", "x" * 4000))
+    time.sleep(0.01)
+    cache.put("b", page("https://b.com/", "x" * 4000))
+    time.sleep(0.01)
+    assert cache.get("a") is not None
+    time.sleep(0.01)
+    cache.put("c", page("https://c.com/", "x" * 4000))
+    assert cache.get("b") is None
+    assert cache.get("a") is not None and cache.get("c") is not None
+    cache.close()
@@ -0,0 +1,96 @@
+"""crawl_incremental：只在有校验信息且输出文件还在时探测，优先用条件 HEAD 请求"""
+
+import asyncio
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+from crawl_incremental import ValidatorStore
+
+
+class Handler(BaseHTTPRequestHandler):
+    requests = []
+    bodies = {}
+
+    def _reply(self):
+        self.requests.append((self.command, self.path))
+        if self.headers.get("If-None-Match") == '"v1"':
+            self.send_response(304)
+            self.end_headers()
+            return
+        self.send_response(200)
+        if self.path == "/etag":
+            self.send_header("ETag", '"v1"')
+        self.end_headers()
+        if self.command == "GET":
+            self.wfile.write(self.bodies.get(self.path, b"body"))
+
+    do_GET = do_HEAD = _reply
+
+    def log_message(self, *args):
+        pass
+
+
+def probe_server():
+    """在本机启动一个记录请求方法的测试服务器"""
+    Handler.requests.clear()
+    Handler.bodies.clear()
+    server = HTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}"
+
+
+def crawl(store, url, output, headers=None):
+    """按爬取引擎的顺序检查页面：未变化时返回 "unchanged"，否则“完整爬取”并记录校验信息"""
+    async def run():
+        if await store.check_unchanged(url) is not None:
+            return "unchanged"
+        output.write_text("x", encoding="utf-8")
+        await store.record(url, headers or {}, files=[str(output)])
+        return "success"
+    return asyncio.run(run())
+
+
+def test_page_without_validators_unchanged_by_hash(tmp_path):
+    """服务器不提供 ETag 和 Last-Modified 时，第二次爬取按内容哈希判为未变化，内容变化后重新爬取"""
+    server, base = probe_server()
+    store = ValidatorStore(tmp_path / "validators.db")
+    output = tmp_path / "plain.md"
+    url = f"{base}/plain"
+
+    assert crawl(store, url, output) == "success"
+    assert crawl(store, url, output) == "unchanged"
+    assert [method for method, _ in Handler.requests] == ["GET", "GET"]
+
+    Handler.bodies["/plain"] = b"changed"
+    assert crawl(store, url, output) == "success"
+    # 变化时探测得到的哈希直接记下，不再额外请求
+    assert len(Handler.requests) == 3
+    assert crawl(store, url, output) == "unchanged"
+
+    store.close()
+    server.shutdown()
+
+
+def test_probe_only_with_validators(tmp_path):
+    """首次遇到或输出文件已删除时不探测，有 ETag 时用条件 HEAD 请求，记录时不再取内容"""
+    server, base = probe_server()
+    store = ValidatorStore(tmp_path / "validators.db")
+    output = tmp_path / "page.md"
+    url = f"{base}/etag"
+
+    # 首次遇到的网址不发请求；响应带 ETag 时记录后也不取内容
+    assert crawl(store, url, output, {"ETag": '"v1"'}) == "success"
+    assert Handler.requests == []
+
+    # 有 ETag 时用条件 HEAD 请求，304 表示未变化
+    assert crawl(store, url, output) == "unchanged"
+    assert Handler.requests == [("HEAD", "/etag")]
+
+    # 上次的输出文件被删除后直接重新爬取
+    output.unlink()
+    Handler.requests.clear()
+    assert asyncio.run(store.check_unchanged(url)) is None
+    assert Handler.requests == []
+
+    store.close()
+    server.shutdown()
@@ -0,0 +1,27 @@
+"""crawl_journal：崩溃时写了一半的最后一行不影响读取其余记录"""
+
+from crawl_journal import BatchJournal
+
+
+def test_load_completed_skips_torn_last_line(tmp_path):
+    """最后一行被截断（包括截断在多字节字符中间）时忽略该行，其余记录照常读取"""
+    journal = BatchJournal(tmp_path, prefix="journal")
+    journal.record(1, "https://a.com/", {"success": True, "files": ["a.md"]})
+    journal.record(2, "https://b.com/", {"success": False, "error": "超时"})
+    journal.record(3, "https://c.com/", {"success": True, "files": ["标题.md"]})
+    journal.close()
+
+    data = journal.path.read_bytes()
+    journal.path.write_bytes(data[:data.rindex("标题".encode("utf-8")) + 2])
+
+    urls = [(1, "https://a.com/"), (2, "https://b.com/"), (3, "https://c.com/")]
+    completed = BatchJournal.load_completed(tmp_path, iter(urls), prefix="journal")
+    assert completed == {1: {"success": True, "files": ["a.md"]}}
+
+
+def test_load_completed_requires_matching_url(tmp_path):
+    """序号相同但网址不同（列表已变化）的记录不算已完成"""
+    journal = BatchJournal(tmp_path)
+    journal.record(1, "https://a.com/", {"success": True})
+    journal.close()
+    assert BatchJournal.load_completed(tmp_path, [(1, "https://other.com/")]) == {}
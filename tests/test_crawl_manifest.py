@@ -0,0 +1,19 @@
+"""crawl_manifest：平铺布局的文件名"""
+
+import re
+
+from crawl_manifest import flat_name
+
+
+def test_flat_name_is_safe_and_unique():
+    """文件名只含安全字符，去掉协议、截断后相同的网址也不会重名"""
+    names = [flat_name(url) for url in (
+        "https://a.com/search?q=x:y*z",
+        "https://a.com/search?q=x:y|z",
+        "https://a.com/" + "p" * 100 + "/1",
+        "https://a.com/" + "p" * 100 + "/2",
+        "http://a.com/other",
+    )]
+    assert all(re.fullmatch(r"[A-Za-z0-9._-]+", name) for name in names)
+    assert len(set(names)) == len(names)
+    assert names[4].startswith("a.com_other_")
@@ -0,0 +1,52 @@
+"""crawl_retry：退避时间、Retry-After 和按主机熔断"""
+
+import time
+from email.utils import formatdate
+from types import SimpleNamespace
+
+from crawl_retry import CircuitBreaker, RetryPolicy, is_transient, parse_retry_after, retry_after_of
+
+
+def test_backoff_is_bounded_and_honours_retry_after():
+    """退避时间不超过 base_delay * 2^n 和 max_delay，服务器给出的 Retry-After 优先"""
+    policy = RetryPolicy(max_retries=5, base_delay=1.0, max_delay=10.0)
+    for attempt in range(6):
+        for _ in range(50):
+            assert 0 <= policy.backoff(attempt) <= min(10.0, 2 ** attempt)
+    assert policy.backoff(0, retry_after=7) == 7
+    assert policy.backoff(0, retry_after=120) == 10.0
+
+
+def test_parse_retry_after():
+    """Retry-After 可以是秒数或HTTP日期，无法解析时返回 None"""
+    assert parse_retry_after("30") == 30.0
+    assert 55 <= parse_retry_after(formatdate(timeval=time.time() + 60, usegmt=True)) <= 60
+    assert parse_retry_after("soon") is None and parse_retry_after(None) is None
+    result = SimpleNamespace(response_headers={"retry-after": "5"})
+    assert retry_after_of(result) == 5.0
+
+
+def test_transient_failures():
+    """429/5xx、超时和网络错误值得重试，404 不重试"""
+    assert is_transient(SimpleNamespace(success=False, status_code=503, error_message=""))
+    assert is_transient(SimpleNamespace(success=False, status_code=None, error_message="Timeout 30000ms"))
+    assert not is_transient(SimpleNamespace(success=False, status_code=404, error_message="Not Found"))
+    assert is_transient(error=ConnectionError())
+
+
+def test_circuit_breaker_trips_and_recovers():
+    """连续失败达到阈值后熔断，冷却时间翻倍；试探成功后恢复，多次熔断后判为不可用"""
+    breaker = CircuitBreaker(failure_threshold=3, cooldown=10, max_trips=2)
+    assert not breaker.record_failure("a.com", now=100)
+    assert not breaker.record_failure("a.com", now=100)
+    assert breaker.record_failure("a.com", now=100)
+    assert breaker.wait_time("a.com", 105) == 5 and breaker.half_open("a.com")
+    assert breaker.wait_time("b.com", 105) == 0
+
+    # 冷却后试探请求失败，再次熔断且时间翻倍，达到上限后不可用
+    assert breaker.record_failure("a.com", now=110)
+    assert breaker.wait_time("a.com", 110) == 20
+    assert breaker.is_dead("a.com")
+
+    breaker.record_success("a.com")
+    assert not breaker.half_open("a.com") and not breaker.is_dead("a.com")
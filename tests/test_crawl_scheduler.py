@@ -0,0 +1,71 @@
+"""crawl_scheduler：按主机轮转派发、重试放回队列和单主机限速"""
+
+import asyncio
+import time
+
+from crawl_retry import RetryPolicy
+from crawl_scheduler import HostScheduler
+
+
+def run(scheduler, urls, handler):
+    asyncio.run(scheduler.run(enumerate(urls, 1), handler))
+
+
+def test_round_robin_between_hosts():
+    """按站点分组的列表也在主机之间交替派发"""
+    urls = [f"https://a.com/{i}" for i in range(4)] + ["https://b.com/0", "https://c.com/0"]
+    order = []
+
+    async def handler(i, url, slot):
+        order.append(url)
+
+    run(HostScheduler(1), urls, handler)
+    assert order == ["https://a.com/0", "https://b.com/0", "https://c.com/0",
+                     "https://a.com/1", "https://a.com/2", "https://a.com/3"]
+
+
+def test_per_host_limit():
+    """同一主机同时处理的URL数不超过 per_host"""
+    active = {"a.com": 0, "b.com": 0}
+    peak = dict(active)
+
+    async def handler(i, url, slot):
+        host = slot.host
+        active[host] += 1
+        peak[host] = max(peak[host], active[host])
+        await asyncio.sleep(0.01)
+        active[host] -= 1
+
+    urls = [f"https://{host}/{i}" for i in range(6) for host in ("a.com", "b.com")]
+    run(HostScheduler(4, per_host=1), urls, handler)
+    assert peak == {"a.com": 1, "b.com": 1}
+
+
+def test_retry_requeues_before_other_urls_of_host():
+    """重试的URL放回所属主机队列的最前面，attempt 递增，次数用完后不再重试"""
+    calls = []
+
+    async def handler(i, url, slot):
+        calls.append((url, slot.attempt))
+        if url.endswith("/flaky"):
+            assert slot.retry() == (slot.attempt < 2)
+
+    urls = ["https://a.com/flaky", "https://a.com/next"]
+    run(HostScheduler(1, retry=RetryPolicy(max_retries=2, base_delay=0)), urls, handler)
+    assert calls == [("https://a.com/flaky", 0), ("https://a.com/flaky", 1),
+                     ("https://a.com/flaky", 2), ("https://a.com/next", 0)]
+
+
+def test_host_rate_limit():
+    """每秒请求数限制按主机计算，不同主机互不影响"""
+    started = {}
+
+    async def handler(i, url, slot):
+        started.setdefault(slot.host, []).append(time.monotonic())
+
+    urls = [f"https://{host}/{i}" for i in range(3) for host in ("a.com", "b.com")]
+    begin = time.monotonic()
+    run(HostScheduler(4, rate=20), urls, handler)
+    for times in started.values():
+        assert times[-1] - times[0] >= 2 / 20 - 0.01
+    assert time.monotonic() - begin < 1
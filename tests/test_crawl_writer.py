@@ -0,0 +1,25 @@
+"""crawl_writer：文件哈希记入调用方提供的字典"""
+
+import asyncio
+import hashlib
+
+from crawl_writer import AsyncFileWriter
+
+
+def test_digests_collected_by_caller(tmp_path):
+    """传入 digests 时记录写入文件的 SHA-256，不传时不计算也不保存"""
+    writer = AsyncFileWriter()
+    digests = {}
+
+    async def write():
+        await writer.write_text(tmp_path / "a.md", "内容", digests)
+        await writer.write_bytes(tmp_path / "b.pdf", b"%PDF", digests=digests)
+        await writer.write_text(tmp_path / "c.md", "other")
+
+    asyncio.run(write())
+    writer.close()
+    assert digests == {
+        str(tmp_path / "a.md"): hashlib.sha256("内容".encode("utf-8")).hexdigest(),
+        str(tmp_path / "b.pdf"): hashlib.sha256(b"%PDF").hexdigest(),
+    }
+    assert not hasattr(writer, "digests")